@@ -2,7 +2,47 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 import pyodbc
 import os
-from config import DB_CONFIG, FLASK_CONFIG, ERROR_MESSAGES, APP_TABLES, FALLBACK_TABLES, SIMULATION_MODE
+import base64
+import itertools
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from config import (
+    DB_CONFIG, FLASK_CONFIG, ERROR_MESSAGES, APP_TABLES, FALLBACK_TABLES, SIMULATION_MODE,
+    POOL_CONFIG, DB_STATE_CONFIG, EXPORT_CONFIG, OPERATOR_DIRECTORY_CONFIG, LTC_CACHE_CONFIG,
+    WRITE_BATCH_CONFIG, SIMULATION_CONFIG, STATS_CONFIG, HEARTBEAT_CONFIG,
+    SERVER_CONFIG, DEADLINE_CONFIG, LIVE_FEED_CONFIG, LAUNCH_SUMMARY_CONFIG,
+    DAY_ROLLUP_CONFIG, RESPONSE_CONFIG, QUERY_LOG_CONFIG, BATCH_INGEST_CONFIG, SESSION_CONFIG,
+    ARCHIVE_CONFIG, STARTUP_CONFIG
+)
+import deadlines
+from db_pool import ConnectionPool, DatabaseTimeoutError, QueryTimeoutError
+from export_jobs import ExportJobManager, ExportJobStore, FINISHED_STATUSES
+from operator_directory import OperatorDirectory
+from ttl_cache import TTLCache, MISSING
+from write_batcher import GroupCommitWriter, build_insert
+from simulation_store import SimulationStore, date_key
+from migrations import apply_migrations, schema_version_table
+from table_stats import TableStatsCollector
+from heartbeat import Heartbeat
+from live_feed import EventBroker, ChangePoller, parse_event_id, stream as sse_stream
+from launch_summary import LaunchSummary
+from day_rollup import DailyOperatorRollup, format_duration
+from responses import wants_columnar, columnar, columnar_response, compress_response
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from queries import (
+    run_query, run_many, timed_connect, timed_acquire, install_query_log,
+    start_request as start_request_db_timer, request_db_seconds
+)
+from query_log import QueryLog
+from batch_ingest import (
+    TabletEvent, EventLedger, parse_event, write_events, is_duplicate_key_error,
+    RECORDED, DUPLICATE, REJECTED
+)
+from session_registry import SessionRegistry, SessionError, ACTIVE, PAUSED
+from history_archive import HistoryArchive, ARCHIVE_COLUMNS
+from startup import StartupTimer, poll_until
 import sys, io
 try:
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -19,67 +59,118 @@ CURRENT_TABLES = APP_TABLES
 USING_FALLBACK = False
 USING_SIMULATION = False
 
-# Stockage temporaire pour la simulation
-SIMULATION_DATA = {
-    'temps_travail': [],
-    'historique': [],
-    'sessions': []
-}
+# Phases chronométrées du démarrage (bootstrap, warm_up) et état pour les sondes de santé
+STARTUP = StartupTimer()
+
+# Stockage en mémoire pour la simulation (indexé par opérateur, borné)
+SIMULATION_STORE = SimulationStore(
+    max_records=SIMULATION_CONFIG['max_records'],
+    snapshot_path=SIMULATION_CONFIG['snapshot_path']
+)
+if SIMULATION_CONFIG['snapshot_path']:
+    SIMULATION_STORE.load()
+    SIMULATION_STORE.start_snapshots(SIMULATION_CONFIG['snapshot_interval'])
+
+def build_connection_string(database):
+    """Construit la chaîne de connexion ODBC pour une base donnée"""
+    return (
+        f"DRIVER={DB_CONFIG['driver']};"
+        f"SERVER={DB_CONFIG['server']};"
+        f"DATABASE={database};"
+        f"UID={DB_CONFIG['username']};"
+        f"PWD={DB_CONFIG['password']};"
+        f"TrustServerCertificate={DB_CONFIG['trust_server_certificate']};"
+        f"Encrypt={DB_CONFIG['encrypt']};"
+    )
+
+# Requêtes lentes et profils SQL Server de toutes les requêtes passant par run_query
+QUERY_LOG = QueryLog(**QUERY_LOG_CONFIG)
+install_query_log(QUERY_LOG)
+
+# Un pool de connexions par base configurée (créé au premier emprunt)
+DB_POOLS = {}
+_DB_POOLS_LOCK = threading.Lock()
+
+def get_pool(database):
+    """Retourne le pool de connexions associé à une base"""
+    pool = DB_POOLS.get(database)
+    if pool is None:
+        with _DB_POOLS_LOCK:
+            pool = DB_POOLS.get(database)
+            if pool is None:
+                conn_str = build_connection_string(database)
+                pool = ConnectionPool(
+                    database,
+                    lambda: timed_connect(database, lambda: pyodbc.connect(
+                        conn_str, timeout=deadlines.timeout_seconds(DEADLINE_CONFIG['login_timeout'])
+                    )),
+                    **POOL_CONFIG
+                )
+                DB_POOLS[database] = pool
+    return pool
+
+def get_pools_stats():
+    """Statistiques de tous les pools de connexions"""
+    return {name: pool.stats() for name, pool in list(DB_POOLS.items())}
+
+def acquire_connection(database):
+    """Emprunte une connexion bornée par le budget de la requête HTTP en cours
+    
+    Le temps restant limite l'attente d'une connexion libre, le login et
+    l'exécution des requêtes (annulées par le driver à l'échéance).
+    """
+    pool = get_pool(database)
+    remaining = deadlines.remaining()
+    if remaining is None:
+        return timed_acquire(database, pool.acquire)
+    if remaining <= 0:
+        raise QueryTimeoutError('Budget de la requête épuisé')
+    conn = timed_acquire(database, lambda: pool.acquire(timeout=min(pool.acquire_timeout, remaining)))
+    conn.set_query_timeout(deadlines.timeout_seconds())
+    return conn
+
+def reraise_if_request_timeout(e):
+    """Dans une requête HTTP, un délai dépassé remonte jusqu'à la route (réponse 504)"""
+    if isinstance(e, DatabaseTimeoutError) and deadlines.remaining() is not None:
+        raise e
 
 def get_db_connection():
-    """Crée une connexion à la base de données SQL Server"""
-    try:
-        conn_str = (
-            f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database']};"
-            f"UID={DB_CONFIG['username']};"
-            f"PWD={DB_CONFIG['password']};"
-            f"TrustServerCertificate={DB_CONFIG['trust_server_certificate']};"
-            f"Encrypt={DB_CONFIG['encrypt']};"
-        )
-        conn = pyodbc.connect(conn_str)
-        return conn
+    """Emprunte une connexion à la base de données SQL Server principale"""
+    try:
+        return acquire_connection(DB_CONFIG['database'])
     except Exception as e:
+        reraise_if_request_timeout(e)
         print(f"Erreur de connexion à la base de données: {e}")
         return None
 
 def get_app_db_connection():
-    """Crée une connexion à la base de données de l'application"""
-    try:
-        conn_str = (
-            f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database_app']};"
-            f"UID={DB_CONFIG['username']};"
-            f"PWD={DB_CONFIG['password']};"
-            f"TrustServerCertificate={DB_CONFIG['trust_server_certificate']};"
-            f"Encrypt={DB_CONFIG['encrypt']};"
-        )
-        conn = pyodbc.connect(conn_str)
-        return conn
+    """Emprunte une connexion à la base de données de l'application"""
+    try:
+        return acquire_connection(DB_CONFIG['database_app'])
     except Exception as e:
+        reraise_if_request_timeout(e)
         print(f"Erreur de connexion à la base de données de l'application: {e}")
         return None
 
 def get_fallback_db_connection():
-    """Crée une connexion à la base de données de fallback"""
-    try:
-        conn_str = (
-            f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database_fallback']};"
-            f"UID={DB_CONFIG['username']};"
-            f"PWD={DB_CONFIG['password']};"
-            f"TrustServerCertificate={DB_CONFIG['trust_server_certificate']};"
-            f"Encrypt={DB_CONFIG['encrypt']};"
-        )
-        conn = pyodbc.connect(conn_str)
-        return conn
+    """Emprunte une connexion à la base de données de fallback"""
+    try:
+        return acquire_connection(DB_CONFIG['database_fallback'])
     except Exception as e:
+        reraise_if_request_timeout(e)
         print(f"Erreur de connexion à la base de données de fallback: {e}")
         return None
 
+# Dernier choix de base annoncé dans le journal (le re-sondage périodique ne le répète pas)
+_ANNOUNCED_DATABASE = None
+
+def announce_working_database(choice, message):
+    """Journalise le choix de la base de travail uniquement quand il change"""
+    global _ANNOUNCED_DATABASE
+    if choice != _ANNOUNCED_DATABASE:
+        _ANNOUNCED_DATABASE = choice
+        print(message)
+
 def determine_working_database():
     """Détermine quelle base de données utiliser"""
     global CURRENT_TABLES, USING_FALLBACK, USING_SIMULATION
@@ -87,7 +178,7 @@ def determine_working_database():
     # Si le mode simulation est activé, l'utiliser
     if SIMULATION_MODE:
         USING_SIMULATION = True
-        print("🎭 Mode simulation activé - Données stockées en mémoire")
+        announce_working_database('simulation', "🎭 Mode simulation activé - Données stockées en mémoire")
         return True
     
     # Essayer d'abord SEDI_APP
@@ -97,7 +188,7 @@ def determine_working_database():
         CURRENT_TABLES = APP_TABLES
         USING_FALLBACK = False
         USING_SIMULATION = False
-        print("✅ Utilisation de la base SEDI_APP")
+        announce_working_database('app', "✅ Utilisation de la base SEDI_APP")
         return True
     
     # Fallback vers SEDI_ERP
@@ -107,41 +198,43 @@ def determine_working_database():
         CURRENT_TABLES = FALLBACK_TABLES
         USING_FALLBACK = True
         USING_SIMULATION = False
-        print("⚠️ Utilisation de la base SEDI_ERP (fallback)")
+        announce_working_database('fallback', "⚠️ Utilisation de la base SEDI_ERP (fallback)")
         return True
     
     # Si aucune base n'est accessible, utiliser la simulation
     USING_SIMULATION = True
-    print("🎭 Aucune base accessible - Mode simulation activé")
+    announce_working_database('aucune', "🎭 Aucune base accessible - Mode simulation activé")
     return True
 
 def create_app_database():
     """Crée la base de données SEDI_APP si elle n'existe pas"""
     try:
         # Connexion à master pour créer la base
-        conn_str = (
-            f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE=master;"
-            f"UID={DB_CONFIG['username']};"
-            f"PWD={DB_CONFIG['password']};"
-            f"TrustServerCertificate={DB_CONFIG['trust_server_certificate']};"
-            f"Encrypt={DB_CONFIG['encrypt']};"
-        )
-        conn = pyodbc.connect(conn_str)
+        conn = timed_connect('master', lambda: pyodbc.connect(build_connection_string('master')))
         cursor = conn.cursor()
         
         # Vérifier si la base existe déjà
         check_db_query = f"SELECT name FROM sys.databases WHERE name = '{DB_CONFIG['database_app']}'"
-        cursor.execute(check_db_query)
-        db_exists = cursor.fetchone()
+        db_exists = run_query(cursor, 'base_app_existe', check_db_query, fetch='one')
         
         if not db_exists:
             # Création de la base de données (sans transaction)
             create_db_query = f"CREATE DATABASE [{DB_CONFIG['database_app']}]"
-            cursor.execute(create_db_query)
+            run_query(cursor, 'base_app_creation', create_db_query)
             conn.commit()
             print(f"✅ Base de données {DB_CONFIG['database_app']} créée")
+            # Une base tout juste créée peut rester quelques instants hors ligne
+            online = poll_until(
+                lambda: (run_query(
+                    cursor, 'base_app_en_ligne', "SELECT state_desc FROM sys.databases WHERE name = ?",
+                    (DB_CONFIG['database_app'],), fetch='one'
+                ) or [None])[0] == 'ONLINE',
+                STARTUP_CONFIG['database_online_timeout'],
+                STARTUP_CONFIG['poll_interval'], STARTUP_CONFIG['poll_max_interval']
+            )
+            if not online:
+                print(f"⚠️ Base {DB_CONFIG['database_app']} toujours hors ligne après "
+                      f"{STARTUP_CONFIG['database_online_timeout']}s")
         else:
             print(f"✅ Base de données {DB_CONFIG['database_app']} existe déjà")
         
@@ -162,20 +255,8 @@ def create_app_tables():
             print("🎭 Mode simulation - Pas de création de tables nécessaire")
             return True
         
-        # Attendre un peu que la base soit créée
-        import time
-        time.sleep(2)
-        
-        # Déterminer quelle base utiliser
-        if not determine_working_database():
-            return False
-        
-        # Utiliser la connexion appropriée
-        if USING_FALLBACK:
-            conn = get_fallback_db_connection()
-        else:
-            conn = get_app_db_connection()
-            
+        # Utiliser la connexion appropriée (base déjà déterminée par l'appelant)
+        conn = get_working_db_connection()
         if not conn:
             print("❌ Impossible de se connecter pour créer les tables")
             return False
@@ -235,21 +316,21 @@ def create_app_tables():
         # Exécution des créations une par une
         tables_created = 0
         try:
-            cursor.execute(create_temps_table)
+            run_query(cursor, 'creation_table_temps', create_temps_table)
             print("✅ Table ABTEMPS_OPERATEURS créée")
             tables_created += 1
         except Exception as e:
             print(f"⚠️ Erreur création table ABTEMPS_OPERATEURS: {e}")
         
         try:
-            cursor.execute(create_historique_table)
+            run_query(cursor, 'creation_table_historique', create_historique_table)
             print("✅ Table ABHISTORIQUE_OPERATEURS créée")
             tables_created += 1
         except Exception as e:
             print(f"⚠️ Erreur création table ABHISTORIQUE_OPERATEURS: {e}")
         
         try:
-            cursor.execute(create_sessions_table)
+            run_query(cursor, 'creation_table_sessions', create_sessions_table)
             print("✅ Table ABSESSIONS_OPERATEURS créée")
             tables_created += 1
         except Exception as e:
@@ -270,53 +351,593 @@ def create_app_tables():
         print(f"❌ Erreur lors de la création des tables: {e}")
         return False
 
-def ensure_tables_exist():
-    """Vérifie et crée les tables si elles n'existent pas"""
+def check_app_tables(conn):
+    """Retourne la liste des tables de l'application absentes (une seule requête)"""
+    tables = [
+        CURRENT_TABLES['temps_travail'],
+        CURRENT_TABLES['historique'],
+        CURRENT_TABLES['sessions']
+    ]
+    cursor = conn.cursor()
+    row = run_query(
+        cursor, 'tables_app_presentes',
+        "SELECT " + ", ".join(f"OBJECT_ID(N'{table}', N'U')" for table in tables),
+        fetch='one'
+    )
+    return [table for table, object_id in zip(tables, row) if object_id is None]
+
+# État de la base mis en cache : résolu au démarrage puis re-sondé en arrière-plan
+DB_STATE = {
+    'ready': False,
+    'checked_at': None,     # time.monotonic() du dernier sondage
+    'last_error': None,
+    'probes': 0
+}
+_DB_STATE_LOCK = threading.Lock()
+_DB_STATE_PROBE_LOCK = threading.Lock()
+_DB_STATE_REPROBE = threading.Event()
+_DB_STATE_MONITOR = None
+
+def refresh_database_state():
+    """Sonde les bases, choisit les tables à utiliser et crée celles qui manquent"""
+    ready = False
+    error = None
     try:
-        # Si en mode simulation, pas besoin de vérifier les tables
+        determine_working_database()
         if USING_SIMULATION:
-            return True
-        
-        # Déterminer quelle base utiliser
-        if not determine_working_database():
-            return False
-        
-        # Utiliser la connexion appropriée
-        if USING_FALLBACK:
-            conn = get_fallback_db_connection()
+            ready = True
         else:
-            conn = get_app_db_connection()
-            
+            conn = get_working_db_connection()
+            if conn:
+                try:
+                    missing_tables = check_app_tables(conn)
+                finally:
+                    conn.close()
+                if missing_tables:
+                    print(f"⚠️ Tables manquantes détectées: {missing_tables}")
+                    ready = create_app_tables()
+                else:
+                    ready = True
+                if ready and not USING_SIMULATION:
+                    run_schema_migrations()
+            else:
+                error = 'Connexion impossible'
+    except Exception as e:
+        error = str(e)
+        print(f"❌ Erreur lors de la vérification des tables: {e}")
+    
+    with _DB_STATE_LOCK:
+        DB_STATE['ready'] = ready
+        DB_STATE['checked_at'] = time.monotonic()
+        DB_STATE['last_error'] = error
+        DB_STATE['probes'] += 1
+    return ready
+
+# Bases dont le schéma a déjà été migré par ce processus
+_MIGRATED_DATABASES = set()
+
+def run_schema_migrations():
+    """Applique les migrations de schéma en attente sur la base de travail (une fois par base)"""
+    version_table = schema_version_table(CURRENT_TABLES)
+    if version_table in _MIGRATED_DATABASES:
+        return True
+    conn = get_working_db_connection()
+    if not conn:
+        return False
+    try:
+        apply_migrations(conn, CURRENT_TABLES)
+        _MIGRATED_DATABASES.add(version_table)
+        return True
+    except Exception as e:
+        # Les index accélèrent les lectures mais ne conditionnent pas le fonctionnement
+        print(f"⚠️ Migrations de schéma non appliquées: {e}")
+        return False
+    finally:
+        conn.close()
+
+def _database_state_loop():
+    """Re-sonde l'état de la base à intervalle régulier ou après une erreur"""
+    while True:
+        _DB_STATE_REPROBE.wait(DB_STATE_CONFIG['ttl'])
+        _DB_STATE_REPROBE.clear()
+        refresh_database_state()
+        # Éviter de marteler le serveur si les erreurs s'enchaînent
+        time.sleep(DB_STATE_CONFIG['min_reprobe_interval'])
+
+def start_database_state_monitor():
+    """Démarre le thread de surveillance de l'état de la base (une seule fois)"""
+    global _DB_STATE_MONITOR
+    with _DB_STATE_LOCK:
+        if _DB_STATE_MONITOR is not None:
+            return
+        _DB_STATE_MONITOR = threading.Thread(
+            target=_database_state_loop, name='db-state-monitor', daemon=True
+        )
+        _DB_STATE_MONITOR.start()
+
+def mark_database_error():
+    """Signale une erreur base de données : l'état sera re-sondé en arrière-plan"""
+    _DB_STATE_REPROBE.set()
+
+def ensure_tables_exist():
+    """Indique si les tables sont utilisables, d'après l'état mis en cache"""
+    if STARTUP.running:
+        # Requête arrivée pendant l'initialisation : attendre sa fin plutôt que sonder en double
+        remaining = deadlines.remaining()
+        wait = STARTUP_CONFIG['request_wait']
+        STARTUP.wait(wait if remaining is None else min(wait, remaining))
+    if DB_STATE['checked_at'] is None:
+        # Premier appel sans démarrage préalable : sondage synchrone unique
+        with _DB_STATE_PROBE_LOCK:
+            if DB_STATE['checked_at'] is None:
+                refresh_database_state()
+        start_database_state_monitor()
+    if not DB_STATE['ready']:
+        mark_database_error()
+    return DB_STATE['ready']
+
+# Colonnes communes à ABTEMPS_OPERATEURS et ABHISTORIQUE_OPERATEURS
+OPERATION_COLUMNS = (
+    'Ident', 'DateTravail', 'CodeLanctImprod', 'Phase', 'CodeRubrique',
+    'VarNumUtil8', 'VarNumUtil9', 'Statut'
+)
+
+def get_working_db_connection():
+    """Emprunte une connexion à la base de travail courante (SEDI_APP ou fallback)"""
+    if USING_FALLBACK:
+        return get_fallback_db_connection()
+    return get_app_db_connection()
+
+# Écriture groupée des démarrages / fins de travail (optionnelle)
+WRITE_BATCHER = GroupCommitWriter(
+    get_working_db_connection,
+    max_batch=WRITE_BATCH_CONFIG['max_batch'],
+    max_delay_ms=WRITE_BATCH_CONFIG['max_delay_ms']
+) if WRITE_BATCH_CONFIG['enabled'] else None
+
+def insert_operation(table, values):
+    """Insère une ligne d'opération et retourne son NoEnreg généré
+    
+    Passe par l'écrivain groupé s'il est activé, sinon par une transaction dédiée.
+    Lève ConnectionError si aucune connexion n'est disponible et
+    DatabaseTimeoutError si le budget de la requête est dépassé.
+    """
+    if WRITE_BATCHER is not None:
+        timeout = WRITE_BATCH_CONFIG['result_timeout']
+        remaining = deadlines.remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        return WRITE_BATCHER.insert(table, OPERATION_COLUMNS, values, timeout=timeout)
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
+        cursor = conn.cursor()
+        no_enreg = run_query(
+            cursor, 'insertion_operation', build_insert(table, OPERATION_COLUMNS), values, fetch='one'
+        )[0]
+        conn.commit()
+        return no_enreg
+    finally:
+        conn.close()
+
+def ingest_events(events):
+    """Écrit les événements de tablette encore inconnus en une transaction
+
+    Retourne {eventId: (clé de table, NoEnreg, doublon)}. Si un envoi
+    concurrent des mêmes eventId l'emporte (contrainte d'unicité), le lot est
+    rejoué une fois : ses événements sont alors reconnus comme doublons.
+    """
+    for attempt in range(2):
+        conn = get_working_db_connection()
         if not conn:
-            return False
-        
+            raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+        try:
+            return write_events(conn, CURRENT_TABLES, OPERATION_COLUMNS, events)
+        except Exception as e:
+            if attempt == 0 and is_duplicate_key_error(e):
+                print(f"🔁 Événements envoyés en double simultanément, nouvelle tentative: {e}")
+                continue
+            raise
+        finally:
+            conn.close()
+
+# eventId déjà ingérés en mode simulation (en base : table AB_EVENEMENTS_TABLETTES)
+SIMULATION_EVENTS = EventLedger(BATCH_INGEST_CONFIG['simulation_ledger_size'])
+
+def simulate_event(event):
+    """Enregistre un événement de tablette dans le stockage de simulation"""
+    minutes, seconds = event.temps
+    record = SIMULATION_STORE.add(
+        event.table_key,
+        ident=event.ident,
+        date_travail=event.date_travail,
+        code_lanct_improd=event.code_lancement,
+        phase=event.phase,
+        code_rubrique=event.values[4],
+        var_num_util8=minutes,
+        var_num_util9=seconds,
+        statut=event.statut
+    )
+    return event.table_key, record.no_enreg
+
+# Flux temps réel du tableau de bord admin (SSE)
+# Chaque client garde un thread du worker : au plus un quart, le reste sert les tablettes
+LIVE_FEED_MAX_CLIENTS = LIVE_FEED_CONFIG['max_clients'] or max(
+    1, int(os.environ.get('SEDI_THREADS', SERVER_CONFIG['threads'])) // 4
+)
+LIVE_FEED = EventBroker(
+    replay_size=LIVE_FEED_CONFIG['replay_size'],
+    max_queue=LIVE_FEED_CONFIG['client_queue_size']
+)
+
+# Colonnes diffusées par table : (type d'événement, colonne de date, durée en secondes)
+LIVE_FEED_TABLES = {
+    'temps_travail': ('operation', 'DateTravail', 'ISNULL(VarNumUtil8, 0) * 60 + ISNULL(VarNumUtil9, 0)'),
+    'historique': ('operation', 'DateTravail', 'ISNULL(VarNumUtil8, 0) * 60 + ISNULL(VarNumUtil9, 0)'),
+    'sessions': ('session', 'DateDebut', 'DureeTravail')
+}
+
+def live_event(table_key, no_enreg, ident, date, code_lancement, phase, statut, date_creation=None,
+               duree_secondes=None):
+    """Événement du flux temps réel pour une ligne d'une table de l'application"""
+    return {
+        'table': table_key,
+        'noEnreg': no_enreg,
+        'operateurId': ident,
+        'date': date.isoformat() if date else None,
+        'codeLancement': code_lancement,
+        'phase': phase,
+        'statut': statut,
+        'dateCreation': (date_creation or datetime.now()).isoformat(),
+        'dureeSecondes': duree_secondes
+    }
+
+def poll_live_changes(watermarks):
+    """Nouvelles lignes des tables de l'application depuis le dernier sondage (un aller-retour)
+    
+    Les points de reprise sont indexés par nom complet de table : après une
+    bascule SEDI_APP / fallback, les nouvelles tables repartent de leur fin.
+    """
+    if USING_SIMULATION:
+        return [], watermarks or {}
+    tables = {key: CURRENT_TABLES[key] for key in LIVE_FEED_TABLES}
+    watermarks = {
+        table: watermarks[table]
+        for table in tables.values() if watermarks and table in watermarks
+    }
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
         cursor = conn.cursor()
-        
-        # Vérifier si les tables existent
-        tables_to_check = [
-            CURRENT_TABLES['temps_travail'],
-            CURRENT_TABLES['historique'],
-            CURRENT_TABLES['sessions']
+        new_tables = [table for table in tables.values() if table not in watermarks]
+        if new_tables:
+            # Premier sondage : on part de la fin, sans rien diffuser
+            watermarks.update(zip(new_tables, run_query(cursor, 'flux_points_reprise', "SELECT " + ", ".join(
+                f"(SELECT ISNULL(MAX(NoEnreg), 0) FROM {table})" for table in new_tables
+            ), fetch='one')))
+        
+        limit = LIVE_FEED_CONFIG['max_events_per_poll']
+        statements = []
+        params = []
+        for key, table in tables.items():
+            _, date_column, duration = LIVE_FEED_TABLES[key]
+            statements.append(f"""
+            SELECT TOP ({limit}) NoEnreg, Ident, {date_column}, CodeLanctImprod, Phase, Statut, DateCreation,
+                   {duration}
+            FROM {table} WHERE NoEnreg > ? ORDER BY NoEnreg""")
+            params.append(watermarks[table])
+        run_query(cursor, 'flux_nouvelles_lignes', "SET NOCOUNT ON;" + ";".join(statements), params)
+        
+        events = []
+        for index, (key, table) in enumerate(tables.items()):
+            if index > 0:
+                cursor.nextset()
+            for row in cursor.fetchall():
+                events.append((table, LIVE_FEED_TABLES[key][0], row[0], live_event(key, *row), (key, row[0])))
+                watermarks[table] = row[0]
+        return events, watermarks
+    finally:
+        conn.close()
+
+def remote_operation_written(event):
+    """Ligne écrite par un autre worker (vue par le sondage) : mêmes synthèses que operation_written"""
+    if event['table'] not in ('temps_travail', 'historique'):
+        return
+    date_travail = datetime.fromisoformat(event['date']) if event['date'] else None
+    apply_operation(event['table'], event['operateurId'], date_travail, event['codeLancement'],
+                    event['phase'], event['dureeSecondes'] or 0, datetime.fromisoformat(event['dateCreation']))
+
+LIVE_POLLER = ChangePoller(
+    LIVE_FEED, poll_live_changes, interval=LIVE_FEED_CONFIG['poll_interval'], listener=remote_operation_written
+)
+
+def follow_other_workers():
+    """Lecture des synthèses du jour : le sondage partagé y reporte les écritures des autres workers"""
+    if USING_SIMULATION:
+        return
+    LIVE_POLLER.start()
+    if LIVE_POLLER.want(LIVE_FEED_CONFIG['follow_seconds']):
+        # La sonde était au repos : ce qui a été écrit entre-temps n'a pas été suivi
+        LAUNCH_SUMMARY.reconcile()
+        DAY_ROLLUP.expire()
+
+def day_bounds(day):
+    """[début, fin[ d'une journée, pour un filtre sargable sur DateTravail"""
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def duration_seconds(minutes, seconds):
+    """Durée saisie sur la tablette (minutes + secondes) en secondes ; 0 si invalide"""
+    try:
+        return int(minutes or 0) * 60 + int(seconds or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def load_launch_summary(day):
+    """Agrégat des lancements du jour pour la réconciliation de LAUNCH_SUMMARY (une requête)"""
+    start, end = day_bounds(day)
+    if USING_SIMULATION:
+        groups = {}
+        for table_key, source in (('temps_travail', 'D'), ('historique', 'T')):
+            for record in SIMULATION_STORE.records(table_key):
+                date_travail = record.date_travail.replace(tzinfo=None)
+                if not start <= date_travail < end:
+                    continue
+                key = (str(record.code_lanct_improd or '').strip(), str(record.phase or '').strip(), source)
+                count, duree, activite, ident, debut = groups.get(key, (0, 0, None, None, None))
+                groups[key] = (
+                    count + 1,
+                    duree + duration_seconds(record.var_num_util8, record.var_num_util9),
+                    max(activite, record.date_creation) if activite else record.date_creation,
+                    min(ident, record.ident) if ident else record.ident,
+                    min(debut, date_travail) if debut else date_travail
+                )
+        return [key + values for key, values in groups.items()]
+    
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
+        cursor = conn.cursor()
+        return run_query(cursor, 'synthese_lancements_jour', f"""
+        SELECT RTRIM(LTRIM(CodeLanctImprod)), RTRIM(LTRIM(Phase)), 'D', COUNT(*), 0,
+               MAX(DateCreation), MIN(Ident), MIN(DateTravail)
+        FROM {CURRENT_TABLES['temps_travail']}
+        WHERE DateTravail >= ? AND DateTravail < ?
+        GROUP BY RTRIM(LTRIM(CodeLanctImprod)), RTRIM(LTRIM(Phase))
+        UNION ALL
+        SELECT RTRIM(LTRIM(CodeLanctImprod)), RTRIM(LTRIM(Phase)), 'T', COUNT(*),
+               SUM(ISNULL(VarNumUtil8, 0) * 60 + ISNULL(VarNumUtil9, 0)),
+               MAX(DateCreation), MIN(Ident), MIN(DateTravail)
+        FROM {CURRENT_TABLES['historique']}
+        WHERE DateTravail >= ? AND DateTravail < ?
+        GROUP BY RTRIM(LTRIM(CodeLanctImprod)), RTRIM(LTRIM(Phase))
+        """, (start, end, start, end), fetch='all')
+    finally:
+        conn.close()
+
+# Synthèse par lancement du jour (/api/lancements-status, /api/lancements-simple)
+LAUNCH_SUMMARY = LaunchSummary(load_launch_summary, **LAUNCH_SUMMARY_CONFIG)
+
+def load_day_records(day, idents=None):
+    """Enregistrements du jour (démarrages 'D' et fins 'T') en une requête, tous opérateurs ou idents"""
+    start, end = day_bounds(day)
+    if USING_SIMULATION:
+        wanted = set(idents) if idents is not None else None
+        records = []
+        for table_key, source in (('temps_travail', 'D'), ('historique', 'T')):
+            for record in SIMULATION_STORE.records(table_key):
+                ident = str(record.ident).strip()
+                if wanted is not None and ident not in wanted:
+                    continue
+                if start <= record.date_travail.replace(tzinfo=None) < end:
+                    records.append(dict(record.to_dict(), ident=ident, source=source))
+        records.sort(key=lambda r: (r['ident'], r['dateTravail'] or '', r['noEnreg']))
+        return records
+    
+    ident_filter = ''
+    params = [start, end]
+    if idents is not None:
+        ident_filter = f"AND Ident IN ({', '.join('?' * len(idents))})"
+        params.extend(idents)
+    columns = "NoEnreg, Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique, VarNumUtil8, VarNumUtil9, Statut"
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
+        cursor = conn.cursor()
+        rows = run_query(cursor, 'enregistrements_jour', f"""
+        SELECT 'D', {columns} FROM {CURRENT_TABLES['temps_travail']}
+        WHERE DateTravail >= ? AND DateTravail < ? {ident_filter}
+        UNION ALL
+        SELECT 'T', {columns} FROM {CURRENT_TABLES['historique']}
+        WHERE DateTravail >= ? AND DateTravail < ? {ident_filter}
+        ORDER BY 3, 4, 2
+        """, params + params, fetch='all')
+        return [
+            {
+                'source': row[0],
+                'noEnreg': row[1],
+                'ident': str(row[2]).strip(),
+                'dateTravail': row[3].isoformat() if row[3] else None,
+                'codeLanctImprod': row[4],
+                'phase': row[5],
+                'codeRubrique': row[6],
+                'varNumUtil8': row[7],
+                'varNumUtil9': row[8],
+                'statut': row[9]
+            }
+            for row in rows
         ]
-        
-        missing_tables = []
-        for table in tables_to_check:
-            try:
-                cursor.execute(f"SELECT TOP 1 * FROM {table}")
-            except Exception:
-                missing_tables.append(table)
-        
-        if missing_tables:
-            print(f"⚠️ Tables manquantes détectées: {missing_tables}")
-            # Créer les tables manquantes
-            return create_app_tables()
-        
+    finally:
+        conn.close()
+
+# Lancements du jour par opérateur (vues "journée" du tableau de bord)
+DAY_ROLLUP = DailyOperatorRollup(load_day_records, **DAY_ROLLUP_CONFIG)
+
+def operation_written(table_key, no_enreg, ident, date_travail, code_lancement, phase, statut,
+                      duree_secondes=0):
+    """Une écriture de ce processus : flux temps réel et synthèses en mémoire mis à jour"""
+    if not USING_SIMULATION:
+        LIVE_POLLER.mark_published(CURRENT_TABLES[table_key], no_enreg)
+    LIVE_FEED.publish(
+        LIVE_FEED_TABLES[table_key][0],
+        live_event(table_key, no_enreg, ident, date_travail, code_lancement, phase, statut,
+                   duree_secondes=duree_secondes),
+        (table_key, no_enreg)
+    )
+    apply_operation(table_key, ident, date_travail, code_lancement, phase, duree_secondes)
+
+def apply_operation(table_key, ident, date_travail, code_lancement, phase, duree_secondes=0, activite=None):
+    """Report d'un démarrage / d'une fin (de ce worker ou d'un autre) dans les synthèses du jour"""
+    # DATETIME SQL Server : l'heure murale est conservée, le fuseau ignoré
+    date_travail = date_travail.replace(tzinfo=None) if date_travail else None
+    DAY_ROLLUP.invalidate(str(ident).strip())
+    code_lancement = str(code_lancement or '').strip()
+    phase = str(phase or '').strip()
+    if table_key == 'temps_travail':
+        LAUNCH_SUMMARY.record_start(code_lancement, phase, ident, date_travail, activite)
+    elif table_key == 'historique':
+        LAUNCH_SUMMARY.record_stop(code_lancement, phase, ident, date_travail, duree_secondes, activite)
+
+# Colonnes écrites à l'ouverture d'une session (ABSESSIONS_OPERATEURS)
+SESSION_COLUMNS = ('Ident', 'DateDebut', 'CodeLanctImprod', 'Phase', 'CodeRubrique', 'Statut', 'DureePause')
+
+# Identifiants des sessions du mode simulation (pas de table)
+SIMULATION_SESSION_IDS = itertools.count(1)
+
+def load_open_sessions(ident=None):
+    """Sessions ouvertes (ACTIVE / PAUSE), toutes ou d'un opérateur ; None en mode simulation"""
+    if USING_SIMULATION:
+        return None
+    ident_filter = ''
+    params = [ACTIVE, PAUSED]
+    if ident is not None:
+        ident_filter = 'AND Ident = ?'
+        params.append(ident)
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
+        cursor = conn.cursor()
+        return run_query(
+            cursor, 'sessions_ouvertes' if ident is None else 'sessions_ouvertes_operateur', f"""
+        SELECT NoEnreg, Ident, DateDebut, CodeLanctImprod, Phase, CodeRubrique, Statut, DatePause, DureePause
+        FROM {CURRENT_TABLES['sessions']}
+        WHERE Statut IN (?, ?) {ident_filter}
+        """, params, fetch='all')
+    finally:
         conn.close()
+
+def insert_session(session):
+    """Ouvre une session en base et retourne son NoEnreg"""
+    if USING_SIMULATION:
+        return next(SIMULATION_SESSION_IDS)
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
+        cursor = conn.cursor()
+        no_enreg = run_query(
+            cursor, 'insertion_session', build_insert(CURRENT_TABLES['sessions'], SESSION_COLUMNS),
+            (session.ident, session.date_debut, session.code_lancement, session.phase,
+             session.code_rubrique, session.statut, session.duree_pause),
+            fetch='one'
+        )[0]
+        conn.commit()
+        return no_enreg
+    finally:
+        conn.close()
+
+def update_session(session, expected_statut):
+    """Écrit une transition ; False si la session n'était plus dans le statut attendu"""
+    if USING_SIMULATION:
         return True
-        
+    conn = get_working_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+    try:
+        cursor = conn.cursor()
+        cursor = run_query(cursor, 'transition_session', f"""
+        UPDATE {CURRENT_TABLES['sessions']}
+        SET Statut = ?, DatePause = ?, DureePause = ?, DateFin = ?, DureeTravail = ?
+        WHERE NoEnreg = ? AND Statut = ?
+        """, (session.statut, session.date_pause, session.duree_pause, session.date_fin,
+              session.worked_seconds() if session.date_fin else None,
+              session.no_enreg, expected_statut))
+        updated = cursor.rowcount == 1
+        conn.commit()
+        return updated
+    finally:
+        conn.close()
+
+# Sessions ouvertes par opérateur ("qui travaille sur quoi" sans requête)
+SESSIONS = SessionRegistry(load_open_sessions, insert_session, update_session, **SESSION_CONFIG)
+
+def begin_work_session(data, reload=True):
+    """Ouvre (ou reprend) la session serveur d'un démarrage ; un échec n'annule pas le démarrage écrit"""
+    try:
+        session, paused = SESSIONS.begin(
+            data['operateurId'], data['codeLancement'], data.get('phase', ''), data.get('codeRubrique', ''),
+            reload=reload
+        )
     except Exception as e:
-        print(f"❌ Erreur lors de la vérification des tables: {e}")
-        return False
+        print(f"⚠️ Session non ouverte pour {data['operateurId']}: {e}")
+        return None
+    if paused is not None:
+        print(f"⏸️ {paused.ident} : {paused.code_lancement} mis en pause (démarrage de {session.code_lancement})")
+    return session
+
+def closing_work_session(data):
+    """Session que la fin de travail va fermer, durée arrêtée maintenant, sans rien écrire (None si inconnue)"""
+    try:
+        return SESSIONS.preview_finish(data['operateurId'], data['codeLancement'], data.get('phase'))
+    except Exception as e:
+        print(f"⚠️ Session non lue pour {data['operateurId']}: {e}")
+        return None
+
+def finish_work_session(data, now=None, reload=True):
+    """Ferme la session du lancement terminé ; None si aucune session n'est connue
+
+    À appeler une fois la ligne d'historique écrite : si l'insertion échoue, la
+    session reste ouverte et le renvoi de la tablette retrouve sa durée.
+    reload=False après closing_work_session (sessions déjà relues).
+    """
+    try:
+        return SESSIONS.finish(data['operateurId'], data['codeLancement'], data.get('phase'),
+                               now=now, reload=reload)
+    except Exception as e:
+        print(f"⚠️ Session non fermée pour {data['operateurId']}: {e}")
+        return None
+
+def apply_event_sessions(events):
+    """Ouvre / ferme les sessions des événements hors ligne nouvellement enregistrés, dans l'ordre de saisie
+
+    Les sessions d'un opérateur sont relues une seule fois par lot.
+    """
+    reloaded = set()
+    for event in events:
+        data = {
+            'operateurId': event.ident,
+            'codeLancement': event.code_lancement,
+            'phase': event.phase,
+            'codeRubrique': event.values[4]
+        }
+        reload = event.ident not in reloaded
+        reloaded.add(event.ident)
+        if event.table_key == 'historique':
+            finish_work_session(data, reload=reload)
+        else:
+            begin_work_session(data, reload=reload)
+
+def work_duration(data, session):
+    """(minutes, secondes, source) : durée du serveur si la session est connue, sinon celle de la tablette"""
+    if session is not None:
+        minutes, seconds = divmod(session.worked_seconds(), 60)
+        return minutes, seconds, 'serveur'
+    return data.get('tempsMinutes', 0), data.get('tempsSecondes', 0), 'tablette'
 
 def test_connection():
     """Teste la connexion à la base de données"""
@@ -324,8 +945,7 @@ def test_connection():
     if conn:
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            result = cursor.fetchone()
+            run_query(cursor, 'test_connexion', "SELECT 1", fetch='one')
             conn.close()
             return True
         except Exception as e:
@@ -333,147 +953,352 @@ def test_connection():
             return False
     return False
 
-def export_data_to_erp():
-    """Exporte les données de SEDI_APP_INDEPENDANTE vers l'ERP SILOG"""
+# Archivage mensuel de l'historique : la table courante ne garde que horizon_days jours
+# (jamais quand la base de travail est la base de repli SEDI_ERP)
+HISTORY_ARCHIVE = HistoryArchive(get_working_db_connection, lambda: CURRENT_TABLES,
+                                 active=lambda: not USING_FALLBACK, **ARCHIVE_CONFIG)
+
+# Table de staging ERP et table du point de reprise (high-water mark) de l'export
+ERP_IMPORT_TABLE = '[SEDI_ERP].[dbo].[TEMP_IMPORT_APP]'
+ERP_WATERMARK_TABLE = '[SEDI_ERP].[dbo].[TEMP_IMPORT_APP_WATERMARK]'
+# État des exports, partagé entre workers (avancement, annulation)
+ERP_EXPORT_JOBS_TABLE = '[SEDI_ERP].[dbo].[TEMP_IMPORT_APP_JOBS]'
+
+EXPORT_COLUMNS = (
+    'NoEnreg, Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique, '
+    'VarNumUtil8, VarNumUtil9, Statut, DateCreation'
+)
+
+def ensure_export_tables(cursor_erp):
+    """Crée la table de staging et la table du point de reprise dans l'ERP"""
+    run_query(cursor_erp, 'export_creation_staging', f"""
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'{ERP_IMPORT_TABLE}') AND type in (N'U'))
+    CREATE TABLE {ERP_IMPORT_TABLE} (
+        NoEnreg INT,
+        Ident NVARCHAR(50),
+        DateTravail DATETIME,
+        CodeLanctImprod NVARCHAR(50),
+        Phase NVARCHAR(50),
+        CodeRubrique NVARCHAR(50),
+        VarNumUtil8 INT,
+        VarNumUtil9 INT,
+        Statut NVARCHAR(20),
+        DateCreation DATETIME
+    )
+    """)
+    run_query(cursor_erp, 'export_creation_reprise', f"""
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'{ERP_WATERMARK_TABLE}') AND type in (N'U'))
+    CREATE TABLE {ERP_WATERMARK_TABLE} (
+        Source NVARCHAR(200) NOT NULL PRIMARY KEY,
+        LastNoEnreg INT NOT NULL,
+        DateMaj DATETIME DEFAULT GETDATE()
+    )
+    """)
+
+def get_export_watermark(cursor_erp, source):
+    """Dernier NoEnreg exporté pour une table source (0 si jamais exporté)"""
+    row = run_query(
+        cursor_erp, 'export_point_reprise',
+        f"SELECT LastNoEnreg FROM {ERP_WATERMARK_TABLE} WHERE Source = ?", (source,), fetch='one'
+    )
+    return row[0] if row else 0
+
+def set_export_watermark(cursor_erp, source, last_no_enreg):
+    """Avance le point de reprise (dans la transaction du lot exporté)"""
+    run_query(cursor_erp, 'export_maj_point_reprise', f"""
+    UPDATE {ERP_WATERMARK_TABLE} SET LastNoEnreg = ?, DateMaj = GETDATE() WHERE Source = ?
+    IF @@ROWCOUNT = 0
+        INSERT INTO {ERP_WATERMARK_TABLE} (Source, LastNoEnreg) VALUES (?, ?)
+    """, (last_no_enreg, source, source, last_no_enreg))
+
+def export_data_to_erp(job=None):
+    """Exporte de façon incrémentale l'historique de SEDI_APP_INDEPENDANTE vers l'ERP SILOG
+    
+    Seuls les enregistrements postérieurs au dernier NoEnreg exporté sont lus, par lots
+    (fetchmany) insérés en masse (fast_executemany). Chaque lot et l'avancée du point de
+    reprise sont validés dans la même transaction : une relance après un crash reprend
+    exactement là où l'export s'est arrêté, sans doublon.
+    
+    job (optionnel, voir export_jobs.ExportJob) reçoit l'avancement et les erreurs ;
+    une annulation demandée est prise en compte entre deux lots.
+    """
+    source = APP_TABLES['historique']
+    chunk_size = EXPORT_CONFIG['chunk_size']
+    conn_app = None
+    conn_erp = None
+    archive_locked = False
     try:
-        # Connexion à la base autonome
-        conn_app = get_app_db_connection()
-        if not conn_app:
-            print("❌ Impossible de se connecter à la base autonome")
-            return False
-        
-        cursor_app = conn_app.cursor()
-        
-        # Récupérer toutes les données de l'historique
-        query_historique = f"""
-        SELECT 
-            NoEnreg, Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique,
-            VarNumUtil8, VarNumUtil9, Statut, DateCreation
-        FROM {APP_TABLES['historique']}
-        ORDER BY DateCreation
-        """
-        
-        cursor_app.execute(query_historique)
-        historique_data = cursor_app.fetchall()
-        
-        print(f"📊 {len(historique_data)} enregistrements trouvés dans la base autonome")
-        
         # Connexion à l'ERP pour l'export
         conn_erp = get_db_connection()
         if not conn_erp:
             print("❌ Impossible de se connecter à l'ERP")
-            conn_app.close()
+            if job:
+                job.add_error("Impossible de se connecter à l'ERP")
             return False
         
+        # Chaque instruction de l'export (lecture, lot inséré) a son propre délai
+        conn_erp.set_query_timeout(DEADLINE_CONFIG['export_chunk'])
         cursor_erp = conn_erp.cursor()
-        
-        # Créer une table temporaire dans l'ERP pour l'import
-        create_temp_table = """
-        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[SEDI_ERP].[dbo].[TEMP_IMPORT_APP]') AND type in (N'U'))
-        CREATE TABLE [SEDI_ERP].[dbo].[TEMP_IMPORT_APP] (
-            NoEnreg INT,
-            Ident NVARCHAR(50),
-            DateTravail DATETIME,
-            CodeLanctImprod NVARCHAR(50),
-            Phase NVARCHAR(50),
-            CodeRubrique NVARCHAR(50),
-            VarNumUtil8 INT,
-            VarNumUtil9 INT,
-            Statut NVARCHAR(20),
-            DateCreation DATETIME
-        )
-        """
-        
-        cursor_erp.execute(create_temp_table)
+        ensure_export_tables(cursor_erp)
         conn_erp.commit()
         
-        # Insérer les données dans la table temporaire
-        insert_query = """
-        INSERT INTO [SEDI_ERP].[dbo].[TEMP_IMPORT_APP] 
-        (NoEnreg, Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique, VarNumUtil8, VarNumUtil9, Statut, DateCreation)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        watermark = get_export_watermark(cursor_erp, source)
         
-        for row in historique_data:
-            cursor_erp.execute(insert_query, row)
+        # Connexion à la base autonome
+        conn_app = get_app_db_connection()
+        if not conn_app:
+            print("❌ Impossible de se connecter à la base autonome")
+            if job:
+                job.add_error("Impossible de se connecter à la base autonome")
+            return False
         
-        conn_erp.commit()
-        conn_app.close()
-        conn_erp.close()
+        conn_app.set_query_timeout(DEADLINE_CONFIG['export_chunk'])
+        cursor_app = conn_app.cursor()
+        lag = EXPORT_CONFIG['safety_lag_seconds']
         
-        print(f"✅ {len(historique_data)} enregistrements exportés vers [SEDI_ERP].[dbo].[TEMP_IMPORT_APP]")
+        # Pas d'archivage pendant la lecture : une ligne déplacée entre deux sources serait manquée
+        if not HISTORY_ARCHIVE.lock_for_export(cursor_app):
+            print("❌ Archivage de l'historique en cours, export reporté")
+            if job:
+                job.add_error("Archivage de l'historique en cours, réessayez dans quelques instants")
+            return False
+        archive_locked = True
+        # Mois archivés contenant des lignes pas encore exportées (en général aucun)
+        sources = [source] + [
+            month.table for month in HISTORY_ARCHIVE.months(cursor_app, APP_TABLES, force=True)
+            if month.no_enreg_max is not None and month.no_enreg_max > watermark
+        ]
+        condition = "NoEnreg > ? AND DateCreation < DATEADD(second, -?, GETDATE())"
+        
+        if job:
+            total = 0
+            for table in sources:
+                total += run_query(cursor_app, 'export_comptage', f"""
+                SELECT COUNT(*) FROM {table}
+                WHERE {condition}
+                """, (watermark, lag), fetch='one')[0]
+            job.report(0, total)
+        
+        # Les lignes trop récentes sont laissées au prochain export : une transaction
+        # encore ouverte peut détenir un NoEnreg inférieur et valider plus tard.
+        query_historique = '\nUNION ALL\n'.join(
+            f"SELECT {EXPORT_COLUMNS} FROM {table} WHERE {condition}" for table in sources
+        ) + "\nORDER BY 1"
+        run_query(cursor_app, 'export_lecture', query_historique, [watermark, lag] * len(sources))
+        
+        insert_query = f"""
+        INSERT INTO {ERP_IMPORT_TABLE}
+        ({EXPORT_COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        cursor_erp.fast_executemany = True
+        
+        exported = 0
+        while True:
+            if job and job.cancel_requested:
+                print(f"⏹️ Export annulé après {exported} enregistrements (NoEnreg <= {watermark})")
+                return False
+            rows = cursor_app.fetchmany(chunk_size)
+            if not rows:
+                break
+            run_many(cursor_erp, 'export_insertion_lot', insert_query, [tuple(row) for row in rows])
+            watermark = rows[-1][0]
+            set_export_watermark(cursor_erp, source, watermark)
+            conn_erp.commit()
+            exported += len(rows)
+            if job:
+                job.report(exported)
+            print(f"📦 {exported} enregistrements exportés (NoEnreg <= {watermark})")
+        
+        print(f"✅ {exported} nouveaux enregistrements exportés vers {ERP_IMPORT_TABLE}")
         print("📋 Vous pouvez maintenant traiter ces données dans l'ERP SILOG")
         
         return True
         
     except Exception as e:
         print(f"❌ Erreur lors de l'export: {e}")
+        if job:
+            job.add_error(str(e))
         return False
+    finally:
+        if conn_app:
+            if archive_locked:
+                try:
+                    HISTORY_ARCHIVE.unlock_for_export(conn_app.cursor())
+                    conn_app.commit()
+                except Exception as e:
+                    print(f"⚠️ Libération du verrou d'archivage impossible: {e}")
+            conn_app.close()
+        if conn_erp:
+            conn_erp.close()
+
+# Un seul export ERP à la fois (tous workers confondus), exécuté hors du thread de requête
+EXPORT_JOBS = ExportJobManager(export_data_to_erp, store=ExportJobStore(get_db_connection, ERP_EXPORT_JOBS_TABLE))
 
-def get_database_stats():
-    """Affiche les statistiques de la base de données autonome"""
+# Volumétrie des tables de la base autonome (métadonnées SQL Server, mise en cache)
+TABLE_STATS = TableStatsCollector(
+    get_app_db_connection, APP_TABLES, refresh_interval=STATS_CONFIG['refresh_interval']
+)
+
+def get_database_stats(exact=False, force=False):
+    """Statistiques de la base de données autonome (volumes, taille, croissance)"""
     try:
-        conn = get_app_db_connection()
-        if not conn:
-            return None
-        
-        cursor = conn.cursor()
-        
-        # Compter les enregistrements dans chaque table
-        stats = {}
-        
-        for table_name, table_path in APP_TABLES.items():
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {table_path}")
-                count = cursor.fetchone()[0]
-                stats[table_name] = count
-            except Exception as e:
-                stats[table_name] = f"Erreur: {e}"
-        
-        conn.close()
-        return stats
-        
+        return TABLE_STATS.get(exact=exact, force=force)
     except Exception as e:
         print(f"❌ Erreur lors de la récupération des statistiques: {e}")
         return None
 
-@app.route('/api/operateurs', methods=['GET'])
-def get_operateurs():
-    """Récupère tous les opérateurs selon la requête spécifiée"""
+def load_operateurs():
+    """Charge les opérateurs réels depuis [SEDI_ERP].[dbo].[RESSOURC]"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Impossible de se connecter à la base de données')
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Impossible de se connecter à la base de données', 'success': False}), 500
-        
         cursor = conn.cursor()
-        
-        # Requête directe dans SEDI_ERP pour récupérer les opérateurs réels
-        query = '''
-            SELECT TOP (1000) 
+        rows = run_query(cursor, 'annuaire_operateurs', '''
+            SELECT 
                 [Coderessource],
                 [Designation1]
             FROM [SEDI_ERP].[dbo].[RESSOURC]
             WHERE [Typeressource] = 'O'
             ORDER BY [Coderessource]
-        '''
-        
-        cursor.execute(query)
-        operateurs = cursor.fetchall()
-        
-        # Conversion en liste de dictionnaires
-        result = []
-        for row in operateurs:
-            result.append({
-                'operateur': row[0],  # CodeRessource
-                'nom': row[1]         # Designation
-            })
-        
+        ''', fetch='all')
+        return [(row[0], row[1]) for row in rows]
+    finally:
         conn.close()
-        return jsonify({'operateurs': result, 'success': True})
+
+# Annuaire des opérateurs partagé par tous les handlers (rafraîchi en arrière-plan)
+OPERATEURS = OperatorDirectory(load_operateurs, **OPERATOR_DIRECTORY_CONFIG)
+
+# Métriques exposées sur /metrics (format texte Prometheus)
+HTTP_SECONDS = REGISTRY.histogram(
+    'sedi_http_request_duration_seconds', 'Durée des requêtes HTTP par route (compression comprise)',
+    ('endpoint', 'method')
+)
+HTTP_DB_SECONDS = REGISTRY.histogram(
+    'sedi_http_request_db_seconds', 'Part base de données des requêtes HTTP (emprunt au pool et requêtes)',
+    ('endpoint',)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'sedi_http_requests_total', 'Requêtes HTTP par route et code de statut', ('endpoint', 'method', 'status')
+)
+HTTP_EXCEPTIONS = REGISTRY.counter(
+    'sedi_http_exceptions_total', 'Exceptions non interceptées par les routes, par type', ('endpoint', 'type')
+)
+REGISTRY.gauge('sedi_simulation_mode', 'Mode simulation actif (données en mémoire)',
+               collect=lambda: [((), int(USING_SIMULATION))])
+REGISTRY.gauge('sedi_fallback_mode', 'Base de travail de fallback (SEDI_ERP) utilisée',
+               collect=lambda: [((), int(USING_FALLBACK))])
+REGISTRY.gauge('sedi_database_ready', 'Tables de la base de travail utilisables (état en cache)',
+               collect=lambda: [((), int(DB_STATE['ready']))])
+REGISTRY.gauge('sedi_database_up', 'Dernier sondage de la base réussi (heartbeat)', ('database',),
+               collect=lambda: [((name,), None if state['healthy'] is None else int(state['healthy']))
+                                for name, state in HEARTBEAT.summary().items()])
+REGISTRY.gauge('sedi_db_pool_connections', 'Connexions des pools par état', ('database', 'state'),
+               collect=lambda: [((name, state), stats[state])
+                                for name, stats in get_pools_stats().items() for state in ('in_use', 'idle')])
+REGISTRY.gauge('sedi_work_sessions', 'Sessions de travail ouvertes par statut (registre en mémoire)', ('statut',),
+               collect=lambda: [((statut,), count) for statut, count in SESSIONS.counts().items()])
+REGISTRY.gauge('sedi_startup_phase_seconds', 'Durée des phases du dernier démarrage du processus', ('phase',),
+               collect=lambda: [((phase['phase'],), phase['duree_ms'] / 1000.0)
+                                for phase in STARTUP.report()['phases']])
+REGISTRY.gauge('sedi_startup_seconds', 'Durée totale du démarrage du processus (en cours : durée écoulée)',
+               collect=lambda: [((), (STARTUP.report()['duree_ms'] or 0) / 1000.0)])
+REGISTRY.counter_callback('sedi_db_pool_timeouts_total', 'Emprunts abandonnés faute de connexion libre',
+                          ('database',),
+                          collect=lambda: [((name,), stats['timeouts']) for name, stats in get_pools_stats().items()])
+
+def request_endpoint():
+    from flask import request
+    return request.endpoint or 'inconnu'
+
+@app.before_request
+def start_request_timer():
+    """Début de la mesure de la requête HTTP (durée totale et part base de données)"""
+    from flask import g
+    g.request_started = time.perf_counter()
+    start_request_db_timer()
+
+@app.before_request
+def start_request_deadline():
+    """Fixe le budget de temps de la route appelée"""
+    from flask import request
+    deadlines.start(DEADLINE_CONFIG['routes'].get(request.endpoint, DEADLINE_CONFIG['default']))
+
+@app.teardown_request
+def clear_request_deadline(exc):
+    deadlines.clear()
+    if exc is not None:
+        HTTP_EXCEPTIONS.inc(request_endpoint(), type(exc).__name__)
+
+# Enregistré avant la compression : exécuté après elle (ordre inverse des after_request)
+@app.after_request
+def record_request_metrics(response):
+    """Durée, part base de données et statut de la requête HTTP"""
+    from flask import request, g
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        endpoint = request_endpoint()
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+        HTTP_DB_SECONDS.observe(request_db_seconds(), endpoint)
+        HTTP_REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+@app.after_request
+def compress_large_response(response):
+    """Compression gzip / deflate des réponses volumineuses (Wi-Fi d'atelier)"""
+    from flask import request
+    return compress_response(
+        response, request,
+        min_size=RESPONSE_CONFIG['compress_min_size'],
+        level=RESPONSE_CONFIG['compress_level']
+    )
+
+def timeout_response(e):
+    """Délai dépassé : erreur distincte pour que la tablette puisse réessayer
+
+    Une écriture dont l'issue est inconnue (déjà transmise à la base) n'est pas
+    rejouable : la rejouer risquerait de l'enregistrer deux fois.
+    """
+    print(f"⏱️ Délai dépassé: {e}")
+    retryable = getattr(e, 'retryable', True)
+    response = jsonify({
+        'success': False,
+        'error': ERROR_MESSAGES['timeout'] if retryable else ERROR_MESSAGES['uncertain_write'],
+        'code': 'DB_TIMEOUT',
+        'retryable': retryable
+    })
+    if retryable:
+        response.headers['Retry-After'] = str(DEADLINE_CONFIG['retry_after'])
+    return response, 504
+
+@app.route('/api/operateurs', methods=['GET'])
+def get_operateurs():
+    """Récupère tous les opérateurs depuis l'annuaire en mémoire"""
+    try:
+        operateurs = OPERATEURS.all()
+        if not OPERATEURS.loaded:
+            return jsonify({'error': 'Impossible de se connecter à la base de données', 'success': False}), 500
+        from flask import request
+        if wants_columnar(request):
+            return columnar_response({
+                'operateurs': columnar(
+                    ('operateur', 'nom'), [(op['operateur'], op['nom']) for op in operateurs]
+                ),
+                'success': True
+            })
+        return jsonify({'operateurs': operateurs, 'success': True})
         
     except Exception as e:
         return jsonify({'error': str(e), 'success': False}), 500
 
+@app.route('/api/operateurs/refresh', methods=['POST'])
+def refresh_operateurs():
+    """Recharge immédiatement l'annuaire des opérateurs (ajout par les RH)"""
+    if OPERATEURS.invalidate():
+        return jsonify({'success': True, 'directory': OPERATEURS.stats()})
+    return jsonify({'success': False, 'error': 'Rechargement impossible', 'directory': OPERATEURS.stats()}), 500
+
 @app.route('/api/operateurs-badges', methods=['GET'])
 def get_operateurs_badges():
     """Récupère tous les opérateurs qui ont badgé aujourd'hui (avec sessions actives)"""
@@ -484,45 +1309,90 @@ def get_operateurs_badges():
         
         cursor = conn.cursor()
         
-        # Requête pour récupérer les opérateurs avec sessions actives depuis SEDI_ERP
+        # Sessions du jour (intervalle de dates indexable) ; les noms sont résolus
+        # depuis l'annuaire en mémoire
         query = f'''
-            SELECT DISTINCT 
+            SELECT 
                 t.Ident,
-                r.Designation1,
                 COUNT(*) as NombreSessions,
                 MAX(t.DateCreation) as DerniereActivite,
                 t.Statut
             FROM {CURRENT_TABLES['sessions']} t
-            LEFT JOIN [SEDI_ERP].[dbo].[RESSOURC] r ON t.Ident = r.Coderessource
-            WHERE CAST(t.DateDebut AS DATE) = CAST(GETDATE() AS DATE)
-            GROUP BY t.Ident, r.Designation1, t.Statut
+            WHERE t.DateDebut >= CAST(CAST(GETDATE() AS DATE) AS DATETIME)
+              AND t.DateDebut < DATEADD(day, 1, CAST(CAST(GETDATE() AS DATE) AS DATETIME))
+            GROUP BY t.Ident, t.Statut
             ORDER BY MAX(t.DateCreation) DESC
         '''
         
-        cursor.execute(query)
-        operateurs_badges = cursor.fetchall()
+        operateurs_badges = run_query(cursor, 'badges_du_jour', query, fetch='all')
+        conn.close()
+        
+        from flask import request
+        if wants_columnar(request):
+            return columnar_response({
+                'operateurs_badges': columnar(
+                    ('operateur', 'nom', 'nombre_sessions', 'derniere_activite', 'statut'),
+                    [(row[0], OPERATEURS.name(row[0], 'Nom non trouvé'), row[1], row[2], row[3])
+                     for row in operateurs_badges],
+                    date_columns=(3,)
+                ),
+                'success': True
+            })
         
         # Conversion en liste de dictionnaires
         result = []
         for row in operateurs_badges:
             result.append({
                 'operateur': row[0],
-                'nom': row[1] if row[1] else 'Nom non trouvé',
-                'nombre_sessions': row[2],
-                'derniere_activite': row[3].isoformat() if row[3] else None,
-                'statut': row[4]
+                'nom': OPERATEURS.name(row[0], 'Nom non trouvé'),
+                'nombre_sessions': row[1],
+                'derniere_activite': row[2].isoformat() if row[2] else None,
+                'statut': row[3]
             })
         
-        conn.close()
         return jsonify({'operateurs_badges': result, 'success': True})
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({'error': str(e), 'success': False}), 500
 
+def probe_database(database):
+    """Sonde une base via son pool : emprunt puis SELECT 1, avec délai borné"""
+    timeout = HEARTBEAT_CONFIG['timeout']
+    conn = get_pool(database).acquire(timeout=timeout)
+    try:
+        conn.set_query_timeout(timeout)
+        cursor = conn.cursor()
+        run_query(cursor, 'sonde_base', "SELECT 1", fetch='one')
+    finally:
+        conn.close()
+
+# Sondage en arrière-plan de chaque base configurée ; un changement d'état
+# déclenche un nouveau choix SEDI_APP / fallback / simulation
+HEARTBEAT = Heartbeat(
+    {
+        database: (lambda database=database: probe_database(database))
+        for database in dict.fromkeys([DB_CONFIG['database'], DB_CONFIG['database_app'], DB_CONFIG['database_fallback']])
+    },
+    interval=HEARTBEAT_CONFIG['interval'],
+    history_size=HEARTBEAT_CONFIG['history'],
+    on_change=mark_database_error
+)
+
+def cached_connection_status():
+    """État de la base principale d'après le dernier sondage (None si pas encore sondée)"""
+    HEARTBEAT.start()
+    return HEARTBEAT.is_healthy(DB_CONFIG['database'])
+
+def working_database_name():
+    return DB_CONFIG['database_fallback'] if USING_FALLBACK else DB_CONFIG['database_app']
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Point de terminaison pour vérifier que l'API fonctionne"""
-    db_status = "Connecté" if test_connection() else "Non connecté"
+    status = cached_connection_status()
+    db_status = "En attente" if status is None else ("Connecté" if status else "Non connecté")
     return jsonify({
         'status': 'OK', 
         'message': 'API fonctionnelle',
@@ -530,14 +1400,71 @@ def health_check():
         'server': DB_CONFIG['server']
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness : le processus répond (aucun accès base), y compris pendant le démarrage"""
+    return jsonify({'status': 'OK', 'startup': STARTUP.state})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness : d'après l'état en cache de la base de travail (503 tant que le démarrage est en cours)"""
+    if STARTUP.running:
+        return jsonify({'ready': False, 'startup': STARTUP.state}), 503
+    HEARTBEAT.start()
+    if USING_SIMULATION:
+        ready = DB_STATE['ready']
+    else:
+        ready = bool(DB_STATE['ready'] and HEARTBEAT.is_healthy(working_database_name()))
+    return jsonify({
+        'ready': ready,
+        'database': working_database_name(),
+        'fallback': USING_FALLBACK,
+        'simulation': USING_SIMULATION
+    }), (200 if ready else 503)
+
+@app.route('/api/health/details', methods=['GET'])
+def health_details():
+    """Santé détaillée : latences par base, mode fallback/simulation, pools"""
+    HEARTBEAT.start()
+    checked_at = DB_STATE['checked_at']
+    return jsonify({
+        'databases': HEARTBEAT.summary(with_history=True),
+        'heartbeat_interval': HEARTBEAT.interval,
+        'mode': {
+            'working_database': working_database_name(),
+            'fallback': USING_FALLBACK,
+            'simulation': USING_SIMULATION,
+            'tables': CURRENT_TABLES
+        },
+        'db_state': {
+            'ready': DB_STATE['ready'],
+            'last_error': DB_STATE['last_error'],
+            'probes': DB_STATE['probes'],
+            'age_seconds': round(time.monotonic() - checked_at, 1) if checked_at is not None else None
+        },
+        'pools': get_pools_stats(),
+        'startup': STARTUP.report()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métriques du processus au format texte Prometheus"""
+    from flask import Response
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/test-connection', methods=['GET'])
 def test_db_connection():
-    """Teste la connexion à la base de données"""
-    if test_connection():
+    """Teste la connexion à la base de données (résultat du dernier sondage)"""
+    if cached_connection_status():
         return jsonify({'success': True, 'message': 'Connexion à SQL Server réussie'})
     else:
         return jsonify({'success': False, 'message': 'Échec de la connexion à SQL Server'}), 500
 
+@app.route('/api/pool-stats', methods=['GET'])
+def pool_stats():
+    """Statistiques des pools de connexions (en cours, inactives, temps d'attente)"""
+    return jsonify({'success': True, 'pools': get_pools_stats()})
+
 @app.route('/api/test-ressourc', methods=['GET'])
 def test_ressourc_table():
     """Teste l'accès à la table RESSOURC"""
@@ -555,8 +1482,7 @@ def test_ressourc_table():
             WHERE [Typeressource] = 'O'
         '''
         
-        cursor.execute(query)
-        result = cursor.fetchall()
+        result = run_query(cursor, 'test_ressourc', query, fetch='all')
         
         conn.close()
         
@@ -566,6 +1492,8 @@ def test_ressourc_table():
             'sample_data': [{'code': row[0], 'nom': row[1]} for row in result]
         })
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -581,7 +1509,7 @@ def test_permissions():
         
         # Test de lecture sur abetemps_temp
         try:
-            cursor.execute("SELECT TOP 1 * FROM [SEDI_ERP].[GPSQL].[abetemps_temp]")
+            run_query(cursor, 'test_lecture_abetemps', "SELECT TOP 1 * FROM [SEDI_ERP].[GPSQL].[abetemps_temp]")
             read_ok = True
         except Exception as e:
             read_ok = False
@@ -589,7 +1517,7 @@ def test_permissions():
         
         # Test d'écriture sur abetemps_temp (simulation)
         try:
-            cursor.execute("SELECT COUNT(*) FROM [SEDI_ERP].[GPSQL].[abetemps_temp]")
+            run_query(cursor, 'test_comptage_abetemps', "SELECT COUNT(*) FROM [SEDI_ERP].[GPSQL].[abetemps_temp]")
             write_ok = True
         except Exception as e:
             write_ok = False
@@ -607,6 +1535,8 @@ def test_permissions():
             }
         })
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -627,82 +1557,87 @@ def terminer_travail():
         if not ensure_tables_exist():
             return jsonify({'success': False, 'error': 'Impossible de créer les tables nécessaires'}), 500
         
+        # Durée calculée par le serveur (pauses déduites) ; chronomètre de la tablette à défaut.
+        # La session n'est fermée qu'après l'écriture de l'historique (comme au démarrage).
+        session = closing_work_session(data)
+        temps_minutes, temps_secondes, source_duree = work_duration(data, session)
+        
         # Mode simulation
         if USING_SIMULATION:
             from datetime import datetime
-            import time
             
             # Créer un enregistrement simulé
-            record = {
-                'noEnreg': int(time.time()),
-                'ident': data['operateurId'],
-                'dateTravail': datetime.fromisoformat(data['dateTravail'].replace('Z', '+00:00')),
-                'codeLanctImprod': data['codeLancement'],
-                'phase': data['phase'],
-                'codeRubrique': data.get('codeRubrique', ''),
-                'varNumUtil8': data.get('tempsMinutes', 0),
-                'varNumUtil9': data.get('tempsSecondes', 0),
-                'statut': 'TERMINE',
-                'dateCreation': datetime.now()
-            }
-            
-            SIMULATION_DATA['historique'].append(record)
+            record = SIMULATION_STORE.add(
+                'historique',
+                ident=data['operateurId'],
+                date_travail=datetime.fromisoformat(data['dateTravail'].replace('Z', '+00:00')),
+                code_lanct_improd=data['codeLancement'],
+                phase=data['phase'],
+                code_rubrique=data.get('codeRubrique', ''),
+                var_num_util8=temps_minutes,
+                var_num_util9=temps_secondes,
+                statut='TERMINE'
+            )
             
-            print(f"🎭 SIMULATION - Travail terminé: {record}")
+            print(f"🎭 SIMULATION - Travail terminé: {record.to_dict()}")
+            operation_written('historique', record.no_enreg, record.ident, record.date_travail,
+                              record.code_lanct_improd, record.phase, record.statut,
+                              duration_seconds(record.var_num_util8, record.var_num_util9))
+            if session is not None:
+                session = finish_work_session(data, session.date_fin, reload=False) or session
             
             return jsonify({
                 'success': True, 
                 'message': 'Travail terminé - Données simulées en mémoire',
-                'noEnreg': record['noEnreg']
+                'noEnreg': record.no_enreg,
+                'tempsMinutes': temps_minutes,
+                'tempsSecondes': temps_secondes,
+                'sourceDuree': source_duree,
+                'session': session.to_dict() if session is not None else None
             })
         
         # Mode normal avec base de données
-        # Utiliser la connexion appropriée
-        if USING_FALLBACK:
-            conn = get_fallback_db_connection()
-        else:
-            conn = get_app_db_connection()
-            
-        if not conn:
-            return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données de l\'application'}), 500
-        
-        cursor = conn.cursor()
-        
-        # Insertion dans ABHISTORIQUE_OPERATEURS (opérations terminées)
-        query = f'''
-            INSERT INTO {CURRENT_TABLES['historique']} 
-            (Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique, VarNumUtil8, VarNumUtil9, Statut)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-        
         # Conversion de la date
         from datetime import datetime
         date_travail = datetime.fromisoformat(data['dateTravail'].replace('Z', '+00:00'))
         
-        temps_minutes = data.get('tempsMinutes', 0)
-        temps_secondes = data.get('tempsSecondes', 0)
-        
-        cursor.execute(query, (
-            data['operateurId'],
-            date_travail,
-            data['codeLancement'],
-            data['phase'],
-            data.get('codeRubrique', ''),
-            temps_minutes,
-            temps_secondes,
-            'TERMINE'  # Statut pour indiquer que c'est terminé
-        ))
+        # Insertion dans ABHISTORIQUE_OPERATEURS (opérations terminées)
+        try:
+            no_enreg = insert_operation(CURRENT_TABLES['historique'], (
+                data['operateurId'],
+                date_travail,
+                data['codeLancement'],
+                data['phase'],
+                data.get('codeRubrique', ''),
+                temps_minutes,
+                temps_secondes,
+                'TERMINE'  # Statut pour indiquer que c'est terminé
+            ))
+        except ConnectionError:
+            mark_database_error()
+            return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données de l\'application'}), 500
         
-        conn.commit()
-        conn.close()
+        operation_written('historique', no_enreg, data['operateurId'], date_travail,
+                          data['codeLancement'], data['phase'], 'TERMINE',
+                          duration_seconds(temps_minutes, temps_secondes))
+        if session is not None:
+            session = finish_work_session(data, session.date_fin, reload=False) or session
         
         return jsonify({
             'success': True, 
             'message': 'Travail terminé - Données enregistrées dans ABHISTORIQUE_OPERATEURS',
-            'noEnreg': cursor.rowcount
+            'noEnreg': no_enreg,
+            'tempsMinutes': temps_minutes,
+            'tempsSecondes': temps_secondes,
+            'sourceDuree': source_duree,
+            'session': session.to_dict() if session is not None else None
         })
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/demarrer-travail', methods=['POST'])
@@ -725,134 +1660,436 @@ def demarrer_travail():
         # Mode simulation
         if USING_SIMULATION:
             from datetime import datetime
-            import time
             
             # Créer un enregistrement simulé
-            record = {
-                'noEnreg': int(time.time()),
-                'ident': data['operateurId'],
-                'dateTravail': datetime.fromisoformat(data['dateTravail'].replace('Z', '+00:00')),
-                'codeLanctImprod': data['codeLancement'],
-                'phase': data['phase'],
-                'codeRubrique': data.get('codeRubrique', ''),
-                'varNumUtil8': 0,
-                'varNumUtil9': 0,
-                'statut': 'EN_COURS',
-                'dateCreation': datetime.now()
-            }
-            
-            SIMULATION_DATA['temps_travail'].append(record)
+            record = SIMULATION_STORE.add(
+                'temps_travail',
+                ident=data['operateurId'],
+                date_travail=datetime.fromisoformat(data['dateTravail'].replace('Z', '+00:00')),
+                code_lanct_improd=data['codeLancement'],
+                phase=data['phase'],
+                code_rubrique=data.get('codeRubrique', ''),
+                var_num_util8=0,
+                var_num_util9=0,
+                statut='EN_COURS'
+            )
             
-            print(f"🎭 SIMULATION - Travail démarré: {record}")
+            print(f"🎭 SIMULATION - Travail démarré: {record.to_dict()}")
+            operation_written('temps_travail', record.no_enreg, record.ident, record.date_travail,
+                              record.code_lanct_improd, record.phase, record.statut)
+            session = begin_work_session(data)
             
             return jsonify({
                 'success': True, 
                 'message': 'Travail démarré - Données simulées en mémoire',
-                'noEnreg': record['noEnreg']
+                'noEnreg': record.no_enreg,
+                'session': session.to_dict() if session is not None else None
             })
         
         # Mode normal avec base de données
-        # Utiliser la connexion appropriée
-        if USING_FALLBACK:
-            conn = get_fallback_db_connection()
-        else:
-            conn = get_app_db_connection()
-            
-        if not conn:
-            return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données de l\'application'}), 500
-        
-        cursor = conn.cursor()
-        
-        # Insertion dans ABTEMPS_OPERATEURS (opérations commencées)
-        query = f'''
-            INSERT INTO {CURRENT_TABLES['temps_travail']} 
-            (Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique, VarNumUtil8, VarNumUtil9, Statut)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-        
         # Conversion de la date
         from datetime import datetime
         date_travail = datetime.fromisoformat(data['dateTravail'].replace('Z', '+00:00'))
         
-        cursor.execute(query, (
-            data['operateurId'],
-            date_travail,
-            data['codeLancement'],
-            data['phase'],
-            data.get('codeRubrique', ''),
-            0,  # Temps initial à 0
-            0,  # Temps initial à 0
-            'EN_COURS'  # Statut pour indiquer que c'est commencé
-        ))
+        # Insertion dans ABTEMPS_OPERATEURS (opérations commencées)
+        try:
+            no_enreg = insert_operation(CURRENT_TABLES['temps_travail'], (
+                data['operateurId'],
+                date_travail,
+                data['codeLancement'],
+                data['phase'],
+                data.get('codeRubrique', ''),
+                0,  # Temps initial à 0
+                0,  # Temps initial à 0
+                'EN_COURS'  # Statut pour indiquer que c'est commencé
+            ))
+        except ConnectionError:
+            mark_database_error()
+            return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données de l\'application'}), 500
         
-        conn.commit()
-        conn.close()
+        operation_written('temps_travail', no_enreg, data['operateurId'], date_travail,
+                          data['codeLancement'], data['phase'], 'EN_COURS')
+        session = begin_work_session(data)
         
         return jsonify({
             'success': True, 
             'message': 'Travail démarré - Données enregistrées dans ABTEMPS_OPERATEURS',
-            'noEnreg': cursor.rowcount
+            'noEnreg': no_enreg,
+            'session': session.to_dict() if session is not None else None
+        })
+        
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/evenements-travail', methods=['POST'])
+def ingest_evenements_travail():
+    """Démarrages / fins de travail mis en file par une tablette, écrits en une transaction
+
+    Corps : {"evenements": [{"eventId", "type": "demarrer"|"terminer", ...champs
+    de /api/demarrer-travail ou /api/terminer-travail}]}, dans l'ordre de saisie.
+    Chaque événement reçoit son résultat : enregistre, doublon (déjà reçu,
+    rien n'est réécrit) ou rejete (invalide, à ne pas renvoyer). Si la base
+    échoue, rien n'est écrit et le lot entier peut être renvoyé.
+    """
+    try:
+        from flask import request
+        data = request.get_json(silent=True)
+        events = data.get('evenements') if isinstance(data, dict) else data
+        if not isinstance(events, list):
+            return jsonify({'success': False, 'error': 'Liste d\'événements attendue (evenements)'}), 400
+        if len(events) > BATCH_INGEST_CONFIG['max_events']:
+            return jsonify({
+                'success': False,
+                'error': f"{BATCH_INGEST_CONFIG['max_events']} événements max par envoi"
+            }), 400
+        
+        # Vérifier et créer les tables si nécessaire
+        if not ensure_tables_exist():
+            return jsonify({'success': False, 'error': 'Impossible de créer les tables nécessaires'}), 500
+        
+        # Validation avec les règles des routes unitaires ; un événement invalide n'arrête pas le lot
+        parsed = []
+        for raw in events:
+            try:
+                parsed.append(parse_event(raw, BATCH_INGEST_CONFIG['event_id_max_length']))
+            except ValueError as e:
+                parsed.append({
+                    'eventId': raw.get('eventId') if isinstance(raw, dict) else None,
+                    'statut': REJECTED,
+                    'error': str(e)
+                })
+        valid = [event for event in parsed if isinstance(event, TabletEvent)]
+        
+        if USING_SIMULATION:
+            outcome = {}
+            for event in valid:
+                if event.event_id not in outcome:
+                    (table_key, no_enreg), duplicate = SIMULATION_EVENTS.get_or_create(
+                        event.event_id, lambda event=event: simulate_event(event)
+                    )
+                    outcome[event.event_id] = (table_key, no_enreg, duplicate)
+        else:
+            try:
+                outcome = ingest_events(valid) if valid else {}
+            except ConnectionError:
+                mark_database_error()
+                return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données de l\'application'}), 500
+        
+        results = []
+        written = set()
+        recorded = []
+        for event in parsed:
+            if not isinstance(event, TabletEvent):
+                results.append(event)
+                continue
+            table_key, no_enreg, duplicate = outcome[event.event_id]
+            duplicate = duplicate or event.event_id in written
+            results.append({
+                'eventId': event.event_id,
+                'statut': DUPLICATE if duplicate else RECORDED,
+                'table': table_key,
+                'noEnreg': no_enreg
+            })
+            if duplicate:
+                continue
+            written.add(event.event_id)
+            recorded.append(event)
+            operation_written(table_key, no_enreg, event.ident, event.date_travail,
+                              event.code_lancement, event.phase, event.statut,
+                              duration_seconds(*event.temps) if table_key == 'historique' else 0)
+        # Sessions serveur après le commit du lot, comme pour les routes unitaires
+        apply_event_sessions(recorded)
+        
+        counts = {status: 0 for status in (RECORDED, DUPLICATE, REJECTED)}
+        for result in results:
+            counts[result['statut']] += 1
+        if counts[RECORDED]:
+            print(f"📥 Lot de {len(events)} événement(s) : {counts[RECORDED]} enregistré(s), "
+                  f"{counts[DUPLICATE]} doublon(s), {counts[REJECTED]} rejeté(s)")
+        return jsonify({
+            'success': True,
+            'resultats': results,
+            'enregistres': counts[RECORDED],
+            'doublons': counts[DUPLICATE],
+            'rejetes': counts[REJECTED]
         })
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/pause-travail', methods=['POST'])
+def pause_travail():
+    """Met en pause la session active de l'opérateur (codeLancement optionnel)"""
+    try:
+        from flask import request
+        data = request.get_json(silent=True) or {}
+        if not data.get('operateurId'):
+            return jsonify({'success': False, 'error': 'Champ requis manquant: operateurId'}), 400
+        if not ensure_tables_exist():
+            return jsonify({'success': False, 'error': 'Impossible de créer les tables nécessaires'}), 500
+        session = SESSIONS.pause(data['operateurId'], data.get('codeLancement'))
+        return jsonify({'success': True, 'session': session.to_dict()})
+    except SessionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/reprendre-travail', methods=['POST'])
+def reprendre_travail():
+    """Reprend une session en pause (la plus récente si codeLancement est absent)"""
+    try:
+        from flask import request
+        data = request.get_json(silent=True) or {}
+        if not data.get('operateurId'):
+            return jsonify({'success': False, 'error': 'Champ requis manquant: operateurId'}), 400
+        if not ensure_tables_exist():
+            return jsonify({'success': False, 'error': 'Impossible de créer les tables nécessaires'}), 500
+        session, paused = SESSIONS.resume(data['operateurId'], data.get('codeLancement'), data.get('phase'))
+        return jsonify({
+            'success': True,
+            'session': session.to_dict(),
+            'sessionMiseEnPause': paused.to_dict() if paused is not None else None
+        })
+    except SessionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sessions-actives', methods=['GET'])
+def get_sessions_actives():
+    """Sessions ouvertes de tous les opérateurs (registre en mémoire, sans requête)"""
+    now = datetime.now()
+    operateurs = [
+        {
+            'operateur': ident,
+            'nom': OPERATEURS.name(ident, 'Nom non trouvé'),
+            'sessions': [session.to_dict(now) for session in sessions]
+        }
+        for ident, sessions in sorted(SESSIONS.all().items())
+    ]
+    return jsonify({'success': True, 'operateurs': operateurs, 'total': SESSIONS.counts()})
+
+@app.route('/api/sessions-actives/<operateur_id>', methods=['GET'])
+def get_sessions_operateur(operateur_id):
+    """Session en cours et sessions en pause d'un opérateur (registre en mémoire)"""
+    now = datetime.now()
+    sessions = SESSIONS.operator(operateur_id)
+    current = next((session for session in sessions if session.statut == ACTIVE), None)
+    return jsonify({
+        'success': True,
+        'operateur': operateur_id,
+        'enCours': current.to_dict(now) if current is not None else None,
+        'sessions': [session.to_dict(now) for session in sessions]
+    })
+
+@app.route('/api/admin-terminer-session', methods=['POST'])
+def terminer_session_admin():
+    """Termine une session ouverte depuis le tableau de bord (oubli de fin de travail)"""
+    try:
+        from flask import request
+        data = request.get_json(silent=True) or {}
+        try:
+            session_id = int(data.get('sessionId'))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'sessionId invalide'}), 400
+        session = SESSIONS.finish_session(session_id)
+        return jsonify({
+            'success': True,
+            'session': session.to_dict(),
+            'heureFin': session.date_fin.strftime('%H:%M')
+        })
+    except SessionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+HISTORIQUE_MAX_LIMIT = 1000
+
+# Colonnes de l'historique au format colonnaire (mêmes noms que le format par défaut)
+HISTORIQUE_COLUMNS = (
+    'noEnreg', 'ident', 'dateTravail', 'codeLanctImprod', 'phase', 'codeRubrique',
+    'varNumUtil8', 'varNumUtil9', 'statut', 'dateCreation'
+)
+HISTORIQUE_DATE_COLUMNS = (2, 9)
+
+def parse_date_param(value):
+    """Date/heure ISO d'un paramètre de requête, ramenée en UTC naïf comme en base"""
+    return date_key(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
+def encode_history_cursor(date_travail, no_enreg):
+    """Curseur opaque sur (DateTravail, NoEnreg) du dernier enregistrement d'une page"""
+    raw = json.dumps([date_key(date_travail).isoformat(), no_enreg])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_history_cursor(cursor):
+    """Inverse de encode_history_cursor ; lève ValueError si le curseur est invalide"""
+    try:
+        date_iso, no_enreg = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(date_iso), int(no_enreg)
+    except Exception:
+        raise ValueError('Curseur invalide')
+
+def parse_history_params(args):
+    """Paramètres de pagination : limit, cursor, from (inclus), to (exclu)"""
+    limit = int(args.get('limit', HISTORIQUE_MAX_LIMIT))
+    if limit < 1 or limit > HISTORIQUE_MAX_LIMIT:
+        raise ValueError(f'limit doit être compris entre 1 et {HISTORIQUE_MAX_LIMIT}')
+    return {
+        'limit': limit,
+        'before': decode_history_cursor(args['cursor']) if args.get('cursor') else None,
+        'date_from': parse_date_param(args['from']) if args.get('from') else None,
+        'date_to': parse_date_param(args['to']) if args.get('to') else None
+    }
+
 @app.route('/api/historique-operateur/<operateur_id>', methods=['GET'])
 def get_historique_operateur(operateur_id):
-    """Récupère l'historique des enregistrements d'un opérateur"""
+    """Récupère l'historique des enregistrements d'un opérateur
+    
+    Pagination par curseur (?limit=&cursor=) et filtre sur DateTravail (?from=&to=,
+    borne basse incluse, borne haute exclue). La réponse contient nextCursor tant
+    qu'il reste des enregistrements plus anciens.
+    """
     try:
+        from flask import request
+        try:
+            params = parse_history_params(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        limit = params['limit']
+        
         # Vérifier et créer les tables si nécessaire
         if not ensure_tables_exist():
             return jsonify({'success': False, 'error': 'Impossible de créer les tables nécessaires'}), 500
         
         # Mode simulation
         if USING_SIMULATION:
-            # Filtrer les données simulées pour l'opérateur
-            result = []
-            for record in SIMULATION_DATA['historique']:
-                if record['ident'] == operateur_id:
-                    result.append({
-                        'noEnreg': record['noEnreg'],
-                        'ident': record['ident'],
-                        'dateTravail': record['dateTravail'].isoformat() if record['dateTravail'] else None,
-                        'codeLanctImprod': record['codeLanctImprod'],
-                        'phase': record['phase'],
-                        'codeRubrique': record['codeRubrique'],
-                        'varNumUtil8': record['varNumUtil8'],
-                        'varNumUtil9': record['varNumUtil9'],
-                        'statut': record['statut'],
-                        'dateCreation': record['dateCreation'].isoformat() if record['dateCreation'] else None
-                    })
-            
-            # Trier par date décroissante
-            result.sort(key=lambda x: x['dateTravail'], reverse=True)
+            # Index par opérateur déjà trié : une page par date décroissante en O(log n + k)
+            records = SIMULATION_STORE.by_operator(
+                'historique', operateur_id,
+                date_from=params['date_from'],
+                date_to=params['date_to'],
+                before=params['before'],
+                limit=limit + 1
+            )
+            has_more = len(records) > limit
+            records = records[:limit]
+            next_cursor = encode_history_cursor(records[-1].date_travail, records[-1].no_enreg) if has_more else None
+            if wants_columnar(request):
+                return columnar_response({
+                    'success': True,
+                    'enregistrements': columnar(
+                        HISTORIQUE_COLUMNS,
+                        [(r.no_enreg, r.ident, r.date_travail, r.code_lanct_improd, r.phase, r.code_rubrique,
+                          r.var_num_util8, r.var_num_util9, r.statut, r.date_creation) for r in records],
+                        date_columns=HISTORIQUE_DATE_COLUMNS
+                    ),
+                    'nextCursor': next_cursor
+                })
+            result = [record.to_dict() for record in records]
             
-            return jsonify({'success': True, 'enregistrements': result})
+            return jsonify({'success': True, 'enregistrements': result, 'nextCursor': next_cursor})
         
         # Mode normal avec base de données
         # Utiliser la connexion appropriée
-        if USING_FALLBACK:
-            conn = get_fallback_db_connection()
-        else:
-            conn = get_app_db_connection()
-            
+        conn = get_working_db_connection()
+
         if not conn:
+            mark_database_error()
             return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données de l\'application'}), 500
         
         cursor = conn.cursor()
         
+        # Filtres poussés dans la requête : le coût suit la taille de la page
+        conditions = ['Ident = ?']
+        query_params = [operateur_id]
+        if params['date_from'] is not None:
+            conditions.append('DateTravail >= ?')
+            query_params.append(params['date_from'])
+        if params['date_to'] is not None:
+            conditions.append('DateTravail < ?')
+            query_params.append(params['date_to'])
+        if params['before'] is not None:
+            before_date, before_no_enreg = params['before']
+            conditions.append('(DateTravail < ? OR (DateTravail = ? AND NoEnreg < ?))')
+            query_params.extend([before_date, before_date, before_no_enreg])
+        
         # Récupération de l'historique depuis ABHISTORIQUE_OPERATEURS
-        query = f'''
-            SELECT TOP (1000) 
+        query = '''
+            SELECT TOP ({limit}) 
                 NoEnreg, Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique,
                 VarNumUtil8, VarNumUtil9, Statut, DateCreation
-            FROM {CURRENT_TABLES['historique']}
-            WHERE Ident = ?
-            ORDER BY DateTravail DESC
+            FROM {table}
+            WHERE {conditions}
+            ORDER BY DateTravail DESC, NoEnreg DESC
         '''
+        where = ' AND '.join(conditions)
+        
+        try:
+            enregistrements = run_query(
+                cursor, 'historique_page',
+                query.format(limit=limit + 1, table=CURRENT_TABLES['historique'], conditions=where),
+                query_params, fetch='all'
+            )
+            # Mois archivés qui recoupent la plage et que la page n'a pas déjà dépassés :
+            # une seule requête UNION ALL, quel que soit le nombre de mois
+            before_date = params['before'][0] if params['before'] is not None else None
+            page_end = enregistrements[limit][2] if len(enregistrements) > limit else None
+            months = [
+                month for month in HISTORY_ARCHIVE.sources(cursor, CURRENT_TABLES, params['date_from'], params['date_to'])
+                if (before_date is None or month.start <= before_date) and (page_end is None or month.end > page_end)
+            ]
+            if months:
+                columns = ', '.join(ARCHIVE_COLUMNS)
+                branches = '\n                    UNION ALL\n'.join(
+                    f"SELECT {columns} FROM {month.table} WHERE {where}" for month in months
+                )
+                archived = run_query(cursor, 'historique_page_archive', f'''
+                    SELECT TOP ({limit + 1}) {columns}
+                    FROM (
+                    {branches}
+                    ) AS archives
+                    ORDER BY DateTravail DESC, NoEnreg DESC
+                ''', query_params * len(months), fetch='all')
+                enregistrements = sorted(
+                    list(enregistrements) + list(archived), key=lambda row: (row[2], row[0]), reverse=True
+                )[:limit + 1]
+        finally:
+            conn.close()
+        
+        has_more = len(enregistrements) > limit
+        enregistrements = enregistrements[:limit]
         
-        cursor.execute(query, (operateur_id,))
-        enregistrements = cursor.fetchall()
+        next_cursor = None
+        if has_more:
+            last = enregistrements[-1]
+            next_cursor = encode_history_cursor(last[2], last[0])
+        
+        if wants_columnar(request):
+            return columnar_response({
+                'success': True,
+                'enregistrements': columnar(HISTORIQUE_COLUMNS, enregistrements, date_columns=HISTORIQUE_DATE_COLUMNS),
+                'nextCursor': next_cursor
+            })
         
         # Conversion en liste de dictionnaires
         result = []
@@ -870,75 +2107,478 @@ def get_historique_operateur(operateur_id):
                 'dateCreation': row[9].isoformat() if row[9] else None
             })
         
-        conn.close()
-        return jsonify({'success': True, 'enregistrements': result})
+        return jsonify({'success': True, 'enregistrements': result, 'nextCursor': next_cursor})
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
+        if isinstance(e, pyodbc.Error):
+            mark_database_error()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Cache des lookups LCTC (codes lancement), codes inconnus compris
+LTC_CACHE = TTLCache(
+    max_size=LTC_CACHE_CONFIG['max_size'],
+    ttl=LTC_CACHE_CONFIG['ttl'],
+    negative_ttl=LTC_CACHE_CONFIG['negative_ttl']
+)
+LTC_IN_CHUNK = 500  # Paramètres par requête IN (limite SQL Server : 2100)
+
+def ltc_row_to_dict(row):
+    return {
+        'codeLancement': row[0],
+        'phase': row[1],
+        'codeRubrique': row[2]
+    }
+
+def fetch_ltc_data(codes):
+    """Résout des codes lancement : cache d'abord, puis une requête ensembliste pour le reste
+    
+    Retourne {code: données LTC} ; les codes absents du résultat sont inconnus de LCTC.
+    """
+    result = {}
+    to_fetch = []
+    for code in dict.fromkeys(codes):
+        cached = LTC_CACHE.get(code)
+        if cached is None:
+            to_fetch.append(code)
+        elif cached is not MISSING:
+            result[code] = cached
+    
+    if not to_fetch:
+        return result
+    
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Impossible de se connecter à la base de données')
+    try:
+        cursor = conn.cursor()
+        for i in range(0, len(to_fetch), LTC_IN_CHUNK):
+            chunk = to_fetch[i:i + LTC_IN_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            # Récupération des données LTC depuis SEDI_ERP (table LCTC réelle)
+            rows = run_query(cursor, 'lctc_codes', f'''
+                SELECT 
+                    [CodeLanct], [Phase], [CodeRubrique]
+                FROM [SEDI_ERP].[dbo].[LCTC]
+                WHERE [CodeLanct] IN ({placeholders})
+                ORDER BY [CodeLanct], [Phase]
+            ''', chunk, fetch='all')
+            # Comme SQL Server (collation CI) : casse et espaces de fin ignorés
+            requested = {}
+            for code in chunk:
+                requested.setdefault(code.rstrip().upper(), []).append(code)
+            found = {}
+            for row in rows:
+                for code in requested.get(str(row[0]).rstrip().upper(), ()):
+                    if code not in found:
+                        found[code] = ltc_row_to_dict(row)
+            for code in chunk:
+                if code in found:
+                    LTC_CACHE.set(code, found[code])
+                    result[code] = found[code]
+                else:
+                    LTC_CACHE.set_missing(code)
+    finally:
+        conn.close()
+    return result
+
+def format_minutes(minutes):
+    return f"{minutes // 60}h {minutes % 60}min" if minutes else '0min'
+
+def launch_to_dict(entry):
+    """Format de /api/lancements-status (identique au serveur Node)"""
+    operations = entry['operations']
+    return {
+        'codeLancement': entry['code'],
+        'phase': entry['phase'],
+        'poste': '',
+        'operateurPrincipal': entry['operateur_principal'] or '',
+        'nomOperateur': OPERATEURS.name(entry['operateur_principal'], f"Opérateur {entry['operateur_principal']}"),
+        'statutGlobal': entry['statut'],
+        'nbOperations': operations,
+        'nbEnCours': entry['en_cours'],
+        'nbTermines': entry['termines'],
+        'pourcentageComplete': round(entry['termines'] * 100.0 / operations, 2) if operations else 0,
+        'dureeExecutionMoyenne': round(entry['duree_totale'] / entry['termines']) if entry['termines'] else 0,
+        'dureeTotale': entry['duree_totale'],
+        'derniereActivite': entry['derniere_activite'].isoformat() if entry['derniere_activite'] else None,
+        'dateDebut': entry['debut'].isoformat() if entry['debut'] else None
+    }
+
+def sorted_launches():
+    """Lancements du jour : en cours d'abord, puis par code"""
+    follow_other_workers()
+    entries = LAUNCH_SUMMARY.entries()
+    entries.sort(key=lambda e: (e['statut'] != 'EN_COURS', e['code'], e['phase']))
+    return entries
+
+@app.route('/api/lancements-status', methods=['GET'])
+def get_lancements_status():
+    """Vue avancée des lancements du jour (synthèse en mémoire, sans GROUP BY par appel)"""
+    try:
+        lancements = [launch_to_dict(entry) for entry in sorted_launches()]
+        en_cours = [l for l in lancements if l['statutGlobal'] == 'EN_COURS']
+        termines = [l for l in lancements if l['statutGlobal'] == 'TERMINE']
+        temps_total = sum(l['dureeTotale'] for l in lancements)
+        return jsonify({
+            'success': True,
+            'type': 'vue_avancee',
+            'enCours': en_cours,
+            'termines': termines,
+            'total': len(lancements),
+            'statistiques': {
+                'nbLancementsEnCours': len(en_cours),
+                'nbLancementsTermines': len(termines),
+                'totalOperations': sum(l['nbOperations'] for l in lancements),
+                'tempsTotal': temps_total,
+                'tempsMoyen': round(temps_total / len(lancements)) if lancements else 0,
+                'avancementMoyen': round(sum(l['pourcentageComplete'] for l in lancements) / len(lancements)) if lancements else 0
+            },
+            'synthese': LAUNCH_SUMMARY.stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'enCours': [], 'termines': []}), 500
+
+@app.route('/api/lancements-simple', methods=['GET'])
+def get_lancements_simple():
+    """Vue simple : une ligne par lancement / phase du jour avec son statut"""
+    try:
+        now = datetime.now()
+        operations = []
+        for entry in sorted_launches():
+            operateur = entry['operateur_principal'] or ''
+            en_cours = entry['statut'] == 'EN_COURS'
+            minutes = int((now - entry['debut']).total_seconds() // 60) if en_cours and entry['debut'] else entry['duree_totale'] // 60
+            operations.append({
+                'id': f"{entry['code']}_{operateur}_{entry['phase']}",
+                'codeLancement': entry['code'],
+                'phase': entry['phase'],
+                'poste': '',
+                'operateur': operateur,
+                'nomOperateur': OPERATEURS.name(operateur, 'Inconnu'),
+                'codeRubrique': '',
+                'statutOperation': entry['statut'],
+                'executeTerminee': 'N' if en_cours else 'O',
+                'dureeExecution': entry['duree_totale'],
+                'minutesEcoulees': max(0, minutes),
+                'priorite': 'NORMAL' if en_cours else 'COMPLETE',
+                'dateOperation': entry['debut'].isoformat() if entry['debut'] else None,
+                'tempsEcouleFormate': format_minutes(max(0, minutes))
+            })
+        en_cours = [op for op in operations if op['executeTerminee'] == 'N']
+        terminees = [op for op in operations if op['executeTerminee'] == 'O']
+        return jsonify({
+            'success': True,
+            'type': 'vue_simple',
+            'operations': operations,
+            'enCours': en_cours,
+            'terminees': terminees,
+            'termines': terminees,
+            'alertes': {'urgentes': [], 'attention': [], 'normales': en_cours},
+            'statistiques': {
+                'totalOperations': len(operations),
+                'operationsEnCours': len(en_cours),
+                'operationsTerminees': len(terminees),
+                'operationsUrgentes': 0,
+                'operationsAttention': 0,
+                'operateursActifs': len({op['operateur'] for op in en_cours}),
+                'lancementsActifs': len({op['codeLancement'] for op in en_cours})
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'operations': [], 'enCours': [], 'terminees': []}), 500
+
+def date_fr(day=None):
+    return (day or datetime.now()).strftime('%d/%m/%Y')
+
+@app.route('/api/tous-operateurs-lancements-journee', methods=['GET'])
+def get_tous_operateurs_lancements_journee():
+    """Lancements du jour de tous les opérateurs (une requête par défaut de cache, pas une par opérateur)"""
+    try:
+        operateurs = []
+        follow_other_workers()
+        for ident, lancements in DAY_ROLLUP.all_operators().items():
+            total = sum(l['tempsTotal'] for l in lancements)
+            operateurs.append({
+                'operateur': ident,
+                'nom': OPERATEURS.name(ident, 'Nom inconnu'),
+                'nombreLancements': len(lancements),
+                'lancementsArray': lancements,
+                'tempsTotal': total,
+                'tempsTotalFormate': format_duration(total)
+            })
+        operateurs.sort(key=lambda op: (-op['nombreLancements'], op['operateur']))
+        return jsonify({
+            'success': True,
+            'date': date_fr(),
+            'nombreOperateurs': len(operateurs),
+            'operateurs': operateurs
+        })
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'operateurs': []}), 500
+
+@app.route('/api/operateur-lancements-journee/<operateur_id>', methods=['GET'])
+def get_operateur_lancements_journee(operateur_id):
+    """Lancements du jour d'un opérateur : enregistrements et regroupement par lancement"""
+    try:
+        operateur_id = operateur_id.strip()
+        follow_other_workers()
+        lancements, records = DAY_ROLLUP.operator(operateur_id)
+        return jsonify({
+            'success': True,
+            'operateur': operateur_id,
+            'nom': OPERATEURS.name(operateur_id, 'Nom inconnu'),
+            'date': date_fr(),
+            'nombreLancements': len(lancements),
+            # Enregistrements du jour, au format de /api/historique-operateur (affichés par AdminPage)
+            'lancements': records,
+            'lancementsGroupes': lancements
+        })
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e), 'operateur': operateur_id, 'lancements': []}), 500
+
+@app.route('/api/lancements/reconcile', methods=['POST'])
+def reconcile_lancements():
+    """Force le recalcul de la synthèse des lancements depuis la base"""
+    if LAUNCH_SUMMARY.reconcile():
+        return jsonify({'success': True, 'synthese': LAUNCH_SUMMARY.stats()})
+    return jsonify({'success': False, 'error': 'Recalcul impossible', 'synthese': LAUNCH_SUMMARY.stats()}), 500
+
 @app.route('/api/ltc-data/<code_lancement>', methods=['GET'])
 def get_ltc_data(code_lancement):
     """Récupère les données LTC pour un code lancement donné"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'success': False, 'error': 'Impossible de se connecter à la base de données'}), 500
-        
-        cursor = conn.cursor()
-        
-        # Récupération des données LTC depuis SEDI_ERP (table LCTC réelle)
-        query = '''
-            SELECT TOP 1 
-                [CodeLanct], [Phase], [CodeRubrique]
-            FROM [SEDI_ERP].[dbo].[LCTC]
-            WHERE [CodeLanct] = ?
-            ORDER BY [CodeLanct] DESC
-        '''
-        
-        cursor.execute(query, (code_lancement,))
-        row = cursor.fetchone()
-        
-        if row:
-            ltc_data = {
-                'codeLancement': row[0],
-                'phase': row[1],
-                'codeRubrique': row[2]
-            }
-            conn.close()
+        ltc_data = fetch_ltc_data([code_lancement]).get(code_lancement)
+        if ltc_data:
             return jsonify({'success': True, 'ltcData': ltc_data})
         else:
-            conn.close()
             return jsonify({'success': False, 'error': f'Code lancement {code_lancement} non trouvé'}), 404
         
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/ltc-data', methods=['GET'])
+def get_ltc_data_bulk():
+    """Récupère les données LTC de plusieurs codes lancement (?codes=A,B,C) en un aller-retour"""
+    try:
+        from flask import request
+        codes = [code.strip() for code in request.args.get('codes', '').split(',') if code.strip()]
+        if not codes:
+            return jsonify({'success': False, 'error': 'Paramètre requis manquant: codes'}), 400
+        if len(codes) > LTC_CACHE_CONFIG['bulk_max_codes']:
+            return jsonify({
+                'success': False,
+                'error': f"Trop de codes (maximum {LTC_CACHE_CONFIG['bulk_max_codes']})"
+            }), 400
+        
+        ltc_data = fetch_ltc_data(codes)
+        return jsonify({
+            'success': True,
+            'ltcData': ltc_data,
+            'notFound': [code for code in dict.fromkeys(codes) if code not in ltc_data]
+        })
+        
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/live-feed', methods=['GET'])
+def live_feed():
+    """Flux SSE des démarrages / fins de travail et des sessions pour le tableau de bord admin"""
+    from flask import request, Response
+    if LIVE_FEED.subscriber_count >= LIVE_FEED_MAX_CLIENTS:
+        return jsonify({'success': False, 'error': 'Trop de tableaux de bord connectés'}), 503
+    # Position par table (NoEnreg) : valable quel que soit le worker qui a servi l'événement
+    cursor = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('lastEventId'))
+    LIVE_POLLER.start()
+    subscriber = LIVE_FEED.subscribe(cursor)
+    if cursor and not USING_SIMULATION:
+        LIVE_POLLER.resume({
+            CURRENT_TABLES[key]: seq for key, seq in cursor.items() if key in LIVE_FEED_TABLES
+        })
+    return Response(
+        sse_stream(LIVE_FEED, subscriber, keepalive=LIVE_FEED_CONFIG['keepalive']),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/live-feed/stats', methods=['GET'])
+def live_feed_stats():
+    """Statistiques du flux temps réel (abonnés, sondages)"""
+    return jsonify({'success': True, 'broker': LIVE_FEED.stats(), 'poller': LIVE_POLLER.stats(),
+                    'maxClients': LIVE_FEED_MAX_CLIENTS})
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Statistiques des caches en mémoire"""
+    return jsonify({
+        'success': True,
+        'ltc': LTC_CACHE.stats(),
+        'operateurs': OPERATEURS.stats(),
+        'write_batcher': WRITE_BATCHER.stats() if WRITE_BATCHER is not None else None,
+        'simulation': SIMULATION_STORE.stats(),
+        'lancements': LAUNCH_SUMMARY.stats(),
+        'journee': DAY_ROLLUP.stats(),
+        'sessions': SESSIONS.stats()
+    })
+
+@app.route('/api/archives', methods=['GET'])
+def get_archives():
+    """État de l'archivage de l'historique et mois archivés de la base de travail"""
+    try:
+        mois = []
+        if not USING_SIMULATION and ensure_tables_exist():
+            conn = get_working_db_connection()
+            if conn:
+                try:
+                    mois = [month.to_dict() for month in HISTORY_ARCHIVE.months(conn.cursor(), CURRENT_TABLES, force=True)]
+                finally:
+                    conn.close()
+        return jsonify({'success': True, 'archivage': HISTORY_ARCHIVE.stats(), 'mois': mois})
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/archives/run', methods=['POST'])
+def run_archives():
+    """Déclenche un passage d'archivage en arrière-plan (sans attendre l'intervalle)"""
+    if USING_SIMULATION or not HISTORY_ARCHIVE.enabled:
+        return jsonify({'success': False, 'error': 'Archivage désactivé (mode simulation ou configuration)'}), 409
+    HISTORY_ARCHIVE.start()
+    HISTORY_ARCHIVE.trigger()
+    return jsonify({'success': True, 'archivage': HISTORY_ARCHIVE.stats()}), 202
+
+@app.route('/api/query-log', methods=['GET'])
+def get_query_log():
+    """Requêtes lentes, profils échantillonnés et cumul par requête nommée
+    
+    ?query= pour filtrer sur un nom de requête, ?limit= pour le nombre d'entrées.
+    """
+    from flask import request
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit doit être un entier'}), 400
+    name = request.args.get('query') or None
+    return jsonify({
+        'success': True,
+        'config': QUERY_LOG.config(),
+        'requetes': QUERY_LOG.summary(),
+        'lentes': QUERY_LOG.slow_queries(limit, name),
+        'profils': QUERY_LOG.profiles(limit, name)
+    })
+
+@app.route('/api/query-log/config', methods=['POST'])
+def configure_query_log():
+    """Modifie à chaud le seuil et le profilage (slowThreshold, profileSampleRate, profileQueries)"""
+    from flask import request
+    data = request.get_json(silent=True) or {}
+    try:
+        QUERY_LOG.configure(
+            slow_threshold=float(data['slowThreshold']) if data.get('slowThreshold') is not None else None,
+            profile_sample_rate=float(data['profileSampleRate']) if data.get('profileSampleRate') is not None else None,
+            profile_queries=data['profileQueries'] if 'profileQueries' in data else False
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'config': QUERY_LOG.config()})
+
+@app.route('/api/query-log/reset', methods=['POST'])
+def reset_query_log():
+    """Vide le journal (après un déploiement, pour comparer avant / après)"""
+    QUERY_LOG.reset()
+    return jsonify({'success': True, 'config': QUERY_LOG.config()})
+
 @app.route('/api/export-to-erp', methods=['POST'])
 def export_to_erp():
-    """Exporte les données vers l'ERP SILOG"""
+    """Lance l'export vers l'ERP SILOG en tâche de fond et retourne l'identifiant du job"""
     try:
-        if export_data_to_erp():
-            return jsonify({
-                'success': True,
-                'message': 'Données exportées vers l\'ERP avec succès'
-            })
-        else:
+        job, created = EXPORT_JOBS.submit()
+        if not created:
             return jsonify({
                 'success': False,
-                'error': 'Erreur lors de l\'export vers l\'ERP'
-            }), 500
+                'error': 'Un export est déjà en cours',
+                'job': job
+            }), 409
+        return jsonify({
+            'success': True,
+            'message': 'Export vers l\'ERP démarré',
+            'jobId': job['jobId'],
+            'job': job
+        }), 202
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/export-jobs', methods=['GET'])
+def list_export_jobs():
+    """Liste les derniers exports (le plus récent en premier)"""
+    try:
+        return jsonify({'success': True, 'jobs': EXPORT_JOBS.list()})
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/export-jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """Avancement d'un export : lignes traitées/total, débit, erreurs"""
+    try:
+        job = EXPORT_JOBS.get(job_id)
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    if not job:
+        return jsonify({'success': False, 'error': f'Export {job_id} introuvable'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/export-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_export_job(job_id):
+    """Demande l'annulation d'un export (effective après le lot en cours)"""
+    try:
+        job = EXPORT_JOBS.get(job_id)
+        if job and job['status'] not in FINISHED_STATUSES:
+            job = EXPORT_JOBS.cancel(job_id)
+    except DatabaseTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    if not job:
+        return jsonify({'success': False, 'error': f'Export {job_id} introuvable'}), 404
+    if job['status'] in FINISHED_STATUSES:
+        return jsonify({'success': False, 'error': 'Export déjà terminé', 'job': job}), 409
+    return jsonify({'success': True, 'job': job})
 
 @app.route('/api/database-stats', methods=['GET'])
 def get_database_statistics():
-    """Récupère les statistiques de la base de données autonome"""
+    """Récupère les statistiques de la base de données autonome
+    
+    Volumes issus des métadonnées par défaut ; ?exact=1 pour un COUNT(*) exact,
+    ?refresh=1 pour ignorer le cache.
+    """
     try:
-        stats = get_database_stats()
-        if stats:
+        from flask import request
+        exact = request.args.get('exact') == '1'
+        force = request.args.get('refresh') == '1'
+        details = get_database_stats(exact=exact, force=force)
+        if details:
+            # 'stats' garde le format historique {table: nombre de lignes}
+            stats = {name: table.get('lignes', table.get('erreur')) for name, table in details['tables'].items()}
             return jsonify({
                 'success': True,
-                'stats': stats
+                'stats': stats,
+                'details': details
             })
         else:
             return jsonify({
@@ -948,33 +2588,25 @@ def get_database_statistics():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-if __name__ == '__main__':
+def bootstrap():
+    """Initialisation au démarrage : base SEDI_APP, tables, migrations, surveillance
+
+    La sonde de SQL Server et la vérification / création de SEDI_APP (via
+    master) sont lancées en parallèle ; chaque étape est chronométrée (STARTUP).
+    """
     print("=== Configuration SQL Server ===")
     print(f"Serveur: {DB_CONFIG['server']}")
     print(f"Utilisateur: {DB_CONFIG['username']}")
     print(f"Base de données: {DB_CONFIG['database']}")
     print("================================")
     
-    # Test de connexion au démarrage
-    if test_connection():
+    print("🔧 Connexion à SQL Server et vérification/création de la base SEDI_APP...")
+    results = STARTUP.parallel({
+        'connexion_sql_server': test_connection,
+        'base_sedi_app': create_app_database
+    })
+    if results['connexion_sql_server']:
         print("✅ Connexion à SQL Server réussie")
-        
-        # Création de la base de données SEDI_APP si nécessaire
-        print("🔧 Vérification/Création de la base de données SEDI_APP...")
-        if create_app_database():
-            print("✅ Base de données SEDI_APP prête")
-        else:
-            print("⚠️ Problème avec la base de données SEDI_APP (utilisation du fallback)")
-        
-        # Création des tables de l'application si nécessaire
-        print("🔧 Vérification/Création des tables de l'application...")
-        if create_app_tables():
-            print("✅ Tables de l'application prêtes")
-        else:
-            print("⚠️ Problème avec les tables de l'application (l'application peut continuer)")
-        
-        print(f"API disponible sur http://{FLASK_CONFIG['host']}:{FLASK_CONFIG['port']}")
-        app.run(**FLASK_CONFIG)
     else:
         print("❌ Échec de la connexion à SQL Server")
         print("Vérifiez que:")
@@ -983,10 +2615,95 @@ if __name__ == '__main__':
         print("3. Le driver ODBC est installé")
         print("4. Le pare-feu autorise la connexion")
         print("5. SQL Server accepte les connexions TCP/IP")
+    if results['base_sedi_app']:
+        print("✅ Base de données SEDI_APP prête")
+    else:
+        print("⚠️ Problème avec la base de données SEDI_APP (utilisation du fallback)")
+    
+    # Choix de la base et création des tables de l'application si nécessaire
+    print("🔧 Vérification/Création des tables de l'application...")
+    with STARTUP.phase('tables_et_migrations'):
+        ready = refresh_database_state()
+    if ready:
+        print("✅ Tables de l'application prêtes")
+    else:
+        print("⚠️ Problème avec les tables de l'application (l'application peut continuer)")
+    start_database_state_monitor()
+    HEARTBEAT.start()
+
+def warm_up():
+    """Pré-chauffe avant d'accepter du trafic : pools, annuaire des opérateurs, sessions ouvertes (en parallèle)"""
+    if USING_SIMULATION:
+        print("🎭 Mode simulation : pas de pré-chauffage des pools")
+        SESSIONS.start()
+        return
+    
+    def warm_pool(database):
+        opened = get_pool(database).warm(SERVER_CONFIG['warm_connections'])
+        print(f"✅ Pool {database} pré-chauffé ({opened} connexion(s))")
+    
+    def load_directory():
+        if not OPERATEURS.reload():
+            return False
+        print(f"✅ Annuaire des opérateurs chargé ({len(OPERATEURS.all())} opérateurs)")
     
+    def rebuild_sessions():
+        if not SESSIONS.rebuild():
+            return False
+        counts = SESSIONS.counts()
+        print(f"✅ Sessions ouvertes rechargées ({counts[ACTIVE]} active(s), {counts[PAUSED]} en pause)")
+    
+    tasks = {
+        f'pool_{database}': (lambda database=database: warm_pool(database))
+        for database in dict.fromkeys([DB_CONFIG['database'], working_database_name()])
+    }
+    tasks['annuaire_operateurs'] = load_directory
+    tasks['sessions_ouvertes'] = rebuild_sessions
+    STARTUP.parallel(tasks)
+    OPERATEURS.start()
+    SESSIONS.start()
+    HISTORY_ARCHIVE.start()
+
+def run_startup():
+    """bootstrap() puis warm_up(), suivis du rapport des durées par phase"""
+    STARTUP.begin()
+    try:
+        bootstrap()
+        warm_up()
+    except Exception as e:
+        print(f"❌ Démarrage interrompu: {e}")
+        STARTUP.finish(False)
+        return False
+    STARTUP.finish(True)
+    return True
+
+def start_in_background():
+    """Lance run_startup() dans un thread : /api/health/live répond pendant l'initialisation
+
+    /api/health/ready renvoie 503 jusqu'à la fin du démarrage ; les requêtes
+    métier arrivées entre-temps attendent (au plus STARTUP_CONFIG['request_wait']).
+    """
+    STARTUP.begin()
+    threading.Thread(target=run_startup, name='startup', daemon=True).start()
+
+def shutdown():
+    """Arrêt propre : vide la file d'écriture groupée, sauvegarde la simulation, ferme les pools"""
+    if WRITE_BATCHER is not None:
+        WRITE_BATCHER.stop()
+    try:
+        SIMULATION_STORE.save()
+    except Exception as e:
+        print(f"⚠️ Instantané de simulation impossible: {e}")
+    for pool in list(DB_POOLS.values()):
+        pool.close()
+
+if __name__ == '__main__':
+    # Serveur de développement Flask ; en production : gunicorn -c gunicorn.conf.py wsgi:app
+    # Avec le rechargement automatique (debug), seul le processus enfant sert les requêtes
+    if not FLASK_CONFIG.get('debug') or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if STARTUP_CONFIG['background']:
+            start_in_background()
+        else:
+            run_startup()
     print(f"API disponible sur http://{FLASK_CONFIG['host']}:{FLASK_CONFIG['port']}")
-    app.run(
-        debug=FLASK_CONFIG['debug'], 
-        host=FLASK_CONFIG['host'], 
-        port=FLASK_CONFIG['port']
-    ) 
\ No newline at end of file
+    app.run(**FLASK_CONFIG)
@@ -0,0 +1,203 @@
+# Ingestion par lot des démarrages / fins de travail (/api/evenements-travail)
+#
+# Hors connexion, la tablette met ses événements en file avec un identifiant
+# généré localement (eventId) puis les renvoie en un seul POST. Les nouveaux
+# événements sont insérés dans l'ordre reçu, en une transaction : INSERT ...
+# OUTPUT regroupés (comme l'écriture groupée) puis une ligne par événement
+# dans AB_EVENEMENTS_TABLETTES, dont la contrainte d'unicité sur EventId
+# garantit qu'un renvoi n'écrit rien deux fois, même si deux envois se
+# croisent.
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from queries import run_query
+from write_batcher import MAX_PARAMS_PER_BATCH, build_insert
+
+# Type d'événement -> (clé de table, statut écrit)
+EVENT_TYPES = {
+    'demarrer': ('temps_travail', 'EN_COURS'),
+    'terminer': ('historique', 'TERMINE')
+}
+
+# Mêmes champs obligatoires que /api/demarrer-travail et /api/terminer-travail
+REQUIRED_FIELDS = ['operateurId', 'operateurNom', 'codeLancement', 'dateTravail']
+
+LEDGER_COLUMNS = ('EventId', 'TableCible', 'NoEnregCible')
+
+# Statuts par événement dans la réponse
+RECORDED = 'enregistre'
+DUPLICATE = 'doublon'
+REJECTED = 'rejete'
+
+
+class TabletEvent:
+    __slots__ = ('event_id', 'table_key', 'values')
+
+    def __init__(self, event_id, table_key, values):
+        self.event_id = event_id
+        self.table_key = table_key
+        self.values = values        # Dans l'ordre des colonnes d'opération (Ident ... Statut)
+
+    @property
+    def ident(self):
+        return self.values[0]
+
+    @property
+    def date_travail(self):
+        return self.values[1]
+
+    @property
+    def code_lancement(self):
+        return self.values[2]
+
+    @property
+    def phase(self):
+        return self.values[3]
+
+    @property
+    def temps(self):
+        """(minutes, secondes) saisis sur la tablette"""
+        return self.values[5], self.values[6]
+
+    @property
+    def statut(self):
+        return self.values[7]
+
+
+def parse_event(data, max_id_length=64):
+    """Événement validé (TabletEvent) ; lève ValueError avec le message renvoyé à la tablette"""
+    if not isinstance(data, dict):
+        raise ValueError('Événement invalide')
+    event_id = data.get('eventId')
+    if not event_id or not isinstance(event_id, str):
+        raise ValueError('Champ requis manquant: eventId')
+    if len(event_id) > max_id_length:
+        raise ValueError(f'eventId trop long (max {max_id_length} caractères)')
+    if data.get('type') not in EVENT_TYPES:
+        raise ValueError(f"type doit valoir {' ou '.join(EVENT_TYPES)}")
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            raise ValueError(f'Champ requis manquant: {field}')
+    if 'phase' not in data:
+        raise ValueError('Champ requis manquant: phase')
+    try:
+        date_travail = datetime.fromisoformat(str(data['dateTravail']).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('dateTravail invalide')
+
+    table_key, statut = EVENT_TYPES[data['type']]
+    if table_key == 'historique':
+        minutes, seconds = data.get('tempsMinutes', 0), data.get('tempsSecondes', 0)
+    else:
+        minutes, seconds = 0, 0
+    return TabletEvent(event_id, table_key, (
+        data['operateurId'],
+        date_travail,
+        data['codeLancement'],
+        data['phase'],
+        data.get('codeRubrique', ''),
+        minutes,
+        seconds,
+        statut
+    ))
+
+
+def is_duplicate_key_error(exc):
+    """Violation de contrainte d'unicité (SQLSTATE 23000) : envoi concurrent des mêmes événements"""
+    args = getattr(exc, 'args', ())
+    return type(exc).__name__ == 'IntegrityError' or (bool(args) and args[0] == '23000')
+
+
+def _chunks(items, size):
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+def find_recorded(cursor, ledger_table, event_ids):
+    """eventId déjà enregistrés -> (clé de table, NoEnreg)"""
+    found = {}
+    for chunk in _chunks(list(event_ids), MAX_PARAMS_PER_BATCH):
+        rows = run_query(cursor, 'ingestion_evenements_connus', f"""
+        SELECT EventId, TableCible, NoEnregCible FROM {ledger_table}
+        WHERE EventId IN ({', '.join('?' * len(chunk))})
+        """, chunk, fetch='all')
+        for event_id, table_key, no_enreg in rows:
+            found[event_id] = (table_key, no_enreg)
+    return found
+
+
+def write_events(conn, tables, columns, events):
+    """Insère les événements absents du journal, en une transaction
+
+    Retourne {eventId: (clé de table, NoEnreg, doublon)}. Les lignes sont
+    insérées dans l'ordre de la liste. La transaction est annulée en cas
+    d'erreur (aucun événement du lot n'est alors écrit).
+    """
+    ledger_table = tables['evenements']
+    cursor = conn.cursor()
+    outcome = {
+        event_id: (table_key, no_enreg, True)
+        for event_id, (table_key, no_enreg) in find_recorded(
+            cursor, ledger_table, {event.event_id for event in events}
+        ).items()
+    }
+    # Un eventId répété dans le lot n'est écrit qu'une fois (première occurrence)
+    pending = []
+    seen = set(outcome)
+    for event in events:
+        if event.event_id not in seen:
+            seen.add(event.event_id)
+            pending.append(event)
+    if not pending:
+        return outcome
+
+    try:
+        per_statement = max(1, MAX_PARAMS_PER_BATCH // len(columns))
+        for chunk in _chunks(pending, per_statement):
+            run_query(
+                cursor, 'ingestion_operations',
+                'SET NOCOUNT ON;\n' + '\n'.join(build_insert(tables[e.table_key], columns) for e in chunk),
+                [value for event in chunk for value in event.values]
+            )
+            for index, event in enumerate(chunk):
+                if index > 0:
+                    cursor.nextset()
+                outcome[event.event_id] = (event.table_key, cursor.fetchone()[0], False)
+
+        # Un INSERT multi-lignes accepte au plus 1000 lignes
+        per_statement = min(1000, MAX_PARAMS_PER_BATCH // len(LEDGER_COLUMNS))
+        for chunk in _chunks(pending, per_statement):
+            run_query(cursor, 'ingestion_journal', f"""
+            INSERT INTO {ledger_table} ({', '.join(LEDGER_COLUMNS)})
+            VALUES {', '.join('(?, ?, ?)' for _ in chunk)}
+            """, [value for event in chunk for value in (event.event_id, event.table_key,
+                                                          outcome[event.event_id][1])])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return outcome
+
+
+class EventLedger:
+    """Journal en mémoire des eventId du mode simulation (les plus anciens sont évincés)"""
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, event_id, create):
+        """((clé de table, NoEnreg), doublon) ; create() n'est appelé que pour un eventId inconnu"""
+        with self._lock:
+            existing = self._events.get(event_id)
+            if existing is not None:
+                return existing, True
+            value = self._events[event_id] = create()
+            while len(self._events) > self.max_size:
+                self._events.popitem(last=False)
+            return value, False
+
+    def __len__(self):
+        return len(self._events)
@@ -0,0 +1,12 @@
+# Banc d'essai du backend sans SERVEURERP
+#
+#   cd backend
+#   python -m bench --tablets 40 --admins 3 --duration 60 --json avant.json
+#   python -m bench --tablets 40 --admins 3 --duration 60 --compare avant.json
+#
+# sqlite_odbc.py : substitut de pyodbc sur SQLite (SEDI_ERP et
+#                  SEDI_APP_INDEPENDANTE, schéma compatible, latence simulée)
+# seed.py        : RESSOURC, LCTC et tables de l'application, données déterministes
+# wsgi.py        : backend inchangé, pyodbc remplacé (serveur de dev ou gunicorn)
+# loadgen.py     : tablettes (OperateurInterface.js) et tableaux de bord (AdminPage.js)
+# __main__.py    : campagne complète et rapport débit / p50 / p95 / p99 par endpoint
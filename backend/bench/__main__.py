@@ -0,0 +1,199 @@
+# Campagne de mesure : base SQLite, serveur, charge, rapport
+#
+#   cd backend
+#   python -m bench --tablets 40 --admins 3 --duration 60 --json avant.json
+#   (modification des pools / caches)
+#   python -m bench --tablets 40 --admins 3 --duration 60 --compare avant.json
+#
+# Le serveur tourne dans un processus séparé (serveur de dev multi-thread ou
+# gunicorn avec gunicorn.conf.py) pour que le générateur de charge ne
+# partage pas le GIL du backend.
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from bench import loadgen, seed as seeding
+from bench.sqlite_odbc import DB_DIR_ENV, CONNECT_DELAY_ENV, ROUNDTRIP_DELAY_ENV
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Banc d\'essai du backend SEDI')
+    parser.add_argument('--tablets', type=int, default=20, help='Tablettes simulées')
+    parser.add_argument('--admins', type=int, default=2, help='Tableaux de bord admin simulés')
+    parser.add_argument('--duration', type=float, default=30, help='Durée mesurée (s)')
+    parser.add_argument('--warmup', type=float, default=5, help='Charge non mesurée avant la mesure (s)')
+    parser.add_argument('--think', type=float, default=0.5,
+                        help='Temps de réflexion des tablettes (s) ; 0 = charge maximale')
+    parser.add_argument('--admin-think', type=float, default=None,
+                        help='Intervalle de rafraîchissement des tableaux de bord (s, défaut 5 x --think)')
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help='Workers gunicorn')
+    parser.add_argument('--threads', type=int, default=8, help='Threads par worker gunicorn')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--db-dir', default=None, help='Répertoire des bases SQLite (défaut : temporaire)')
+    parser.add_argument('--no-seed', action='store_true', help='Réutiliser les bases de --db-dir')
+    parser.add_argument('--operators', type=int, default=200)
+    parser.add_argument('--launches', type=int, default=2000)
+    parser.add_argument('--history-rows', type=int, default=50000)
+    parser.add_argument('--connect-delay', type=float, default=0.03, help='Login SQL Server simulé (s)')
+    parser.add_argument('--roundtrip-delay', type=float, default=0.001, help='Aller-retour réseau simulé (s)')
+    parser.add_argument('--json', dest='json_out', default=None, help='Écrire le rapport JSON dans ce fichier')
+    parser.add_argument('--compare', default=None, help='Rapport JSON de référence à comparer')
+    parser.add_argument('--server-log', default=None, help='Journal du serveur (défaut : dans --db-dir)')
+    return parser.parse_args(argv)
+
+
+def start_server(args, db_dir, log):
+    env = dict(os.environ)
+    env[DB_DIR_ENV] = db_dir
+    env[CONNECT_DELAY_ENV] = str(args.connect_delay)
+    env[ROUNDTRIP_DELAY_ENV] = str(args.roundtrip_delay)
+    env['PYTHONUNBUFFERED'] = '1'
+    if args.server == 'gunicorn':
+        env['SEDI_BIND'] = f'127.0.0.1:{args.port}'
+        env['WEB_CONCURRENCY'] = str(args.workers)
+        env['SEDI_THREADS'] = str(args.threads)
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'bench.wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'bench.wsgi', '--port', str(args.port)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(port, process, timeout=120):
+    """Attend /api/health/ready (200) ; lève RuntimeError si le serveur s'arrête ou tarde"""
+    deadline = time.monotonic() + timeout
+    url = f'http://127.0.0.1:{port}/api/health/ready'
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Le serveur s\'est arrêté (code {process.returncode})')
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Serveur non prêt après {timeout}s')
+
+
+def stop_server(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def fetch_query_summary(port):
+    """Cumul par requête SQL nommée (/api/query-log) ; None si indisponible"""
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/query-log?limit=0', timeout=5) as response:
+            return json.loads(response.read()).get('requetes')
+    except (OSError, ValueError):
+        return None
+
+
+def print_report(report, reference=None):
+    total = report['total']
+    print()
+    print(f"Durée {report['duration_s']} s : {total['requests']} requêtes, {total['rps']} req/s, "
+          f"p50 {total['p50_ms']} ms, p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms, "
+          f"{total['errors']} erreur(s)")
+    print()
+    header = f"{'endpoint':<44} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}"
+    if reference:
+        header += f" {'Δp50':>8} {'Δp99':>8}"
+    print(header)
+    print('-' * len(header))
+    reference_endpoints = (reference or {}).get('endpoints', {})
+    for endpoint, stats in report['endpoints'].items():
+        line = (f"{endpoint:<44} {stats['requests']:>7} {stats['rps']:>8} {stats['p50_ms']:>8} "
+                f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['errors']:>5}")
+        before = reference_endpoints.get(endpoint)
+        if reference:
+            line += f" {_delta(before, stats, 'p50_ms'):>8} {_delta(before, stats, 'p99_ms'):>8}"
+        print(line)
+    if reference:
+        before = reference['total']
+        print()
+        print(f"Référence : {before['rps']} req/s, p50 {before['p50_ms']} ms, p99 {before['p99_ms']} ms "
+              f"-> {_percent(before['rps'], total['rps'])} débit, "
+              f"{_percent(before['p99_ms'], total['p99_ms'])} p99")
+    queries = report.get('queries')
+    if queries:
+        print()
+        print(f"{'requête SQL':<32} {'exécutions':>10} {'moy ms':>8} {'max ms':>8} {'total ms':>10}")
+        for query in queries[:15]:
+            print(f"{query['query']:<32} {query['executions']:>10} {query['avg_ms']:>8} "
+                  f"{query['max_ms']:>8} {query['total_ms']:>10}")
+
+
+def _delta(before, after, key):
+    if not before or before.get(key) is None or after.get(key) is None:
+        return '-'
+    return f"{after[key] - before[key]:+.1f}"
+
+
+def _percent(before, after):
+    if not before or after is None:
+        return '-'
+    return f"{(after - before) * 100.0 / before:+.0f} %"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix='sedi-bench-')
+    if not args.no_seed:
+        seeding.seed(db_dir, args.operators, args.launches, args.history_rows)
+
+    log_path = args.server_log or os.path.join(db_dir, 'server.log')
+    with open(log_path, 'wb') as log:
+        process = start_server(args, db_dir, log)
+        try:
+            wait_ready(args.port, process)
+            print(f"🚀 Serveur {args.server} prêt (journal : {log_path})")
+            if args.warmup > 0:
+                loadgen.run_load('127.0.0.1', args.port, args.tablets, args.admins, args.warmup,
+                                 args.operators, args.launches, args.think, args.admin_think, seed_value=2)
+                urllib.request.urlopen(
+                    urllib.request.Request(f'http://127.0.0.1:{args.port}/api/query-log/reset', method='POST'),
+                    timeout=5
+                ).close()
+            print(f"⏱️ Mesure : {args.tablets} tablette(s), {args.admins} tableau(x) de bord, {args.duration} s")
+            recorder = loadgen.run_load('127.0.0.1', args.port, args.tablets, args.admins, args.duration,
+                                        args.operators, args.launches, args.think, args.admin_think)
+            report = recorder.report()
+            # Avec gunicorn, seul le worker qui répond est résumé
+            report['queries'] = fetch_query_summary(args.port)
+        finally:
+            stop_server(process)
+
+    report['config'] = {
+        key: getattr(args, key)
+        for key in ('tablets', 'admins', 'duration', 'think', 'admin_think', 'server', 'workers', 'threads',
+                    'operators', 'launches', 'history_rows', 'connect_delay', 'roundtrip_delay')
+    }
+    reference = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            reference = json.load(f)
+    print_report(report, reference)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Rapport écrit dans {args.json_out}")
+    return 1 if report['total']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
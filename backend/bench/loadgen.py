@@ -0,0 +1,232 @@
+# Générateur de charge : tablettes d'atelier et tableaux de bord admin
+#
+# Chaque tablette suit le parcours de OperateurInterface.js : connexion
+# (/api/operateurs puis historique), puis en boucle saisie d'un code LT
+# (/api/ltc-data, ~5 % de codes inconnus), démarrage automatique, travail,
+# fin de travail avec le chronomètre, rechargement de l'historique. Chaque
+# tableau de bord suit AdminPage.js : chargement initial puis rafraîchissement
+# périodique des lancements, des badges et des vues "journée".
+#
+# Les latences sont regroupées par gabarit d'URL (/api/ltc-data/<code>) ;
+# les percentiles sont calculés au rang le plus proche.
+import gzip
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from bench.seed import operator_code, launch_code
+
+
+class Recorder:
+    """Latences et erreurs par gabarit d'endpoint, partagées par les clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._errors = {}
+        self._statuses = {}
+        self.started = None
+        self.stopped = None
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+            self._statuses.setdefault(endpoint, {}).setdefault(status, 0)
+            self._statuses[endpoint][status] += 1
+            if status is None or status >= 500:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    def report(self):
+        duration = (self.stopped or time.monotonic()) - self.started
+        with self._lock:
+            endpoints = {}
+            for endpoint, latencies in sorted(self._latencies.items()):
+                latencies = sorted(latencies)
+                endpoints[endpoint] = {
+                    'requests': len(latencies),
+                    'errors': self._errors.get(endpoint, 0),
+                    'statuses': {str(k): v for k, v in sorted(self._statuses[endpoint].items(), key=str)},
+                    'rps': round(len(latencies) / duration, 1),
+                    'p50_ms': percentile_ms(latencies, 50),
+                    'p95_ms': percentile_ms(latencies, 95),
+                    'p99_ms': percentile_ms(latencies, 99),
+                    'max_ms': round(latencies[-1] * 1000.0, 1)
+                }
+            everything = sorted(value for latencies in self._latencies.values() for value in latencies)
+        return {
+            'duration_s': round(duration, 1),
+            'total': {
+                'requests': len(everything),
+                'errors': sum(e['errors'] for e in endpoints.values()),
+                'rps': round(len(everything) / duration, 1),
+                'p50_ms': percentile_ms(everything, 50),
+                'p95_ms': percentile_ms(everything, 95),
+                'p99_ms': percentile_ms(everything, 99)
+            },
+            'endpoints': endpoints
+        }
+
+
+def percentile_ms(sorted_values, percent):
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100.0 * len(sorted_values)))
+    return round(sorted_values[rank - 1] * 1000.0, 1)
+
+
+class Client:
+    """Connexion HTTP keep-alive d'un appareil (tablette ou navigateur admin)"""
+
+    def __init__(self, host, port, recorder, timeout=30):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, endpoint, body=None):
+        """Retourne (statut, JSON décodé) ; (None, None) si la connexion a échoué"""
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._conn.request(method, path, body=payload, headers=headers)
+            response = self._conn.getresponse()
+            raw = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            if self.recorder is not None:
+                self.recorder.record(endpoint, time.perf_counter() - start, None)
+            return None, None
+        if self.recorder is not None:
+            self.recorder.record(endpoint, time.perf_counter() - start, status)
+        if response.getheader('Content-Encoding') == 'gzip':
+            raw = gzip.decompress(raw)
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    def get(self, path, endpoint=None):
+        return self.request('GET', path, endpoint or path)
+
+    def post(self, path, body, endpoint=None):
+        return self.request('POST', path, endpoint or path, body)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _now_iso():
+    # new Date().toISOString() côté tablette
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def tablet(client, stop, rng, operators, launches, think, unknown_rate=0.05):
+    """Parcours d'une tablette jusqu'à stop.set()"""
+    operateur_id = operator_code(rng.randint(1, operators))
+    _, data = client.get('/api/operateurs')
+    nom = operateur_id
+    for operateur in (data or {}).get('operateurs', []):
+        if operateur.get('operateur') == operateur_id:
+            nom = operateur.get('nom')
+            break
+    client.get(f'/api/historique-operateur/{operateur_id}', '/api/historique-operateur/<id>')
+
+    while not stop.is_set():
+        if rng.random() < unknown_rate:
+            code = f'XX{rng.randint(0, 9999999):07d}'
+        else:
+            code = launch_code(rng.randint(1, launches))
+        status, data = client.get(f'/api/ltc-data/{code}', '/api/ltc-data/<code>')
+        if stop.wait(rng.uniform(0, think)):
+            break
+        if status != 200 or not data or not data.get('success'):
+            continue
+
+        ltc = data.get('ltcData') or {}
+        work = {
+            'operateurId': operateur_id,
+            'operateurNom': nom,
+            'codeLancement': code,
+            'phase': ltc.get('phase', ''),
+            'codeRubrique': ltc.get('codeRubrique', '')
+        }
+        client.post('/api/demarrer-travail', dict(work, dateTravail=_now_iso()))
+
+        # Le chronomètre tourne sur la tablette pendant le travail
+        started = time.monotonic()
+        if stop.wait(rng.uniform(think, 3 * think)):
+            break
+        elapsed = int(time.monotonic() - started) + rng.randint(0, 3600)
+        client.post('/api/terminer-travail', dict(
+            work, tempsMinutes=elapsed // 60, tempsSecondes=elapsed % 60, dateTravail=_now_iso()
+        ))
+        client.get(f'/api/historique-operateur/{operateur_id}', '/api/historique-operateur/<id>')
+        stop.wait(rng.uniform(0, think))
+
+
+def dashboard(client, stop, rng, operators, think):
+    """Tableau de bord admin : chargement initial puis rafraîchissements périodiques"""
+    client.get('/api/test-connection')
+    client.get('/api/database-stats')
+    client.get('/api/lancements-status')
+    client.get('/api/operateurs-badges')
+
+    while not stop.wait(rng.uniform(think, 2 * think)):
+        client.get('/api/lancements-simple' if rng.random() < 0.3 else '/api/lancements-status')
+        client.get('/api/operateurs-badges')
+        client.get('/api/tous-operateurs-lancements-journee')
+        operateur_id = operator_code(rng.randint(1, operators))
+        client.get(f'/api/operateur-lancements-journee/{operateur_id}', '/api/operateur-lancements-journee/<id>')
+
+
+def run_load(host, port, tablets, admins, duration, operators, launches, think=1.0, admin_think=None,
+             seed_value=1, recorder=None):
+    """Lance tablettes et tableaux de bord pendant duration secondes ; retourne le Recorder"""
+    recorder = recorder or Recorder()
+    stop = threading.Event()
+    threads = []
+    for index in range(tablets):
+        rng = random.Random(seed_value * 100003 + index)
+        client = Client(host, port, recorder)
+        threads.append(threading.Thread(
+            target=_run_device, args=(tablet, client, stop, rng, operators, launches, think),
+            name=f'tablette-{index}', daemon=True
+        ))
+    for index in range(admins):
+        rng = random.Random(seed_value * 200003 + index)
+        client = Client(host, port, recorder)
+        threads.append(threading.Thread(
+            target=_run_device, args=(dashboard, client, stop, rng, operators, admin_think or 5 * think),
+            name=f'admin-{index}', daemon=True
+        ))
+
+    recorder.started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    recorder.stopped = time.monotonic()
+    for thread in threads:
+        thread.join(timeout=30)
+    return recorder
+
+
+def _run_device(flow, client, stop, *args):
+    try:
+        flow(client, stop, *args)
+    finally:
+        client.close()
@@ -0,0 +1,159 @@
+# Jeu de données du banc d'essai
+#
+# SEDI_ERP.db : RESSOURC (opérateurs, Typeressource = 'O') et LCTC (phases
+# des lancements), colonnes lues par le backend. SEDI_APP_INDEPENDANTE.db :
+# les trois tables de l'application, créées avec le même DDL que
+# create_app_tables (via le substitut pyodbc), plus un historique optionnel
+# réparti sur les derniers mois pour que les requêtes par date aient du volume.
+#
+# Les données sont déterministes (graine fixe) : deux campagnes avant / après
+# une modification portent sur la même base.
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+ERP_DATABASE = 'SEDI_ERP'
+APP_DATABASE = 'SEDI_APP_INDEPENDANTE'
+
+PHASES = ('10', '20', '30', '40', '50')
+RUBRIQUES = ('USIN', 'MONT', 'CTRL', 'PEINT')
+
+
+def operator_code(n):
+    return f'OP{n:04d}'
+
+
+def launch_code(n):
+    return f'LT{n:07d}'
+
+
+_OPERATION_COLUMNS = """Ident NVARCHAR(50) NOT NULL,
+                DateTravail DATETIME NOT NULL,
+                CodeLanctImprod NVARCHAR(50) NOT NULL,
+                Phase NVARCHAR(50) NOT NULL,
+                CodeRubrique NVARCHAR(50),
+                VarNumUtil8 INT DEFAULT 0,
+                VarNumUtil9 INT DEFAULT 0,"""
+
+_SESSION_COLUMNS = """Ident NVARCHAR(50) NOT NULL,
+                DateDebut DATETIME NOT NULL,
+                DateFin DATETIME,
+                CodeLanctImprod NVARCHAR(50) NOT NULL,
+                Phase NVARCHAR(50) NOT NULL,
+                CodeRubrique NVARCHAR(50),"""
+
+
+def _create(path):
+    if os.path.exists(path):
+        os.remove(path)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def seed_erp(path, operators, launches, rng):
+    conn = _create(path)
+    conn.execute("""
+        CREATE TABLE RESSOURC (
+            Coderessource TEXT PRIMARY KEY,
+            Designation1 TEXT,
+            Typeressource TEXT NOT NULL DEFAULT 'O'
+        )""")
+    conn.execute("""
+        CREATE TABLE LCTC (
+            CodeLanct TEXT NOT NULL,
+            Phase TEXT NOT NULL,
+            CodeRubrique TEXT,
+            PRIMARY KEY (CodeLanct, Phase)
+        )""")
+    conn.executemany(
+        'INSERT INTO RESSOURC VALUES (?, ?, ?)',
+        [(operator_code(n), f'Opérateur {n}', 'O') for n in range(1, operators + 1)]
+        # Ressources machines : présentes dans RESSOURC, filtrées par Typeressource
+        + [(f'MA{n:04d}', f'Machine {n}', 'M') for n in range(1, operators // 10 + 2)]
+    )
+    conn.executemany(
+        'INSERT INTO LCTC VALUES (?, ?, ?)',
+        [
+            (launch_code(n), phase, rng.choice(RUBRIQUES))
+            for n in range(1, launches + 1)
+            for phase in PHASES[:rng.randint(1, len(PHASES))]
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def seed_app(db_dir, history_rows, history_days, operators, launches, rng):
+    """Tables de l'application créées par le DDL du backend, puis historique en masse"""
+    from bench import sqlite_odbc
+
+    conn = _create(os.path.join(db_dir, f'{APP_DATABASE}.db'))
+    conn.close()
+
+    previous = os.environ.get(sqlite_odbc.DB_DIR_ENV)
+    os.environ[sqlite_odbc.DB_DIR_ENV] = db_dir
+    try:
+        odbc = sqlite_odbc.connect(timeout=0)
+        cursor = odbc.cursor()
+        for table, default_status, columns in (
+            ('ABTEMPS_OPERATEURS', 'EN_COURS', _OPERATION_COLUMNS),
+            ('ABHISTORIQUE_OPERATEURS', 'TERMINE', _OPERATION_COLUMNS),
+            ('ABSESSIONS_OPERATEURS', 'ACTIVE', _SESSION_COLUMNS)
+        ):
+            cursor.execute(f"""
+            IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[{APP_DATABASE}].[dbo].[{table}]') AND type in (N'U'))
+            CREATE TABLE [{APP_DATABASE}].[dbo].[{table}] (
+                NoEnreg INT IDENTITY(1,1) PRIMARY KEY,
+                {columns}
+                Statut NVARCHAR(20) DEFAULT '{default_status}',
+                DateCreation DATETIME DEFAULT GETDATE()
+            )
+            """)
+        odbc.commit()
+
+        now = datetime.now().replace(microsecond=0)
+        batch = []
+        for _ in range(history_rows):
+            date_travail = now - timedelta(seconds=rng.randint(3600, history_days * 86400))
+            batch.append((
+                operator_code(rng.randint(1, operators)), date_travail, launch_code(rng.randint(1, launches)),
+                rng.choice(PHASES), rng.choice(RUBRIQUES), rng.randint(0, 240), rng.randint(0, 59),
+                'TERMINE', date_travail
+            ))
+            if len(batch) == 10000:
+                _insert_history(cursor, batch)
+                batch = []
+        if batch:
+            _insert_history(cursor, batch)
+        odbc.commit()
+        odbc.close()
+    finally:
+        if previous is None:
+            os.environ.pop(sqlite_odbc.DB_DIR_ENV, None)
+        else:
+            os.environ[sqlite_odbc.DB_DIR_ENV] = previous
+
+
+def _insert_history(cursor, rows):
+    cursor.executemany(
+        f"INSERT INTO [{APP_DATABASE}].[dbo].[ABHISTORIQUE_OPERATEURS] "
+        "(Ident, DateTravail, CodeLanctImprod, Phase, CodeRubrique, VarNumUtil8, VarNumUtil9, Statut, DateCreation) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+
+
+def seed(db_dir, operators=200, launches=2000, history_rows=0, history_days=180, seed_value=42):
+    """(Re)crée les deux bases du banc d'essai dans db_dir"""
+    os.makedirs(db_dir, exist_ok=True)
+    rng = random.Random(seed_value)
+    seed_erp(os.path.join(db_dir, f'{ERP_DATABASE}.db'), operators, launches, rng)
+    seed_app(db_dir, history_rows, history_days, operators, launches, rng)
+    print(f"🌱 Bases de banc d'essai créées dans {db_dir}: {operators} opérateurs, "
+          f"{launches} lancements, {history_rows} lignes d'historique")
@@ -0,0 +1,543 @@
+# Substitut de pyodbc adossé à SQLite pour le banc d'essai
+#
+# Expose le sous-ensemble de l'API pyodbc utilisé par le backend (connect,
+# Connection, Cursor, Error...) et traduit à la volée le T-SQL de app.py,
+# migrations.py et write_batcher.py : noms à trois parties, TOP (n) / TOP (?), GETDATE,
+# DATEADD, CAST, ISNULL, OUTPUT INSERTED, IF NOT EXISTS ... CREATE,
+# IF COL_LENGTH(...) IS NULL ALTER TABLE ... ADD, DELETE TOP ... OUTPUT INTO, lots
+# d'instructions parcourus avec nextset(), verrou applicatif des migrations.
+#
+# Chaque base SQL Server (SEDI_APP_INDEPENDANTE, SEDI_ERP) est un fichier
+# SQLite en mode WAL du répertoire SEDI_BENCH_DB_DIR, attaché sous son nom à
+# chaque connexion. La latence réseau de SERVEURERP est simulée par
+# SEDI_BENCH_CONNECT_DELAY (login) et SEDI_BENCH_ROUNDTRIP_DELAY (aller-retour),
+# en secondes : sans elles, un pool de connexions ne changerait rien aux mesures.
+#
+# Non émulé : métadonnées sys.dm_db_partition_stats / sys.partitions
+# (/api/database-stats en mode métadonnées), requêtes du module d'export ERP.
+import functools
+import glob
+import os
+import re
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+pooling = True
+
+DB_DIR_ENV = 'SEDI_BENCH_DB_DIR'
+CONNECT_DELAY_ENV = 'SEDI_BENCH_CONNECT_DELAY'
+ROUNDTRIP_DELAY_ENV = 'SEDI_BENCH_ROUNDTRIP_DELAY'
+
+SQLITE_BUSY_TIMEOUT = 10.0
+
+
+class Error(Exception):
+    """Erreur pyodbc : args = (SQLSTATE, message)"""
+
+
+class DatabaseError(Error):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    pass
+
+
+class IntegrityError(DatabaseError):
+    pass
+
+
+def _delay(env, default):
+    try:
+        return float(os.environ.get(env, default))
+    except ValueError:
+        return default
+
+
+def _database_files():
+    directory = os.environ.get(DB_DIR_ENV)
+    if not directory:
+        raise OperationalError('08001', f'{DB_DIR_ENV} non défini : base de banc d\'essai introuvable')
+    files = {os.path.splitext(os.path.basename(path))[0]: path
+             for path in glob.glob(os.path.join(directory, '*.db'))}
+    if not files:
+        raise OperationalError('08001', f'Aucune base *.db dans {directory}')
+    return files
+
+
+# ---- Conversion des types ----
+
+# DATETIME SQL Server : l'heure murale est conservée, le fuseau ignoré
+sqlite3.register_adapter(datetime, lambda value: value.replace(tzinfo=None).isoformat(' '))
+
+_DATETIME_RE = re.compile(r'\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(\.\d{1,6})?')
+
+
+def _convert(value):
+    if isinstance(value, str) and len(value) >= 19 and value[4] == '-' and _DATETIME_RE.fullmatch(value):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _convert_rows(rows):
+    return [tuple(_convert(value) for value in row) for row in rows]
+
+
+# ---- Traduction T-SQL -> SQLite ----
+
+_GETDATE = "datetime('now', 'localtime')"
+_DATEADD_UNITS = {
+    'second': 'seconds', 'ss': 'seconds', 's': 'seconds',
+    'minute': 'minutes', 'mi': 'minutes', 'n': 'minutes',
+    'hour': 'hours', 'hh': 'hours',
+    'day': 'days', 'dd': 'days', 'd': 'days',
+    'month': 'months', 'mm': 'months', 'm': 'months',
+    'year': 'years', 'yy': 'years', 'yyyy': 'years'
+}
+_DATEDIFF_SECONDS = {'second': 1, 'ss': 1, 's': 1, 'minute': 60, 'mi': 60, 'n': 60,
+                     'hour': 3600, 'hh': 3600, 'day': 86400, 'dd': 86400, 'd': 86400}
+
+_CREATE_TABLE_IF_RE = re.compile(
+    r"IF\s+NOT\s+EXISTS\s*\(\s*SELECT\s+\*\s+FROM\s+sys\.objects\s+WHERE[^\n]*?\)\)\s*CREATE\s+TABLE", re.I
+)
+_CREATE_INDEX_IF_RE = re.compile(
+    r"IF\s+NOT\s+EXISTS\s*\(\s*SELECT\s+1\s+FROM\s+sys\.indexes[^\n]*?\)\)\s*"
+    r"CREATE\s+(?:NONCLUSTERED\s+|CLUSTERED\s+)?(?:UNIQUE\s+)?INDEX\s+\[(\w+)\]\s+ON\s+"
+    r"\[(\w+)\]\.\[\w+\]\.\[(\w+)\]\s*\(([^)]*)\)(?:\s*INCLUDE\s*\([^)]*\))?", re.I
+)
+_ADD_COLUMN_IF_RE = re.compile(
+    r"IF\s+COL_LENGTH\s*\(\s*N?'[^']*'\s*,\s*N?'(\w+)'\s*\)\s+IS\s+NULL\s+"
+    r"ALTER\s+TABLE\s+(\S+)\s+ADD\s+(.*)$", re.I | re.S
+)
+_DELETE_OUTPUT_RE = re.compile(
+    r"DELETE\s+TOP\s*\(\s*\?\s*\)\s+FROM\s+(\S+)\s+OUTPUT\s+(.+?)\s+INTO\s+(\S+)\s*\(([^)]*)\)\s+"
+    r"WHERE\s+(.*)$", re.I | re.S
+)
+_ROWCOUNT_IF_RE = re.compile(r"\bIF\s+@@ROWCOUNT\s*=\s*0\b", re.I)
+_THREE_PART_RE = re.compile(r"\[(\w+)\]\.\[\w+\]\.\[(\w+)\]")
+_BRACKET_RE = re.compile(r"\[(\w+)\]")
+_TOP_RE = re.compile(r"\bSELECT\s+TOP\s*\(?\s*(\d+)\s*\)?", re.I)
+_TOP_PARAM_RE = re.compile(r"\bSELECT\s+TOP\s*\(\s*\?\s*\)", re.I)
+_OUTPUT_RE = re.compile(r"\bOUTPUT\s+INSERTED\.(\w+)\s+(VALUES\s*\(.*\))\s*$", re.I | re.S)
+
+
+def _split_top_level(sql, separator):
+    """Découpe sur un séparateur hors chaînes et hors parenthèses"""
+    parts, depth, in_string, start = [], 0, False, 0
+    for index, char in enumerate(sql):
+        if char == "'":
+            in_string = not in_string
+        elif not in_string:
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == separator and depth == 0:
+                parts.append(sql[start:index])
+                start = index + 1
+    parts.append(sql[start:])
+    return parts
+
+
+def _rewrite_calls(sql, name, build):
+    """Remplace chaque appel name(...) par build(arguments traduits), parenthèses équilibrées"""
+    pattern = re.compile(r'\b' + name + r'\s*\(', re.I)
+    out, pos = [], 0
+    while True:
+        match = pattern.search(sql, pos)
+        if not match:
+            break
+        depth, index, in_string = 1, match.end(), False
+        while index < len(sql):
+            char = sql[index]
+            if char == "'":
+                in_string = not in_string
+            elif not in_string:
+                if char == '(':
+                    depth += 1
+                elif char == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+            index += 1
+        args = [_rewrite_calls(arg.strip(), name, build)
+                for arg in _split_top_level(sql[match.end():index], ',')]
+        out.append(sql[pos:match.start()])
+        out.append(build(args))
+        pos = index + 1
+    out.append(sql[pos:])
+    return ''.join(out)
+
+
+_CAST_RE = re.compile(r"(.*)\s+AS\s+(\w+)(?:\s*\([^)]*\))?\s*$", re.I | re.S)
+
+
+def _cast(args):
+    match = _CAST_RE.match(args[0])
+    expression, target = match.group(1), match.group(2).upper()
+    if target == 'DATE':
+        return f"date({expression})"
+    if target == 'DATETIME':
+        return f"datetime({expression})"
+    if target in ('INT', 'BIGINT', 'SMALLINT', 'TINYINT'):
+        return f"CAST({expression} AS INTEGER)"
+    if target in ('NVARCHAR', 'VARCHAR', 'NCHAR', 'CHAR'):
+        return f"CAST({expression} AS TEXT)"
+    return f"CAST({expression} AS {target})"
+
+
+def _dateadd(args):
+    unit, amount, expression = args
+    return f"datetime({expression}, ({amount}) || ' {_DATEADD_UNITS[unit.lower()]}')"
+
+
+def _datediff(args):
+    unit, start, end = args
+    seconds = f"CAST(ROUND((julianday({end}) - julianday({start})) * 86400) AS INTEGER)"
+    return f"({seconds} / {_DATEDIFF_SECONDS[unit.lower()]})"
+
+
+def _number_params(sql, first):
+    """Remplace chaque ? hors chaîne par ?N (numérotés à partir de first)"""
+    parts, number, in_string = [], first, False
+    for char in sql:
+        if char == "'":
+            in_string = not in_string
+        elif char == '?' and not in_string:
+            char, number = f'?{number}', number + 1
+        parts.append(char)
+    return ''.join(parts)
+
+
+def _count_params(sql):
+    count, in_string = 0, False
+    for char in sql:
+        if char == "'":
+            in_string = not in_string
+        elif char == '?' and not in_string:
+            count += 1
+    return count
+
+
+class _Statement:
+    __slots__ = ('kind', 'sql', 'params', 'partition_stats', 'column')
+
+    def __init__(self, kind, sql='', params=0, column=None):
+        self.kind = kind            # 'run', 'skip', 'const', 'if_no_rows', 'add_column', 'delete_output'
+        self.sql = sql
+        self.params = params
+        self.partition_stats = isinstance(sql, str) and 'temp.sedi_partition_stats' in sql
+        self.column = column        # (table traduite, colonne) pour 'add_column'
+
+
+def _translate_expression(sql):
+    sql = re.sub(r"DEFAULT\s+GETDATE\(\)", f"DEFAULT ({_GETDATE})", sql, flags=re.I)
+    sql = re.sub(r"\bGETDATE\(\)", _GETDATE, sql, flags=re.I)
+    sql = re.sub(r"\bINT\s+IDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)\s+PRIMARY\s+KEY", 'INTEGER PRIMARY KEY AUTOINCREMENT',
+                 sql, flags=re.I)
+    sql = re.sub(r"\b(N?VARCHAR)\s*\(\s*MAX\s*\)", r"\1", sql, flags=re.I)
+    sql = re.sub(r"\bISNULL\s*\(", 'IFNULL(', sql, flags=re.I)
+    sql = re.sub(r"\bLEN\s*\(", 'LENGTH(', sql, flags=re.I)
+    sql = re.sub(r"\bsys\.databases\b", 'pragma_database_list', sql, flags=re.I)
+    sql = re.sub(r"\bsys\.dm_db_partition_stats\b", 'temp.sedi_partition_stats', sql, flags=re.I)
+    sql = _rewrite_calls(sql, 'CAST', _cast)
+    sql = _rewrite_calls(sql, 'DATEADD', _dateadd)
+    sql = _rewrite_calls(sql, 'DATEDIFF', _datediff)
+    sql = _THREE_PART_RE.sub(r'"\1"."\2"', sql)
+    sql = _BRACKET_RE.sub(r'"\1"', sql)
+    sql = re.sub(r"\bN'", "'", sql)
+    match = _TOP_PARAM_RE.search(sql)
+    if match and _count_params(sql[:match.start()]) == 0:
+        # TOP (?) : premier paramètre, lié au LIMIT final par son numéro
+        sql = sql[:match.start()] + 'SELECT' + _number_params(sql[match.end():], 2) + ' LIMIT ?1'
+    match = _TOP_RE.search(sql)
+    if match:
+        sql = sql[:match.start()] + 'SELECT' + sql[match.end():] + f' LIMIT {match.group(1)}'
+    match = _OUTPUT_RE.search(sql)
+    if match:
+        sql = sql[:match.start()] + f"{match.group(2)} RETURNING {match.group(1)}"
+    return sql
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(sql):
+    """Lot T-SQL -> liste d'instructions SQLite (mise en cache par texte de requête)"""
+    sql = _CREATE_TABLE_IF_RE.sub('CREATE TABLE IF NOT EXISTS', sql)
+    sql = _CREATE_INDEX_IF_RE.sub(r'CREATE INDEX IF NOT EXISTS "\2"."\1" ON "\3" (\4)', sql)
+    statements = []
+    for raw in _split_top_level(sql, ';'):
+        text = raw.strip()
+        if not text:
+            continue
+        params = _count_params(text)
+        head = text.split(None, 1)[0].upper()
+        if 'sp_getapplock' in text or 'sp_releaseapplock' in text or head in ('SET', 'DECLARE', 'EXEC', 'GO'):
+            statements.append(_Statement('skip', params=params))
+        elif head == 'SELECT' and re.fullmatch(r"SELECT\s+@\w+", text, re.I):
+            # Résultat du verrou applicatif : toujours obtenu (SQLite sérialise les écritures)
+            statements.append(_Statement('const', params=params))
+        elif re.match(r"CREATE\s+DATABASE\b", text, re.I):
+            statements.append(_Statement('skip', params=params))
+        elif _ADD_COLUMN_IF_RE.match(text):
+            column, table, definition = _ADD_COLUMN_IF_RE.match(text).groups()
+            table = _translate_expression(table)
+            statements.append(_Statement('add_column', f'ALTER TABLE {table} ADD COLUMN {definition}',
+                                         params, (table, column)))
+        elif _DELETE_OUTPUT_RE.match(text):
+            # Lignes choisies une fois (TOP en dernier paramètre), copiées puis supprimées
+            source, outputs, target, columns, condition = _DELETE_OUTPUT_RE.match(text).groups()
+            source, target = _translate_expression(source), _translate_expression(target)
+            outputs = re.sub(r"\bDELETED\.", '', outputs, flags=re.I)
+            selected = 'SELECT id FROM temp.sedi_deleted'
+            statements.append(_Statement('delete_output', (
+                'CREATE TEMP TABLE IF NOT EXISTS sedi_deleted (id INTEGER PRIMARY KEY)',
+                'DELETE FROM temp.sedi_deleted',
+                f'INSERT INTO temp.sedi_deleted SELECT rowid FROM {source} '
+                f'WHERE {_translate_expression(condition)} LIMIT ?',
+                f'INSERT INTO {target} ({columns}) SELECT {outputs} FROM {source} WHERE rowid IN ({selected})',
+                f'DELETE FROM {source} WHERE rowid IN ({selected})'
+            ), params))
+        elif _ROWCOUNT_IF_RE.search(text):
+            first, second = _ROWCOUNT_IF_RE.split(text, 1)
+            statements.append(_Statement('run', _translate_expression(first.strip()), _count_params(first)))
+            statements.append(_Statement('if_no_rows', _translate_expression(second.strip()), _count_params(second)))
+        else:
+            statements.append(_Statement('run', _translate_expression(text), params))
+    return tuple(statements)
+
+
+def _map_error(exc):
+    message = str(exc)
+    if isinstance(exc, sqlite3.IntegrityError):
+        return IntegrityError('23000', message)
+    if message == 'interrupted':
+        return OperationalError('HYT00', '[SQLite] Query timeout expired')
+    if 'locked' in message or 'busy' in message:
+        return OperationalError('HYT00', f'[SQLite] Lock request time out period exceeded ({message})')
+    if isinstance(exc, sqlite3.OperationalError) and ('no such' in message or 'syntax' in message):
+        return ProgrammingError('42000', message)
+    return Error('HY000', message)
+
+
+# ---- API pyodbc ----
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._results = []          # [(description, lignes)] restant à lire
+        self._rows = []
+        self.description = None
+        self.rowcount = -1
+        self.messages = []
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        params = list(params)
+        results = []
+        rowcount = -1
+        self.connection._roundtrip()
+        try:
+            with self.connection._guard():
+                for statement in translate(sql):
+                    values, params = params[:statement.params], params[statement.params:]
+                    if statement.kind == 'skip':
+                        continue
+                    if statement.kind == 'const':
+                        results.append(((('result', None, None, None, None, None, None),), [(0,)]))
+                        continue
+                    if statement.kind == 'if_no_rows' and rowcount != 0:
+                        continue
+                    if statement.kind == 'add_column' and self.connection._has_column(*statement.column):
+                        continue
+                    if statement.kind == 'delete_output':
+                        for step, sql_step in enumerate(statement.sql):
+                            cursor = self.connection._conn.execute(sql_step, values[1:] + values[:1] if step == 2 else ())
+                        rowcount = cursor.rowcount
+                        continue
+                    if statement.partition_stats:
+                        self.connection._refresh_partition_stats()
+                    cursor = self.connection._conn.execute(statement.sql, values)
+                    if cursor.description is not None:
+                        results.append((cursor.description, _convert_rows(cursor.fetchall())))
+                    rowcount = cursor.rowcount
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+        self.rowcount = rowcount
+        self._results = results
+        self._next_result()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        statements = [s for s in translate(sql) if s.kind == 'run']
+        if len(statements) != 1:
+            raise ProgrammingError('HY000', 'executemany : une seule instruction attendue')
+        self.connection._roundtrip()
+        try:
+            with self.connection._guard():
+                cursor = self.connection._conn.executemany(statements[0].sql, [list(p) for p in seq_of_params])
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+        self.rowcount = cursor.rowcount
+        self._results = []
+        self._rows = []
+        self.description = None
+        return self
+
+    def _next_result(self):
+        if self._results:
+            self.description, self._rows = self._results.pop(0)
+            return True
+        self.description, self._rows = None, []
+        return False
+
+    def nextset(self):
+        return self._next_result() or None
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.pop(0)
+
+    def cancel(self):
+        self.connection._conn.interrupt()
+
+    def close(self):
+        self._results = []
+        self._rows = []
+
+
+class Connection:
+    def __init__(self, files):
+        self.timeout = 0            # Délai d'exécution (s), 0 = illimité, comme pyodbc
+        self._deadline = None
+        self._roundtrip_delay = _delay(ROUNDTRIP_DELAY_ENV, 0.001)
+        self._conn = sqlite3.connect(':memory:', timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        for name, path in files.items():
+            self._conn.execute(f'ATTACH DATABASE ? AS "{name}"', (path,))
+        self._databases = list(files)
+        self._conn.create_function('OBJECT_ID', -1, self._object_id)
+        self._conn.set_progress_handler(self._check_deadline, 1000)
+
+    @property
+    def autocommit(self):
+        return self._conn.isolation_level is None
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._conn.isolation_level = None if value else ''
+
+    def _roundtrip(self):
+        if self._roundtrip_delay > 0:
+            time.sleep(self._roundtrip_delay)
+
+    @contextmanager
+    def _guard(self):
+        """Délai d'exécution (Connection.timeout) appliqué par le gestionnaire de progression"""
+        self._deadline = time.monotonic() + self.timeout if self.timeout else None
+        try:
+            yield
+        finally:
+            self._deadline = None
+
+    def _check_deadline(self):
+        return 1 if self._deadline is not None and time.monotonic() > self._deadline else 0
+
+    def _object_id(self, name, object_type=None):
+        """OBJECT_ID(N'[base].[schéma].[table]') : identifiant stable si la table existe, sinon NULL"""
+        parts = re.findall(r'\w+', name or '')
+        if not parts:
+            return None
+        database, table = (parts[0], parts[-1]) if len(parts) > 1 else ('main', parts[0])
+        if database not in self._databases:
+            return None
+        row = self._conn.execute(
+            f'SELECT type FROM "{database}".sqlite_master WHERE name = ? COLLATE NOCASE', (table,)
+        ).fetchone()
+        if row is None or (object_type and object_type.upper() == 'U' and row[0] != 'table'):
+            return None
+        return zlib.crc32(f'{database}.{table}'.lower().encode()) & 0x7fffffff
+
+    def _has_column(self, table, column):
+        """COL_LENGTH(...) IS NOT NULL ; table déjà traduite (\"base\".\"table\")"""
+        database, name = re.findall(r'\w+', table)[-2:] if table.count('.') else ('main', table.strip('"'))
+        rows = self._conn.execute(f'PRAGMA "{database}".table_info("{name}")').fetchall()
+        return any(row[1].lower() == column.lower() for row in rows)
+
+    def _refresh_partition_stats(self):
+        """Équivalent de sys.dm_db_partition_stats : lignes et pages estimées par table"""
+        # Hors transaction de l'appelant, sinon l'instantané WAL resterait ouvert
+        in_transaction = self._conn.in_transaction
+        self._conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS sedi_partition_stats '
+            '(object_id INTEGER, index_id INTEGER, row_count INTEGER, used_page_count INTEGER, '
+            'reserved_page_count INTEGER)'
+        )
+        self._conn.execute('DELETE FROM temp.sedi_partition_stats')
+        for database in self._databases:
+            tables = self._conn.execute(
+                f'SELECT name FROM "{database}".sqlite_master WHERE type = \'table\''
+            ).fetchall()
+            for (table,) in tables:
+                rows = self._conn.execute(f'SELECT COUNT(*) FROM "{database}"."{table}"').fetchone()[0]
+                pages = max(1, rows // 50)
+                self._conn.execute(
+                    'INSERT INTO temp.sedi_partition_stats VALUES (?, 1, ?, ?, ?)',
+                    (self._object_id(f'{database}.{table}'), rows, pages, pages)
+                )
+        if not in_transaction:
+            self._conn.commit()
+
+    def cursor(self):
+        return Cursor(self)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._roundtrip()
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+
+    def rollback(self):
+        try:
+            self._conn.rollback()
+        except sqlite3.Error as e:
+            raise _map_error(e) from e
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(connection_string='', timeout=0, autocommit=False, **kwargs):
+    """pyodbc.connect : la chaîne de connexion est ignorée, toutes les bases sont attachées"""
+    files = _database_files()
+    delay = _delay(CONNECT_DELAY_ENV, 0.03)
+    if delay > 0:
+        time.sleep(delay)
+    try:
+        conn = Connection(files)
+    except sqlite3.Error as e:
+        raise OperationalError('08001', str(e)) from e
+    conn.autocommit = autocommit
+    return conn
@@ -0,0 +1,45 @@
+# Point d'entrée du backend branché sur le substitut SQLite de SQL Server
+#
+#   SEDI_BENCH_DB_DIR=/tmp/sedi-bench gunicorn -c gunicorn.conf.py bench.wsgi:app
+#   SEDI_BENCH_DB_DIR=/tmp/sedi-bench python -m bench.wsgi --port 5099
+#
+# Le module pyodbc est remplacé avant l'import de app : tout le reste du
+# backend (pools, caches, migrations, écriture groupée) est exécuté tel quel.
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bench import sqlite_odbc  # noqa: E402
+
+sys.modules['pyodbc'] = sqlite_odbc
+
+from app import app  # noqa: E402
+
+__all__ = ['app']
+
+
+def main():
+    """Serveur de développement multi-thread (sans debug ni rechargement)"""
+    import argparse
+    import app as backend
+
+    parser = argparse.ArgumentParser(description='Backend SEDI sur base SQLite (banc d\'essai)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    if backend.STARTUP_CONFIG['background']:
+        backend.start_in_background()
+    else:
+        backend.run_startup()
+    try:
+        app.run(host=args.host, port=args.port, debug=False, threaded=True, use_reloader=False)
+    finally:
+        backend.shutdown()
+
+
+if __name__ == '__main__':
+    main()
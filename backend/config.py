@@ -16,7 +16,7 @@ DB_CONFIG = {
 FLASK_CONFIG = {
     'host': '0.0.0.0',
     'port': 5000,
-    'debug': True
+    'debug': False              # Serveur de développement uniquement (python app.py)
 }
 
 # Messages d'erreur
@@ -25,22 +25,197 @@ ERROR_MESSAGES = {
     'query_failed': 'Erreur lors de l\'exécution de la requête',
     'driver_not_found': 'Driver ODBC non trouvé. Installez Microsoft ODBC Driver for SQL Server',
     'server_unreachable': 'Serveur SERVEURERP non accessible',
-    'invalid_credentials': 'Identifiants QUALITE/QUALITE incorrects'
+    'invalid_credentials': 'Identifiants QUALITE/QUALITE incorrects',
+    'timeout': 'La base de données ne répond pas à temps, veuillez réessayer',
+    'uncertain_write': 'Enregistrement non confirmé à temps, vérifiez l\'historique avant de recommencer'
 }
 
 # Tables de l'application dans la base autonome
 APP_TABLES = {
     'temps_travail': '[SEDI_APP_INDEPENDANTE].[dbo].[ABTEMPS_OPERATEURS]',
     'historique': '[SEDI_APP_INDEPENDANTE].[dbo].[ABHISTORIQUE_OPERATEURS]',
-    'sessions': '[SEDI_APP_INDEPENDANTE].[dbo].[ABSESSIONS_OPERATEURS]'
+    'sessions': '[SEDI_APP_INDEPENDANTE].[dbo].[ABSESSIONS_OPERATEURS]',
+    'evenements': '[SEDI_APP_INDEPENDANTE].[dbo].[AB_EVENEMENTS_TABLETTES]',  # eventId déjà ingérés
+    'archives': '[SEDI_APP_INDEPENDANTE].[dbo].[AB_ARCHIVES_HISTORIQUE]'      # Mois archivés de l'historique
 }
 
 # Tables de fallback dans SEDI_ERP
 FALLBACK_TABLES = {
     'temps_travail': '[SEDI_ERP].[dbo].[ABTEMPS_OPERATEURS]',
     'historique': '[SEDI_ERP].[dbo].[ABHISTORIQUE_OPERATEURS]',
-    'sessions': '[SEDI_ERP].[dbo].[ABSESSIONS_OPERATEURS]'
+    'sessions': '[SEDI_ERP].[dbo].[ABSESSIONS_OPERATEURS]',
+    'evenements': '[SEDI_ERP].[dbo].[AB_EVENEMENTS_TABLETTES]',
+    'archives': '[SEDI_ERP].[dbo].[AB_ARCHIVES_HISTORIQUE]'
 }
 
 # Mode de fonctionnement (True = simulation, False = vraies tables)
-SIMULATION_MODE = False  # Désactivé pour utiliser la vraie base de données 
\ No newline at end of file
+SIMULATION_MODE = False  # Désactivé pour utiliser la vraie base de données 
+
+# Pool de connexions SQL Server (un pool par base configurée)
+POOL_CONFIG = {
+    'max_size': 10,             # Connexions simultanées max par base
+    'min_idle': 1,              # Connexions inactives conservées malgré idle_timeout
+    'idle_timeout': 300,        # Secondes avant fermeture d'une connexion inactive
+    'max_lifetime': 3600,       # Durée de vie max d'une connexion physique (secondes)
+    'acquire_timeout': 10,      # Attente max pour obtenir une connexion (secondes)
+    'validate_on_borrow': True, # Ping SELECT 1 avant de prêter une connexion
+    'validation_interval': 10   # Pas de ping si la connexion a servi il y a moins de N s (0 = toujours)
+}
+
+# Cache de l'état de la base (choix SEDI_APP / fallback / simulation, tables présentes)
+DB_STATE_CONFIG = {
+    'ttl': 60,                  # Re-sondage en arrière-plan toutes les N secondes
+    'min_reprobe_interval': 2   # Délai minimal entre deux sondages déclenchés par des erreurs
+}
+
+# Export incrémental vers l'ERP (TEMP_IMPORT_APP)
+EXPORT_CONFIG = {
+    'chunk_size': 5000,         # Lignes lues (fetchmany) et insérées par transaction
+    'safety_lag_seconds': 30    # Les lignes plus récentes attendent le prochain export
+}
+
+# Annuaire des opérateurs (RESSOURC) gardé en mémoire
+OPERATOR_DIRECTORY_CONFIG = {
+    'ttl': 3600,                # Rafraîchissement en arrière-plan toutes les N secondes
+    'retry_interval': 30        # Nouvelle tentative après un échec de chargement
+}
+
+# Cache des lookups LCTC (/api/ltc-data)
+LTC_CACHE_CONFIG = {
+    'max_size': 5000,           # Codes lancement gardés en mémoire (LRU)
+    'ttl': 300,                 # Durée de vie d'un code trouvé (secondes)
+    'negative_ttl': 30,         # Durée de vie d'un code inconnu (secondes)
+    'bulk_max_codes': 1000      # Codes max par appel groupé (?codes=A,B,C)
+}
+
+# Écriture groupée (group commit) des INSERT de démarrage / fin de travail
+WRITE_BATCH_CONFIG = {
+    'enabled': False,           # True = un thread écrivain regroupe les INSERT concurrents
+    'max_batch': 100,           # Lignes max par transaction
+    'max_delay_ms': 5,          # Attente max avant d'écrire un lot incomplet
+    'result_timeout': 10        # Attente max d'une requête pour son NoEnreg (secondes)
+}
+
+# Stockage en mémoire du mode simulation / mode dégradé
+SIMULATION_CONFIG = {
+    'max_records': 100000,      # Enregistrements conservés par table (les plus anciens sont évincés)
+    'snapshot_path': None,      # Fichier JSON d'instantané (None = pas de persistance)
+    'snapshot_interval': 60     # Sauvegarde toutes les N secondes si des données ont changé
+}
+
+# Statistiques des tables (/api/database-stats)
+STATS_CONFIG = {
+    'refresh_interval': 60      # Durée de validité du cache (secondes)
+}
+
+# Sondage périodique des bases (/api/health, /api/health/ready, /api/health/details)
+HEARTBEAT_CONFIG = {
+    'interval': 10,             # Secondes entre deux sondages
+    'timeout': 5,               # Délai max d'un sondage (emprunt + SELECT 1)
+    'history': 60               # Latences conservées par base
+}
+
+# Serveur de production (gunicorn -c gunicorn.conf.py wsgi:app)
+SERVER_CONFIG = {
+    'bind': '0.0.0.0:5000',
+    'workers': 2,               # Processus (surchargé par WEB_CONCURRENCY)
+    'threads': 8,               # Threads par processus (surchargé par SEDI_THREADS)
+    'timeout': 120,             # Requête bloquée au-delà : le worker est redémarré
+    'graceful_timeout': 30,     # SIGTERM : délai laissé aux requêtes en cours
+    'keepalive': 5,             # Secondes de keep-alive HTTP (tablettes)
+    'warm_connections': 2       # Connexions ouvertes par pool avant d'accepter du trafic
+}
+
+# Budgets de temps par route (secondes) : attente d'une connexion, login et
+# exécution des requêtes. Au-delà : réponse 504 avec code DB_TIMEOUT.
+DEADLINE_CONFIG = {
+    'default': 15,
+    'login_timeout': 5,         # Login SQL Server (pyodbc.connect), borné par le budget
+    'retry_after': 2,           # En-tête Retry-After de la réponse 504
+    'export_chunk': 300,        # Export ERP : budget de chaque lot (thread de l'export)
+    'routes': {
+        # Tablettes : l'opérateur attend devant l'écran
+        'demarrer_travail': 5,
+        'terminer_travail': 5,
+        'ingest_evenements_travail': 15,  # File hors connexion : jusqu'à max_events lignes
+        'pause_travail': 5,
+        'reprendre_travail': 5,
+        'get_ltc_data': 3,
+        'get_ltc_data_bulk': 5,
+        'get_operateurs_badges': 5,
+        'get_historique_operateur': 10,
+        # Administration
+        'terminer_session_admin': 5,
+        'get_database_statistics': 60,
+        'test_permissions': 30
+    }
+}
+
+# Flux temps réel du tableau de bord admin (/api/live-feed, Server-Sent Events)
+LIVE_FEED_CONFIG = {
+    'poll_interval': 2,         # Secondes entre deux sondages (un seul poller par processus)
+    'max_events_per_poll': 500, # Lignes lues au plus par table et par sondage
+    'keepalive': 15,            # Secondes entre deux commentaires keep-alive
+    'replay_size': 500,         # Événements conservés pour la reprise (Last-Event-ID)
+    'client_queue_size': 1000,  # Événements en attente par client avant déconnexion
+    'max_clients': None,        # Par worker ; None : max(1, threads // 4) (un thread par client)
+    'follow_seconds': 600       # Sondage maintenu après la dernière lecture des synthèses du jour
+}
+
+# Synthèse par lancement du jour (/api/lancements-status, /api/lancements-simple)
+LAUNCH_SUMMARY_CONFIG = {
+    'reconcile_interval': 300   # Recalcul complet (filet de sécurité ; les autres workers arrivent par le sondage)
+}
+
+# Lancements du jour par opérateur (vues "journée" du tableau de bord admin)
+DAY_ROLLUP_CONFIG = {
+    'ttl': 300                  # Rechargement complet au-delà (filet de sécurité ; sondage pour les autres workers)
+}
+
+# Réponses : compression et format colonnaire (?format=columnar)
+RESPONSE_CONFIG = {
+    'compress_min_size': 1024,  # Octets ; en dessous, la compression ne rapporte rien
+    'compress_level': 5         # Niveau gzip / deflate (1 rapide - 9 compact)
+}
+
+# Journal des requêtes lentes et profilage SQL Server (/api/query-log)
+QUERY_LOG_CONFIG = {
+    'slow_threshold': 0.5,      # Secondes ; au-delà, la requête est journalisée
+    'max_entries': 200,         # Requêtes lentes conservées en mémoire
+    'profile_sample_rate': 0.0, # Part des exécutions profilées (SET STATISTICS IO/TIME) ; 0 = désactivé
+    'max_profiles': 50          # Profils conservés en mémoire
+}
+
+# Ingestion par lot des événements des tablettes (/api/evenements-travail)
+BATCH_INGEST_CONFIG = {
+    'max_events': 500,          # Événements max par envoi (file hors connexion d'une tablette)
+    'event_id_max_length': 64,  # Longueur max d'un eventId (UUID : 36 caractères)
+    'simulation_ledger_size': 100000  # eventId mémorisés en mode simulation
+}
+
+# Sessions de travail côté serveur (ABSESSIONS_OPERATEURS, /api/sessions-actives)
+SESSION_CONFIG = {
+    'reconcile_interval': 60,   # Secondes entre deux relectures complètes des sessions ouvertes
+    'reload_on_write': True     # Relire les sessions de l'opérateur une fois par requête d'écriture (plusieurs workers)
+}
+
+# Archivage mensuel de ABHISTORIQUE_OPERATEURS (tables ABHISTORIQUE_OPERATEURS_AAAAMM)
+ARCHIVE_CONFIG = {
+    'enabled': False,           # À activer explicitement ; jamais sur la base de repli (SEDI_ERP)
+    'horizon_days': 42,         # Jours conservés dans la table courante (DateTravail)
+    'batch_size': 2000,         # Lignes déplacées par transaction (verrous courts)
+    'batch_pause': 0.2,         # Secondes entre deux lots (laisse passer les écritures des tablettes)
+    'max_batches': 500,         # Lots au plus par passage ; le reste attend le passage suivant
+    'interval': 3600,           # Secondes entre deux passages
+    'catalog_ttl': 30,          # Relecture du catalogue des mois archivés (autres workers)
+    'export_lock_timeout_ms': 30000  # Attente max d'un lot d'archivage par l'export ERP
+}
+
+# Démarrage : sondes en parallèle, attente active au lieu de pauses fixes
+STARTUP_CONFIG = {
+    'background': True,         # Serveur HTTP lancé pendant l'initialisation (/api/health/live répond)
+    'database_online_timeout': 60,  # Secondes max d'attente d'une base tout juste créée (état ONLINE)
+    'poll_interval': 0.05,      # Premier intervalle de sondage (s), doublé à chaque essai...
+    'poll_max_interval': 1.0,   # ... jusqu'à ce plafond
+    'request_wait': 10          # Attente max (s) d'une requête métier arrivée pendant l'initialisation
+}
@@ -0,0 +1,242 @@
+# Lancements de la journée par opérateur (/api/tous-operateurs-lancements-journee,
+# /api/operateur-lancements-journee/<id>)
+#
+# Les enregistrements du jour (ABTEMPS + ABHISTORIQUE) sont lus en une seule
+# requête ensembliste puis regroupés en Python par opérateur et par
+# lancement. Le résultat est mis en cache pour la journée en cours : une
+# écriture n'invalide que l'opérateur concerné, rechargé à la lecture suivante
+# (une requête pour tous les opérateurs invalidés, jamais une par opérateur).
+import threading
+import time
+from datetime import date
+
+# Au-delà, un rechargement complet coûte moins cher qu'une longue liste IN
+MAX_PARTIAL_RELOAD = 200
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds or 0), 3600)
+    return f"{hours}h {rest // 60:02d}min"
+
+
+def rollup_launches(records):
+    """Regroupe les enregistrements d'un opérateur par lancement puis par phase
+
+    Un enregistrement 'D' (ABTEMPS) est un démarrage, 'T' (ABHISTORIQUE) une
+    fin avec sa durée : une phase est terminée quand chaque démarrage a sa fin.
+    """
+    launches = {}
+    for record in records:
+        code = str(record['codeLanctImprod'] or '').strip()
+        phase = str(record['phase'] or '').strip()
+        phases = launches.setdefault(code, {})
+        counters = phases.setdefault(phase, [0, 0, 0])     # démarrages, fins, secondes
+        if record['source'] == 'D':
+            counters[0] += 1
+        else:
+            counters[1] += 1
+            counters[2] += (record['varNumUtil8'] or 0) * 60 + (record['varNumUtil9'] or 0)
+
+    result = []
+    for code in sorted(launches):
+        phases = []
+        total = 0
+        termines = 0
+        for phase, (starts, stops, seconds) in sorted(launches[code].items()):
+            done = stops > 0 and stops >= starts
+            termines += done
+            total += seconds
+            phases.append({
+                'phase': phase,
+                'poste': '',
+                'duree': format_duration(seconds) if done else 'En cours',
+                'statut': 'TERMINÉ' if done else 'EN COURS'
+            })
+        if termines == len(phases):
+            statut = 'TERMINÉ'
+        elif termines:
+            statut = 'PARTIELLEMENT TERMINÉ'
+        else:
+            statut = 'EN COURS'
+        result.append({
+            'codeLancement': code,
+            'phases': phases,
+            'statut': statut,
+            'tempsTotal': total,
+            'tempsTotalFormate': format_duration(total)
+        })
+    return result
+
+
+class _OperatorDay:
+    __slots__ = ('records', 'loaded_at', '_launches')
+
+    def __init__(self, records, loaded_at):
+        self.records = records
+        self.loaded_at = loaded_at
+        self._launches = None
+
+    @property
+    def launches(self):
+        if self._launches is None:
+            self._launches = rollup_launches(self.records)
+        return self._launches
+
+
+class DailyOperatorRollup:
+    """Cache du jour des lancements par opérateur, invalidé opérateur par opérateur
+
+    loader(jour, idents) retourne les enregistrements du jour (dictionnaires
+    au format de l'historique avec une clé 'source' 'D' ou 'T'), pour tous
+    les opérateurs si idents est None.
+
+    La requête tourne hors du verrou du cache : invalidate(), appelé à chaque
+    démarrage / fin de travail, n'attend jamais une lecture de la journée. Les
+    chargements sont faits un à la fois (les lecteurs concurrents réutilisent
+    le résultat) et une invalidation survenue pendant un chargement est
+    conservée.
+    """
+
+    def __init__(self, loader, ttl=300):
+        self._loader = loader
+        self.ttl = ttl
+        self._day = None
+        self._operators = {}          # Ident -> _OperatorDay
+        self._complete_at = None      # Chargement complet du jour (time.monotonic())
+        self._stale = {}              # Ident -> numéro de l'invalidation
+        self._invalidations = 0       # Numéro de la dernière invalidation
+        self._epoch = 0               # Incrémenté quand tout le cache est abandonné
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stats = {'full_loads': 0, 'partial_loads': 0, 'hits': 0, 'invalidations': 0}
+
+    def _roll_day_locked(self):
+        today = date.today()
+        if self._day != today:
+            self._day = today
+            self._clear_locked()
+        return today
+
+    def _clear_locked(self):
+        self._operators = {}
+        self._complete_at = None
+        self._stale = {}
+        self._epoch += 1
+
+    def _fresh(self, loaded_at):
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def invalidate(self, ident):
+        """Écriture pour cet opérateur : seule son entrée sera relue"""
+        with self._lock:
+            # Marque conservée même sans entrée : un chargement peut être en cours
+            if self._day == date.today():
+                self._invalidations += 1
+                self._stale[ident] = self._invalidations
+                self._stats['invalidations'] += 1
+
+    def expire(self):
+        """Tout relire au prochain accès (écritures d'autres processus non suivies)"""
+        with self._lock:
+            self._clear_locked()
+
+    # ---- Lecture ----
+
+    def _all_plan_locked(self):
+        """None si le cache suffit, sinon les opérateurs à relire (None = tous)"""
+        self._roll_day_locked()
+        if not self._fresh(self._complete_at) or len(self._stale) > MAX_PARTIAL_RELOAD:
+            return None, True
+        if self._stale:
+            return sorted(self._stale), True
+        return None, False
+
+    def _all_view_locked(self):
+        return {ident: entry.launches for ident, entry in self._operators.items() if entry.records}
+
+    def all_operators(self):
+        """{Ident: lancements} pour tous les opérateurs actifs du jour (au plus une requête)"""
+        with self._lock:
+            _, needed = self._all_plan_locked()
+            if not needed:
+                self._stats['hits'] += 1
+                return self._all_view_locked()
+        with self._load_lock:
+            # Un autre lecteur a peut-être chargé pendant l'attente
+            with self._lock:
+                idents, needed = self._all_plan_locked()
+                if not needed:
+                    self._stats['hits'] += 1
+                    return self._all_view_locked()
+                day, ticket = self._day, (self._epoch, self._invalidations)
+                base = {} if idents is None else dict(self._operators)
+            grouped = self._query(day, idents)
+            with self._lock:
+                if self._install_locked(day, idents, grouped, ticket):
+                    return self._all_view_locked()
+            # Cache abandonné pendant la requête (expire, changement de jour) : résultat non conservé
+            base.update((ident, entry) for ident, entry in grouped.items())
+            return {ident: entry.launches for ident, entry in base.items() if entry.records}
+
+    def _operator_cached_locked(self, ident):
+        self._roll_day_locked()
+        entry = self._operators.get(ident)
+        fresh = entry is not None and (self._fresh(self._complete_at) or self._fresh(entry.loaded_at))
+        return entry if fresh and ident not in self._stale else None
+
+    def operator(self, ident):
+        """(lancements, enregistrements) d'un opérateur pour le jour"""
+        with self._lock:
+            entry = self._operator_cached_locked(ident)
+            if entry is not None:
+                self._stats['hits'] += 1
+                return entry.launches, entry.records
+        with self._load_lock:
+            with self._lock:
+                entry = self._operator_cached_locked(ident)
+                if entry is not None:
+                    self._stats['hits'] += 1
+                    return entry.launches, entry.records
+                day, ticket = self._day, (self._epoch, self._invalidations)
+            entry = self._query(day, [ident])[ident]
+            with self._lock:
+                self._install_locked(day, [ident], {ident: entry}, ticket)
+            return entry.launches, entry.records
+
+    def _query(self, day, idents):
+        """Requête du loader, hors verrou ; {Ident: _OperatorDay}"""
+        records = self._loader(day, idents)
+        now = time.monotonic()
+        grouped = {ident: [] for ident in (idents or [])}
+        for record in records:
+            grouped.setdefault(record['ident'], []).append(record)
+        return {ident: _OperatorDay(rows, now) for ident, rows in grouped.items()}
+
+    def _install_locked(self, day, idents, grouped, ticket):
+        """Range le résultat d'une requête ; False si le cache a été abandonné entre-temps"""
+        epoch, invalidations = ticket
+        if self._epoch != epoch or self._day != day:
+            return False
+        # Invalidations postérieures au début de la requête : la ligne écrite peut manquer
+        later = {ident: number for ident, number in self._stale.items() if number > invalidations}
+        if idents is None:
+            self._operators = grouped
+            self._complete_at = min(entry.loaded_at for entry in grouped.values()) if grouped else time.monotonic()
+            self._stale = later
+            self._stats['full_loads'] += 1
+        else:
+            for ident, entry in grouped.items():
+                self._operators[ident] = entry
+                if ident not in later:
+                    self._stale.pop(ident, None)
+            self._stats['partial_loads'] += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['day'] = self._day.isoformat() if self._day else None
+            stats['operators'] = len(self._operators)
+            stats['stale'] = len(self._stale)
+        stats['ttl'] = self.ttl
+        return stats
@@ -0,0 +1,444 @@
+# Pool de connexions SQL Server
+#
+# Chaque base configurée (SEDI_APP_INDEPENDANTE, SEDI_ERP...) possède son propre
+# pool. Les connexions empruntées sont des proxys : conn.close() remet la
+# connexion physique dans le pool au lieu de la fermer, ce qui évite une
+# poignée de main TLS + login SQL Server à chaque requête.
+import threading
+import time
+
+# SQLSTATE indiquant une connexion physique perdue (redémarrage serveur, réseau)
+DISCONNECT_SQLSTATES = ('08S01', '08S02', '08001', '08003', '08004', '08007', 'HYT01')
+
+# SQLSTATE d'un délai expiré (requête annulée par le driver, login trop long)
+TIMEOUT_SQLSTATES = ('HYT00',)
+
+
+class DatabaseTimeoutError(Exception):
+    """Délai dépassé pour obtenir une connexion ou exécuter une requête"""
+    retryable = True        # La requête n'a rien écrit : la tablette peut la rejouer
+
+
+class PoolTimeoutError(DatabaseTimeoutError):
+    """Aucune connexion disponible dans le délai imparti"""
+
+
+class QueryTimeoutError(DatabaseTimeoutError):
+    """Requête annulée : délai d'exécution (ou de login) dépassé"""
+
+
+def _sqlstate(exc):
+    args = getattr(exc, 'args', ())
+    return args[0] if args and isinstance(args[0], str) else ''
+
+
+def is_disconnect_error(exc):
+    """Indique si une exception pyodbc correspond à une connexion perdue"""
+    if _sqlstate(exc) in DISCONNECT_SQLSTATES:
+        return True
+    message = str(exc).lower()
+    return 'communication link failure' in message or 'connection is busy' in message
+
+
+def is_timeout_error(exc):
+    """Indique si une exception pyodbc correspond à un délai expiré"""
+    return _sqlstate(exc) in TIMEOUT_SQLSTATES or 'timeout expired' in str(exc).lower()
+
+
+class _PooledCursor:
+    """Curseur qui signale au pool les erreurs de connexion perdue"""
+
+    def __init__(self, cursor, owner):
+        self._cursor = cursor
+        self._owner = owner
+
+    def execute(self, *args, **kwargs):
+        try:
+            self._cursor.execute(*args, **kwargs)
+        except Exception as e:
+            self._owner._check_error(e)
+            if is_timeout_error(e):
+                raise QueryTimeoutError(str(e)) from e
+            raise
+        return self
+
+    def executemany(self, *args, **kwargs):
+        try:
+            self._cursor.executemany(*args, **kwargs)
+        except Exception as e:
+            self._owner._check_error(e)
+            if is_timeout_error(e):
+                raise QueryTimeoutError(str(e)) from e
+            raise
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_cursor', '_owner'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+
+class PooledConnection:
+    """Connexion empruntée au pool ; close() la restitue"""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+        self._broken = False
+
+    @property
+    def raw(self):
+        """Connexion pyodbc sous-jacente"""
+        if self._entry is None:
+            raise RuntimeError('Connexion déjà restituée au pool')
+        return self._entry.conn
+
+    def cursor(self):
+        return _PooledCursor(self.raw.cursor(), self)
+
+    def set_query_timeout(self, seconds):
+        """Délai d'exécution (s) des curseurs créés ensuite ; remis à 0 à la restitution"""
+        self.raw.timeout = seconds
+        self._entry.custom_timeout = True
+
+    def commit(self):
+        try:
+            self.raw.commit()
+        except Exception as e:
+            self._check_error(e)
+            raise
+
+    def rollback(self):
+        try:
+            self.raw.rollback()
+        except Exception as e:
+            self._check_error(e)
+            raise
+
+    def close(self):
+        """Restitue la connexion au pool (idempotent)"""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry, broken=self._broken)
+
+    def _check_error(self, exc):
+        if is_disconnect_error(exc):
+            self._broken = True
+            self._pool._on_disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __del__(self):
+        # Filet de sécurité : un handler qui lève une exception avant conn.close()
+        # ne doit pas faire fuir une place du pool.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.raw, name)
+
+
+class _Entry:
+    __slots__ = ('conn', 'created_at', 'last_used', 'generation', 'custom_timeout')
+
+    def __init__(self, conn, generation):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+        self.generation = generation
+        self.custom_timeout = False
+
+
+class ConnectionPool:
+    """Pool borné de connexions pyodbc vers une base donnée"""
+
+    def __init__(self, name, connect, max_size=10, min_idle=0, idle_timeout=300,
+                 acquire_timeout=10, validate_on_borrow=True, validation_interval=0,
+                 validation_query='SELECT 1', max_lifetime=3600):
+        self.name = name
+        self._connect = connect
+        self.max_size = max_size
+        self.min_idle = min_idle
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.validate_on_borrow = validate_on_borrow
+        self.validation_interval = validation_interval
+        self.validation_query = validation_query
+        self.max_lifetime = max_lifetime
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = []           # pile LIFO : la connexion la plus chaude sort en premier
+        self._in_use = 0
+        self._opening = 0
+        self._generation = 0
+        self._closed = False
+        self._reaper = None
+
+        self._stats = {
+            'acquisitions': 0,
+            'created': 0,
+            'discarded': 0,
+            'validation_failures': 0,
+            'timeouts': 0,
+            'connect_errors': 0,
+            'reconnects': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    # ---- Emprunt / restitution ----
+
+    def acquire(self, timeout=None):
+        """Emprunte une connexion ; lève PoolTimeoutError si le pool est saturé"""
+        if timeout is None:
+            timeout = self.acquire_timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        self._ensure_reaper()
+
+        while True:
+            entry = None
+            must_open = False
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f'Pool {self.name} fermé')
+                    self._evict_idle_locked()
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use + self._opening + len(self._idle) < self.max_size:
+                        self._opening += 1
+                        must_open = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f'Pool {self.name}: aucune connexion disponible après {timeout}s'
+                        )
+                    self._lock.wait(remaining)
+
+            if must_open:
+                entry = self._open_entry()
+                break
+
+            if self._validate(entry):
+                break
+            # Connexion morte (serveur redémarré ?) : on purge le pool et on retente
+            self._discard(entry, in_use=True)
+            self._on_disconnect()
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats['acquisitions'] += 1
+            self._stats['wait_time_total'] += waited
+            if waited > self._stats['wait_time_max']:
+                self._stats['wait_time_max'] = waited
+        return PooledConnection(self, entry)
+
+    def _open_entry(self):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            with self._lock:
+                self._opening -= 1
+                self._stats['connect_errors'] += 1
+                self._lock.notify()
+            if is_timeout_error(e):
+                raise QueryTimeoutError(f'Pool {self.name}: délai de connexion dépassé ({e})') from e
+            raise
+        with self._lock:
+            self._opening -= 1
+            self._in_use += 1
+            self._stats['created'] += 1
+            return _Entry(conn, self._generation)
+
+    def _validate(self, entry):
+        """Ping de la connexion avant de la prêter (validate-on-borrow)"""
+        if not self.validate_on_borrow:
+            return True
+        if time.monotonic() - entry.last_used < self.validation_interval:
+            return True
+        try:
+            cursor = entry.conn.cursor()
+            cursor.execute(self.validation_query)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            with self._lock:
+                self._stats['validation_failures'] += 1
+            return False
+
+    def _release(self, entry, broken=False):
+        reusable = not broken
+        if reusable:
+            try:
+                # Ne jamais rendre au pool une transaction ouverte
+                entry.conn.rollback()
+                if entry.custom_timeout:
+                    entry.conn.timeout = 0
+                    entry.custom_timeout = False
+            except Exception:
+                reusable = False
+        with self._lock:
+            now = time.monotonic()
+            if reusable and (self._closed
+                             or entry.generation != self._generation
+                             or now - entry.created_at > self.max_lifetime):
+                reusable = False
+            if reusable:
+                entry.last_used = now
+                self._in_use -= 1
+                self._idle.append(entry)
+                self._lock.notify()
+                return
+        self._discard(entry, in_use=True)
+
+    def _discard(self, entry, in_use=False):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            if in_use:
+                self._in_use -= 1
+            self._stats['discarded'] += 1
+            self._lock.notify()
+
+    def _on_disconnect(self):
+        """Connexion perdue : les connexions inactives sont probablement mortes aussi"""
+        with self._lock:
+            self._generation += 1
+            self._stats['reconnects'] += 1
+            stale, self._idle = self._idle, []
+        for entry in stale:
+            self._discard(entry)
+
+    # ---- Éviction des connexions inactives ----
+
+    def _evict_idle_locked(self):
+        """Retire les connexions inactives trop longtemps (appelé sous verrou)"""
+        if not self._idle:
+            return
+        now = time.monotonic()
+        keep, stale = [], []
+        for entry in self._idle:
+            too_old = now - entry.created_at > self.max_lifetime
+            too_idle = now - entry.last_used > self.idle_timeout
+            if too_old or (too_idle and len(keep) >= self.min_idle):
+                stale.append(entry)
+            else:
+                keep.append(entry)
+        if stale:
+            self._idle = keep
+            for entry in stale:
+                try:
+                    entry.conn.close()
+                except Exception:
+                    pass
+                self._stats['discarded'] += 1
+
+    def _ensure_reaper(self):
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(
+                target=self._reap_loop, name=f'pool-reaper-{self.name}', daemon=True
+            )
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 2.0)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if self._closed:
+                    return
+                self._evict_idle_locked()
+
+    # ---- Administration ----
+
+    def warm(self, count=None):
+        """Ouvre des connexions à l'avance (min_idle par défaut), en parallèle
+
+        Les logins SQL Server se chevauchent : le pré-chauffage dure le temps
+        d'une connexion et non de count. La première erreur est propagée.
+        """
+        count = self.min_idle if count is None else count
+        opened = []
+        errors = []
+
+        def open_one():
+            try:
+                conn = self.acquire()
+            except Exception as e:
+                errors.append(e)
+                return
+            opened.append(conn)
+
+        threads = [threading.Thread(target=open_one, name=f'pool-warm-{self.name}') for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for conn in opened:
+            conn.close()
+        if errors and not opened:
+            raise errors[0]
+        return len(opened)
+
+    def invalidate(self):
+        """Ferme toutes les connexions inactives et périme celles en cours d'usage"""
+        self._on_disconnect()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            stale, self._idle = self._idle, []
+            self._lock.notify_all()
+        for entry in stale:
+            try:
+                entry.conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """Instantané des statistiques du pool"""
+        with self._lock:
+            stats = dict(self._stats)
+            acquisitions = stats['acquisitions']
+            stats.update({
+                'name': self.name,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'opening': self._opening,
+                'wait_time_avg': (stats['wait_time_total'] / acquisitions) if acquisitions else 0.0,
+            })
+        for key in ('wait_time_total', 'wait_time_max', 'wait_time_avg'):
+            stats[key] = round(stats[key], 6)
+        return stats
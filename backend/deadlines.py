@@ -0,0 +1,40 @@
+# Budget de temps de la requête HTTP en cours
+#
+# Chaque route dispose d'un budget (DEADLINE_CONFIG) fixé au début de la
+# requête. L'emprunt de connexion, le login SQL Server et l'exécution des
+# requêtes sont bornés par le temps restant : une requête bloquée sur l'ERP
+# (verrou sur RESSOURC, LCTC...) est annulée par le driver au lieu d'occuper
+# un thread indéfiniment. Les threads de fond n'ont pas d'échéance.
+import math
+import threading
+import time
+
+_local = threading.local()
+
+
+def start(seconds):
+    """Fixe l'échéance du thread courant (None : pas d'échéance)"""
+    _local.deadline = time.monotonic() + seconds if seconds else None
+
+
+def clear():
+    _local.deadline = None
+
+
+def remaining():
+    """Secondes restantes avant l'échéance (None si aucune)"""
+    deadline = getattr(_local, 'deadline', None)
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def timeout_seconds(limit=None):
+    """Délai entier (≥ 1 s, format ODBC) borné par limit et par l'échéance ; 0 = illimité"""
+    left = remaining()
+    if left is not None and (limit is None or left < limit):
+        limit = left
+    if limit is None:
+        return 0
+    return max(1, math.ceil(limit))
+
@@ -0,0 +1,396 @@
+# Exécution des exports ERP en tâche de fond
+#
+# POST /api/export-to-erp ne bloque plus le thread Flask : l'export tourne dans
+# un thread dédié, un seul à la fois, et son avancement est consultable via
+# /api/export-jobs/<id>.
+#
+# Avec plusieurs workers (ou serveurs), un verrou applicatif SQL Server
+# garantit un seul export à la fois et l'état des exports est recopié dans une
+# table de l'ERP : l'avancement est consultable (et l'export annulable) depuis
+# n'importe quel processus, pas seulement celui qui l'exécute.
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from queries import run_query
+
+STATUS_PENDING = 'EN_ATTENTE'
+STATUS_RUNNING = 'EN_COURS'
+STATUS_DONE = 'TERMINE'
+STATUS_FAILED = 'ECHEC'
+STATUS_CANCELLED = 'ANNULE'
+
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+EXPORT_LOCK = 'sedi_export_erp'
+
+
+class ExportJob:
+    """Un export en cours ou passé, avec son avancement"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = STATUS_PENDING
+        self.rows_done = 0
+        self.rows_total = None
+        self.errors = []
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._started_monotonic = None
+        self._finished_monotonic = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._sync = None               # Recopie de l'état partagé (ExportJobManager)
+        self._synced_at = 0.0
+
+    # ---- Interface utilisée par export_data_to_erp ----
+
+    def report(self, rows_done, rows_total=None):
+        """Met à jour l'avancement"""
+        with self._lock:
+            self.rows_done = rows_done
+            if rows_total is not None:
+                self.rows_total = rows_total
+        self._maybe_sync()
+
+    def add_error(self, message):
+        with self._lock:
+            self.errors.append(message)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def _maybe_sync(self, force=False):
+        """Recopie l'état (au plus une fois par intervalle) ; une annulation demandée ailleurs est reprise"""
+        if self._sync is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = now
+        if self._sync(self):
+            self._cancel.set()
+
+    # ---- Cycle de vie ----
+
+    def cancel(self):
+        """Demande l'annulation ; l'export s'arrête après le lot en cours"""
+        self._cancel.set()
+
+    def _start(self):
+        with self._lock:
+            self.status = STATUS_RUNNING
+            self.started_at = datetime.now()
+            self._started_monotonic = time.monotonic()
+
+    def _finish(self, status):
+        with self._lock:
+            self.status = status
+            self.finished_at = datetime.now()
+            self._finished_monotonic = time.monotonic()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self):
+        with self._lock:
+            if self._started_monotonic is None:
+                elapsed = 0.0
+            else:
+                end = self._finished_monotonic or time.monotonic()
+                elapsed = end - self._started_monotonic
+            throughput = (self.rows_done / elapsed) if elapsed > 0 else 0.0
+            if self.rows_total:
+                progress = round(100.0 * self.rows_done / self.rows_total, 2)
+            else:
+                progress = 100.0 if self.status == STATUS_DONE else 0.0
+            return {
+                'jobId': self.id,
+                'status': self.status,
+                'rowsDone': self.rows_done,
+                'rowsTotal': self.rows_total,
+                'progress': progress,
+                'elapsedSeconds': round(elapsed, 3),
+                'rowsPerSecond': round(throughput, 1),
+                'errors': list(self.errors),
+                'cancelRequested': self._cancel.is_set(),
+                'createdAt': self.created_at.isoformat(),
+                'startedAt': self.started_at.isoformat() if self.started_at else None,
+                'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+
+class ExportJobStore:
+    """État des exports partagé entre processus : une ligne par export (état JSON) dans l'ERP
+
+    connect() emprunte une connexion à la base qui contient table. Les exports
+    terminés depuis plus de retention_days jours sont supprimés à la fin de
+    chaque export. Le verrou
+    applicatif (sp_getapplock, propriétaire : la session) est tenu sur une
+    connexion dédiée pendant tout l'export ; si le processus meurt, SQL Server
+    le libère avec la session.
+    """
+
+    def __init__(self, connect, table, retention_days=30):
+        self._connect = connect
+        self.table = table
+        self.retention_days = retention_days
+        self._ready = False
+
+    def _ensure(self, cursor):
+        if self._ready:
+            return
+        run_query(cursor, 'export_jobs_creation', f"""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'{self.table}') AND type in (N'U'))
+        CREATE TABLE {self.table} (
+            JobId NVARCHAR(32) NOT NULL PRIMARY KEY,
+            Statut NVARCHAR(20) NOT NULL,
+            Etat NVARCHAR(MAX) NOT NULL,
+            Annulation BIT NOT NULL DEFAULT 0,
+            DateMaj DATETIME DEFAULT GETDATE()
+        )
+        """)
+        # recent() et running() : TOP (n) ... ORDER BY DateMaj DESC sans tri de la table
+        name = self.table.rsplit('.', 1)[1].strip('[]')
+        run_query(cursor, 'export_jobs_creation_index', f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_{name}_DateMaj' AND object_id = OBJECT_ID(N'{self.table}'))
+        CREATE NONCLUSTERED INDEX [IX_{name}_DateMaj] ON {self.table} (DateMaj DESC)
+        """)
+        self._ready = True
+
+    def _open(self):
+        conn = self._connect()
+        if not conn:
+            raise ConnectionError('Impossible de se connecter à l\'ERP')
+        return conn
+
+    def acquire(self):
+        """Prend le verrou des exports sans attendre ; connexion qui le détient, ou None s'il est pris"""
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            result = run_query(
+                cursor, 'export_verrou',
+                "DECLARE @result INT;\n"
+                "EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+                "@LockOwner = 'Session', @LockTimeout = 0;\n"
+                "SELECT @result",
+                (EXPORT_LOCK,), fetch='one'
+            )[0]
+        except Exception:
+            conn.close()
+            raise
+        if result < 0:
+            conn.close()
+            return None
+        return conn
+
+    def release(self, conn):
+        """Libère le verrou avant de rendre la connexion (la session survit dans le pool)"""
+        try:
+            run_query(conn.cursor(), 'export_verrou_liberation',
+                      "EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", (EXPORT_LOCK,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save(self, job, abandon_others=False):
+        """Recopie l'état d'un export ; True si une annulation a été demandée par un autre processus"""
+        state = job.to_dict()
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            self._ensure(cursor)
+            if abandon_others:
+                # Exports d'un processus arrêté en cours de route : le verrou prouve qu'ils ne tournent plus
+                run_query(cursor, 'export_jobs_abandon', f"""
+                UPDATE {self.table} SET Statut = ?, DateMaj = GETDATE()
+                WHERE Statut IN (?, ?) AND JobId <> ?
+                """, (STATUS_FAILED, STATUS_PENDING, STATUS_RUNNING, job.id))
+            run_query(cursor, 'export_jobs_maj', f"""
+            UPDATE {self.table} SET Statut = ?, Etat = ?, DateMaj = GETDATE() WHERE JobId = ?
+            IF @@ROWCOUNT = 0
+                INSERT INTO {self.table} (JobId, Statut, Etat) VALUES (?, ?, ?)
+            """, (state['status'], json.dumps(state), job.id, job.id, state['status'], json.dumps(state)))
+            if state['status'] in FINISHED_STATUSES:
+                # Rétention : une purge par export terminé, jamais d'export en cours
+                run_query(cursor, 'export_jobs_purge', f"""
+                DELETE FROM {self.table}
+                WHERE Statut IN (?, ?, ?) AND DateMaj < DATEADD(day, -?, GETDATE())
+                """, FINISHED_STATUSES + (self.retention_days,))
+            row = run_query(cursor, 'export_jobs_annulation',
+                            f"SELECT Annulation FROM {self.table} WHERE JobId = ?", (job.id,), fetch='one')
+            conn.commit()
+            return bool(row and row[0])
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _from_row(row):
+        statut, etat, annulation = row
+        state = json.loads(etat)
+        state['status'] = statut
+        state['cancelRequested'] = bool(annulation) or state.get('cancelRequested', False)
+        return state
+
+    def load(self, job_id):
+        """État d'un export (dict de ExportJob.to_dict) ou None"""
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            self._ensure(cursor)
+            row = run_query(cursor, 'export_jobs_lecture',
+                            f"SELECT Statut, Etat, Annulation FROM {self.table} WHERE JobId = ?",
+                            (job_id,), fetch='one')
+            return self._from_row(row) if row else None
+        finally:
+            conn.close()
+
+    def running(self):
+        """Export en cours (dans n'importe quel processus) ou None"""
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            self._ensure(cursor)
+            row = run_query(cursor, 'export_jobs_en_cours', f"""
+            SELECT TOP (1) Statut, Etat, Annulation FROM {self.table}
+            WHERE Statut IN (?, ?) ORDER BY DateMaj DESC
+            """, (STATUS_PENDING, STATUS_RUNNING), fetch='one')
+            return self._from_row(row) if row else None
+        finally:
+            conn.close()
+
+    def recent(self, limit):
+        """Les limit derniers exports, le plus récent d'abord"""
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            self._ensure(cursor)
+            rows = run_query(cursor, 'export_jobs_liste', f"""
+            SELECT TOP (?) Statut, Etat, Annulation FROM {self.table} ORDER BY DateMaj DESC
+            """, (limit,), fetch='all')
+            return [self._from_row(row) for row in rows]
+        finally:
+            conn.close()
+
+    def request_cancel(self, job_id):
+        """Demande l'annulation d'un export exécuté par un autre processus ; son état, ou None"""
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            self._ensure(cursor)
+            run_query(cursor, 'export_jobs_demande_annulation',
+                      f"UPDATE {self.table} SET Annulation = 1 WHERE JobId = ? AND Statut IN (?, ?)",
+                      (job_id, STATUS_PENDING, STATUS_RUNNING))
+            conn.commit()
+        finally:
+            conn.close()
+        return self.load(job_id)
+
+
+class ExportJobManager:
+    """Lance les exports en arrière-plan, un seul à la fois
+
+    Avec un store (ExportJobStore), l'unicité vaut pour tous les processus et
+    les lectures / annulations atteignent les exports des autres processus.
+    Les méthodes publiques retournent l'état des exports (dict de to_dict()).
+    """
+
+    def __init__(self, run_export, history_size=20, store=None, sync_interval=1.0):
+        self._run_export = run_export
+        self._history_size = history_size
+        self._store = store
+        self._sync_interval = sync_interval
+        self._jobs = OrderedDict()
+        self._current = None
+        self._lock = threading.Lock()
+
+    def submit(self):
+        """Démarre un export ; retourne (état, créé). Si un export tourne déjà (ici ou ailleurs), il est retourné"""
+        with self._lock:
+            if self._current is not None and not self._current.finished:
+                return self._current.to_dict(), False
+            lock_conn = None
+            if self._store is not None:
+                lock_conn = self._store.acquire()
+                if lock_conn is None:
+                    running = self._store.running()
+                    return running or {'status': STATUS_RUNNING}, False
+            job = ExportJob()
+            if self._store is not None:
+                job._sync = self._sync
+                job._sync_interval = self._sync_interval
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history_size:
+                self._jobs.popitem(last=False)
+            self._current = job
+        if self._store is not None:
+            self._sync(job, abandon_others=True)
+        thread = threading.Thread(target=self._run, args=(job, lock_conn), name=f'export-{job.id[:8]}', daemon=True)
+        thread.start()
+        return job.to_dict(), True
+
+    def _sync(self, job, abandon_others=False):
+        try:
+            return self._store.save(job, abandon_others)
+        except Exception as e:
+            print(f"⚠️ État de l'export {job.id[:8]} non partagé: {e}")
+            return False
+
+    def _run(self, job, lock_conn=None):
+        try:
+            job._start()
+            job._maybe_sync(force=True)
+            try:
+                ok = self._run_export(job)
+            except Exception as e:
+                job.add_error(str(e))
+                ok = False
+            if job.cancel_requested:
+                job._finish(STATUS_CANCELLED)
+            elif ok:
+                job._finish(STATUS_DONE)
+            else:
+                job._finish(STATUS_FAILED)
+            job._maybe_sync(force=True)
+        finally:
+            if lock_conn is not None:
+                try:
+                    self._store.release(lock_conn)
+                except Exception as e:
+                    print(f"⚠️ Libération du verrou d'export impossible: {e}")
+
+    def get(self, job_id):
+        """État d'un export, qu'il tourne dans ce processus ou dans un autre ; None s'il est inconnu"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self._store.load(job_id) if self._store is not None else None
+
+    def cancel(self, job_id):
+        """Demande l'annulation (effective après le lot en cours) ; état de l'export ou None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            if not job.finished:
+                job.cancel()
+            return job.to_dict()
+        return self._store.request_cancel(job_id) if self._store is not None else None
+
+    def current(self):
+        with self._lock:
+            return self._current
+
+    def list(self):
+        if self._store is not None:
+            return self._store.recent(self._history_size)
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in reversed(jobs)]
@@ -0,0 +1,67 @@
+# Configuration gunicorn du backend (Linux / Docker)
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#   WEB_CONCURRENCY=4 SEDI_THREADS=16 gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Workers "gthread" : chaque processus sert plusieurs requêtes en parallèle
+# (les appels pyodbc relâchent le GIL pendant l'attente de SQL Server). Les
+# pools de connexions, caches et threads de fond sont propres à chaque worker :
+# ils sont créés après le fork, dans post_worker_init, et le worker n'accepte
+# des requêtes qu'une fois l'initialisation terminée.
+#
+# SIGTERM (docker stop, pm2 stop) : gunicorn ferme les sockets d'écoute, laisse
+# les requêtes en cours se terminer pendant graceful_timeout secondes, puis
+# chaque worker vide la file d'écriture groupée et ferme ses pools (worker_exit).
+#
+# Mode simulation : les données simulées sont en mémoire dans chaque worker ;
+# pour une démonstration sans base, lancer avec WEB_CONCURRENCY=1.
+#
+# Débit mesuré (mode simulation, 1 vCPU, client Python keep-alive, 10 s par
+# palier, mélange /api/health + /api/historique-operateur + /api/demarrer-travail) :
+#
+#   clients   python app.py (serveur de dev)     gunicorn 2 workers x 8 threads
+#      1      715 req/s  p50 1.4 ms  p99 2.2 ms   1040 req/s  p50 1.0 ms  p99 1.4 ms
+#      8      792 req/s  p50 9.7 ms  p99 20 ms    1281 req/s  p50 4.2 ms  p99 18 ms
+#     32      700 req/s  p50 46 ms   p99 70 ms    1293 req/s  p50 23 ms   p99 60 ms
+#
+# Avec SQL Server, les requêtes passent l'essentiel de leur temps à attendre
+# la base : le gain vient surtout des threads et des pools pré-chauffés.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import SERVER_CONFIG
+
+bind = os.environ.get('SEDI_BIND', SERVER_CONFIG['bind'])
+workers = int(os.environ.get('WEB_CONCURRENCY', SERVER_CONFIG['workers']))
+threads = int(os.environ.get('SEDI_THREADS', SERVER_CONFIG['threads']))
+worker_class = 'gthread'
+timeout = SERVER_CONFIG['timeout']
+graceful_timeout = SERVER_CONFIG['graceful_timeout']
+keepalive = SERVER_CONFIG['keepalive']
+preload_app = False         # Pas de connexion ODBC ni de thread créés avant le fork
+accesslog = os.environ.get('SEDI_ACCESS_LOG')   # ex. '-' pour stdout
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    """Initialise la base et pré-chauffe les pools (en arrière-plan si STARTUP_CONFIG['background'])
+
+    En arrière-plan, le worker répond aussitôt à /api/health/live ;
+    /api/health/ready reste à 503 jusqu'à la fin du démarrage.
+    """
+    import app
+    if app.STARTUP_CONFIG['background']:
+        app.start_in_background()
+        worker.log.info("Worker %s démarré (initialisation en arrière-plan)", worker.pid)
+    else:
+        app.run_startup()
+        worker.log.info("Worker %s prêt", worker.pid)
+
+
+def worker_exit(server, worker):
+    """Arrêt propre du worker après le drainage des requêtes en cours"""
+    app = sys.modules.get('app')
+    if app is not None:
+        app.shutdown()
@@ -0,0 +1,121 @@
+# Sondage périodique des bases de données (heartbeat)
+#
+# Un thread unique sonde chaque base configurée à intervalle régulier et garde
+# le résultat : les endpoints de santé lisent ce cache au lieu d'ouvrir une
+# connexion à chaque appel du load balancer ou du healthcheck Docker.
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class ProbeState:
+    """Résultats récents du sondage d'une base"""
+
+    def __init__(self, history_size):
+        self.healthy = None             # None tant qu'aucun sondage n'a eu lieu
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+        self.last_latency_ms = None
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.history = deque(maxlen=history_size)   # (horodatage, latence ms ou None)
+
+    def record(self, ok, latency_ms, error=None):
+        now = datetime.now()
+        self.probes += 1
+        self.history.append((now.isoformat(timespec='seconds'), round(latency_ms, 2) if ok else None))
+        if ok:
+            self.healthy = True
+            self.last_success = now
+            self.last_latency_ms = round(latency_ms, 2)
+            self.consecutive_failures = 0
+        else:
+            self.healthy = False
+            self.last_failure = now
+            self.last_error = error
+            self.consecutive_failures += 1
+
+    def to_dict(self, with_history=False):
+        latencies = [latency for _, latency in self.history if latency is not None]
+        result = {
+            'healthy': self.healthy,
+            'last_success': self.last_success.isoformat() if self.last_success else None,
+            'last_failure': self.last_failure.isoformat() if self.last_failure else None,
+            'last_error': self.last_error,
+            'last_latency_ms': self.last_latency_ms,
+            'avg_latency_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'max_latency_ms': max(latencies) if latencies else None,
+            'consecutive_failures': self.consecutive_failures,
+            'probes': self.probes
+        }
+        if with_history:
+            result['history'] = list(self.history)
+        return result
+
+
+class Heartbeat:
+    """Sonde un ensemble de bases en arrière-plan et met les résultats en cache"""
+
+    def __init__(self, probes, interval=10, history_size=60, on_change=None):
+        # probes : {nom: callable qui lève une exception si la base est KO}
+        self._probes = probes
+        self.interval = interval
+        self._on_change = on_change
+        self._states = {name: ProbeState(history_size) for name in probes}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    def start(self):
+        """Démarre le thread de sondage (une seule fois)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='db-heartbeat', daemon=True)
+            self._thread.start()
+
+    def probe_now(self):
+        """Demande un sondage immédiat (sans attendre le prochain intervalle)"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self.probe_all()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def probe_all(self):
+        """Sonde toutes les bases une fois (appelé par le thread)"""
+        changed = False
+        for name, probe in self._probes.items():
+            start = time.perf_counter()
+            try:
+                probe()
+                ok, error = True, None
+            except Exception as e:
+                ok, error = False, str(e)
+            latency_ms = (time.perf_counter() - start) * 1000.0
+            with self._lock:
+                state = self._states[name]
+                previous = state.healthy
+                state.record(ok, latency_ms, error)
+                if previous is not None and previous != ok:
+                    changed = True
+                    print(f"{'✅' if ok else '❌'} Base {name} {'de nouveau accessible' if ok else 'inaccessible'}")
+        if changed and self._on_change:
+            self._on_change()
+
+    def is_healthy(self, name):
+        """Dernier résultat connu (None si jamais sondée)"""
+        with self._lock:
+            return self._states[name].healthy
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def summary(self, with_history=False):
+        with self._lock:
+            return {name: state.to_dict(with_history) for name, state in self._states.items()}
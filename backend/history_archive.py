@@ -0,0 +1,314 @@
+# Archivage mensuel de ABHISTORIQUE_OPERATEURS
+#
+# La table "chaude" ne garde que les horizon_days derniers jours (DateTravail).
+# Un thread par worker déplace les lignes plus anciennes dans une table par
+# mois (ABHISTORIQUE_OPERATEURS_AAAAMM, même base, mêmes colonnes, NoEnreg
+# conservé) par petits lots : chaque lot est un DELETE TOP (n) ... OUTPUT
+# DELETED ... INTO dans sa propre transaction courte, pour ne jamais bloquer
+# longtemps les écritures des tablettes. Les mois archivés sont recensés dans
+# AB_ARCHIVES_HISTORIQUE (bornes de dates et de NoEnreg) : les lectures
+# n'interrogent une archive que si la plage demandée l'atteint.
+#
+# Un verrou applicatif SQL Server sérialise l'archivage entre workers
+# (exclusif, par lot, sans attente) et le protège de l'export ERP, qui le
+# prend en mode partagé pendant sa lecture.
+import threading
+import time
+from datetime import datetime, timedelta
+
+from queries import run_query
+
+ARCHIVE_LOCK = 'sedi_historique_archivage'
+
+# Colonnes de ABHISTORIQUE_OPERATEURS, dans l'ordre de la table
+ARCHIVE_COLUMNS = (
+    'NoEnreg', 'Ident', 'DateTravail', 'CodeLanctImprod', 'Phase', 'CodeRubrique',
+    'VarNumUtil8', 'VarNumUtil9', 'Statut', 'DateCreation'
+)
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def archive_table(historique_table, month):
+    """[base].[dbo].[ABHISTORIQUE_OPERATEURS] -> [base].[dbo].[ABHISTORIQUE_OPERATEURS_AAAAMM]"""
+    return f"{historique_table[:-1]}_{month:%Y%m}]"
+
+
+class ArchiveMonth:
+    """Un mois archivé : [start, end[ sur DateTravail"""
+    __slots__ = ('start', 'end', 'table', 'rows', 'no_enreg_min', 'no_enreg_max')
+
+    def __init__(self, start, table, rows, no_enreg_min, no_enreg_max):
+        self.start = start
+        self.end = next_month(start)
+        self.table = table
+        self.rows = rows or 0
+        self.no_enreg_min = no_enreg_min
+        self.no_enreg_max = no_enreg_max
+
+    def overlaps(self, date_from=None, date_to=None):
+        return (date_from is None or self.end > date_from) and (date_to is None or self.start < date_to)
+
+    def to_dict(self):
+        return {
+            'mois': f"{self.start:%Y-%m}",
+            'table': self.table,
+            'lignes': self.rows,
+            'noEnregMin': self.no_enreg_min,
+            'noEnregMax': self.no_enreg_max
+        }
+
+
+class HistoryArchive:
+    """Archivage par mois en arrière-plan et catalogue des mois archivés
+
+    connect() emprunte une connexion à la base de travail, tables() retourne
+    les noms complets en usage (CURRENT_TABLES) ; la clé 'archives' désigne
+    le catalogue. Si active() retourne False (base de travail = base de repli
+    SEDI_ERP), le passage est sauté : on ne crée pas de tables dans l'ERP.
+    """
+
+    def __init__(self, connect, tables, horizon_days=42, batch_size=2000, batch_pause=0.2,
+                 max_batches=500, interval=3600, catalog_ttl=30, export_lock_timeout_ms=30000, enabled=True, active=None):
+        self._connect = connect
+        self._tables = tables
+        self._active = active
+        self.horizon_days = max(2, horizon_days)   # Le jour courant n'est jamais archivé
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_batches = max_batches
+        self.interval = interval
+        self.catalog_ttl = catalog_ttl
+        self.export_lock_timeout_ms = export_lock_timeout_ms
+        self.enabled = enabled
+        self._catalogs = {}             # table catalogue -> (time.monotonic(), [ArchiveMonth] récents d'abord)
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {'runs': 0, 'moved': 0, 'batches': 0, 'skipped_locked': 0, 'skipped_inactive': 0,
+                       'last_run': None, 'last_moved': 0, 'last_duration_ms': None, 'last_error': None}
+
+    def cutoff(self, now=None):
+        """Les lignes de DateTravail antérieure sont archivées (minuit, horizon_days jours avant)"""
+        today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=self.horizon_days)
+
+    # ---- Catalogue (lecture) ----
+
+    def months(self, cursor, tables, force=False):
+        """Mois archivés, les plus récents d'abord (catalogue relu au plus toutes les catalog_ttl s)"""
+        catalog = tables['archives']
+        with self._lock:
+            cached = self._catalogs.get(catalog)
+        if cached is not None and not force and time.monotonic() - cached[0] < self.catalog_ttl:
+            return cached[1]
+        rows = run_query(cursor, 'archives_catalogue', f"""
+        SELECT Mois, TableArchive, NbLignes, NoEnregMin, NoEnregMax
+        FROM {catalog}
+        ORDER BY Mois DESC
+        """, fetch='all')
+        months = [ArchiveMonth(datetime(mois // 100, mois % 100, 1), table, count, low, high)
+                  for mois, table, count, low, high in rows]
+        with self._lock:
+            self._catalogs[catalog] = (time.monotonic(), months)
+        return months
+
+    def sources(self, cursor, tables, date_from=None, date_to=None):
+        """Mois archivés qui recoupent [date_from, date_to[ ; aucun si la plage reste dans l'horizon
+
+        Toute ligne archivée est antérieure à cutoff() : une plage qui commence
+        après ne lit pas le catalogue.
+        """
+        if date_from is not None and date_from >= self.cutoff():
+            return []
+        return [month for month in self.months(cursor, tables) if month.overlaps(date_from, date_to)]
+
+    def lock_for_export(self, cursor):
+        """Verrou partagé de session pendant la lecture de l'export ; False si un lot ne s'est pas terminé à temps"""
+        return run_query(
+            cursor, 'archives_verrou_export',
+            "DECLARE @result INT;\n"
+            "EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Shared', "
+            "@LockOwner = 'Session', @LockTimeout = ?;\n"
+            "SELECT @result",
+            (ARCHIVE_LOCK, self.export_lock_timeout_ms), fetch='one'
+        )[0] >= 0
+
+    def unlock_for_export(self, cursor):
+        run_query(cursor, 'archives_verrou_export_liberation',
+                  "EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", (ARCHIVE_LOCK,))
+
+    def invalidate(self):
+        with self._lock:
+            self._catalogs.clear()
+
+    # ---- Archivage ----
+
+    def _ensure_month(self, cursor, tables, start):
+        """Table du mois (avec l'index de l'historique par opérateur) et ligne du catalogue"""
+        table = archive_table(tables['historique'], start)
+        name = table.rsplit('.', 1)[1].strip('[]')
+        run_query(cursor, 'archives_creation_table', f"""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'{table}') AND type in (N'U'))
+        CREATE TABLE {table} (
+            NoEnreg INT NOT NULL PRIMARY KEY,
+            Ident NVARCHAR(50) NOT NULL,
+            DateTravail DATETIME NOT NULL,
+            CodeLanctImprod NVARCHAR(50) NOT NULL,
+            Phase NVARCHAR(50) NOT NULL,
+            CodeRubrique NVARCHAR(50),
+            VarNumUtil8 INT DEFAULT 0,
+            VarNumUtil9 INT DEFAULT 0,
+            Statut NVARCHAR(20),
+            DateCreation DATETIME
+        )
+        """)
+        run_query(cursor, 'archives_creation_index', f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_{name}_Ident_DateTravail' AND object_id = OBJECT_ID(N'{table}'))
+        CREATE NONCLUSTERED INDEX [IX_{name}_Ident_DateTravail] ON {table} (Ident, DateTravail DESC, NoEnreg DESC)
+        """)
+        month = int(f"{start:%Y%m}")
+        run_query(cursor, 'archives_catalogue_mois', f"""
+        UPDATE {tables['archives']} SET TableArchive = ? WHERE Mois = ?
+        IF @@ROWCOUNT = 0
+            INSERT INTO {tables['archives']} (Mois, TableArchive, NbLignes) VALUES (?, ?, 0)
+        """, (table, month, month, table))
+        return table
+
+    def _move_batch(self, cursor, tables, start, end, create):
+        """Un lot : verrou exclusif sans attente, DELETE ... OUTPUT INTO, catalogue ; None si verrouillé"""
+        locked = run_query(
+            cursor, 'archives_verrou_lot',
+            "DECLARE @result INT;\n"
+            "EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+            "@LockOwner = 'Transaction', @LockTimeout = 0;\n"
+            "SELECT @result",
+            (ARCHIVE_LOCK,), fetch='one'
+        )[0]
+        if locked < 0:
+            return None
+        table = self._ensure_month(cursor, tables, start) if create else archive_table(tables['historique'], start)
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        moved = run_query(cursor, 'archives_deplacement_lot', f"""
+        DELETE TOP (?) FROM {tables['historique']}
+        OUTPUT {', '.join('DELETED.' + column for column in ARCHIVE_COLUMNS)}
+        INTO {table} ({columns})
+        WHERE DateTravail >= ? AND DateTravail < ?
+        """, (self.batch_size, start, end)).rowcount
+        if moved:
+            run_query(cursor, 'archives_catalogue_lot', f"""
+            UPDATE {tables['archives']}
+            SET NbLignes = NbLignes + ?,
+                NoEnregMin = (SELECT MIN(NoEnreg) FROM {table}),
+                NoEnregMax = (SELECT MAX(NoEnreg) FROM {table}),
+                DateMaj = GETDATE()
+            WHERE Mois = ?
+            """, (moved, int(f"{start:%Y%m}")))
+        return moved
+
+    def run_once(self):
+        """Archive par lots tout ce qui précède cutoff() (au plus max_batches lots) ; retourne les lignes déplacées"""
+        if self._active is not None and not self._active():
+            with self._lock:
+                self._stats['skipped_inactive'] += 1
+            return 0
+        with self._run_lock:
+            started = time.monotonic()
+            moved_total = 0
+            conn = None
+            try:
+                tables = self._tables()
+                cutoff = self.cutoff()
+                conn = self._connect()
+                if not conn:
+                    raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+                cursor = conn.cursor()
+                created = set()             # Mois dont la table et la ligne du catalogue existent
+                for _ in range(self.max_batches):
+                    oldest = run_query(cursor, 'archives_plus_ancienne', f"""
+                    SELECT TOP (1) DateTravail FROM {tables['historique']}
+                    WHERE DateTravail < ?
+                    ORDER BY DateTravail
+                    """, (cutoff,), fetch='one')
+                    if oldest is None:
+                        break
+                    start = month_start(oldest[0])
+                    try:
+                        moved = self._move_batch(cursor, tables, start, min(next_month(start), cutoff),
+                                                 create=start not in created)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    if moved is None:
+                        # Autre worker en train d'archiver, ou export en cours de lecture
+                        with self._lock:
+                            self._stats['skipped_locked'] += 1
+                        break
+                    created.add(start)
+                    moved_total += moved
+                    with self._lock:
+                        self._stats['batches'] += 1
+                        self._stats['moved'] += moved
+                    if moved < self.batch_size and next_month(start) >= cutoff:
+                        break
+                    time.sleep(self.batch_pause)
+                error = None
+            except Exception as e:
+                error = str(e)
+                print(f"⚠️ Archivage de l'historique interrompu: {e}")
+            finally:
+                if conn:
+                    conn.close()
+            if moved_total:
+                self.invalidate()
+                print(f"🗄️ {moved_total} ligne(s) d'historique archivée(s) (antérieures au {cutoff:%d/%m/%Y})")
+            with self._lock:
+                self._stats['runs'] += 1
+                self._stats['last_run'] = datetime.now().isoformat(timespec='seconds')
+                self._stats['last_moved'] = moved_total
+                self._stats['last_duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+                self._stats['last_error'] = error
+            return moved_total
+
+    def trigger(self):
+        """Lance un passage d'archivage sans attendre l'intervalle"""
+        self._wakeup.set()
+
+    def start(self):
+        """Démarre l'archivage périodique en arrière-plan (une seule fois)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='history-archive', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.run_once()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            catalogs = {catalog: [month.to_dict() for month in months]
+                        for catalog, (_, months) in self._catalogs.items()}
+        stats.update({
+            'enabled': self.enabled,
+            'horizon_days': self.horizon_days,
+            'cutoff': self.cutoff().date().isoformat(),
+            'batch_size': self.batch_size,
+            'interval': self.interval,
+            'catalogues': catalogs
+        })
+        return stats
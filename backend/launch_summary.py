@@ -0,0 +1,207 @@
+# Synthèse par lancement de la journée (/api/lancements-status, /api/lancements-simple)
+#
+# Une entrée par (CodeLanctImprod, Phase) : démarrages, fins, durée cumulée,
+# dernière activité. Les routes démarrer / terminer la mettent à jour en
+# mémoire, et les écritures des autres workers arrivent par le sondage partagé
+# du flux temps réel (live_feed.ChangePoller, toutes les quelques secondes) :
+# tous les workers présentent la même synthèse. Une réconciliation complète
+# (une requête GROUP BY sur la journée) est faite au premier accès, quand le
+# sondage sort du repos, périodiquement et au changement de jour. Un
+# rafraîchissement du tableau de bord est donc une lecture mémoire.
+#
+# Une écriture qui survient pendant une réconciliation peut être comptée deux
+# fois ou pas du tout ; l'écart est corrigé à la réconciliation suivante.
+import threading
+import time
+from datetime import date, datetime
+
+
+class LaunchEntry:
+    """Compteurs d'un lancement / phase pour la journée"""
+
+    __slots__ = ('code', 'phase', 'demarrages', 'termines', 'duree_totale',
+                 'debut', 'derniere_activite', 'operateur_principal')
+
+    def __init__(self, code, phase):
+        self.code = code
+        self.phase = phase
+        self.demarrages = 0
+        self.termines = 0
+        self.duree_totale = 0           # Secondes
+        self.debut = None               # Premier DateTravail de démarrage
+        self.derniere_activite = None   # Dernier DateCreation
+        self.operateur_principal = None # Plus petit code opérateur (comme MIN() côté SQL)
+
+    def touch(self, ident, activite):
+        if ident is not None and (self.operateur_principal is None or ident < self.operateur_principal):
+            self.operateur_principal = ident
+        if activite is not None and (self.derniere_activite is None or activite > self.derniere_activite):
+            self.derniere_activite = activite
+
+    @property
+    def nb_en_cours(self):
+        return max(0, self.demarrages - self.termines)
+
+    @property
+    def nb_operations(self):
+        return max(self.demarrages, self.termines)
+
+    @property
+    def statut(self):
+        if self.nb_en_cours > 0:
+            return 'EN_COURS'
+        if self.termines > 0:
+            return 'TERMINE'
+        return 'INCONNU'
+
+
+def _day_of(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+class LaunchSummary:
+    """Synthèse en mémoire des lancements du jour, réconciliée périodiquement avec la base
+
+    loader(jour) retourne des lignes (code, phase, source, nombre, durée en
+    secondes, dernière activité, plus petit opérateur, premier DateTravail),
+    source valant 'D' (démarrages) ou 'T' (fins).
+    """
+
+    def __init__(self, loader, reconcile_interval=300):
+        self._loader = loader
+        self.reconcile_interval = reconcile_interval
+        self._day = None
+        self._entries = {}
+        self._reconciled_at = None
+        self._attempted_at = None
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._thread = None
+        self._stats = {'reconciles': 0, 'reconcile_errors': 0, 'last_error': None,
+                       'incremental_updates': 0, 'reconcile_time_last': None}
+
+    # ---- Mises à jour incrémentales ----
+
+    def record_start(self, code, phase, ident, date_travail, activite=None):
+        with self._lock:
+            entry = self._entry_for(code, phase, date_travail)
+            if entry is None:
+                return
+            entry.demarrages += 1
+            if date_travail is not None and (entry.debut is None or date_travail < entry.debut):
+                entry.debut = date_travail
+            entry.touch(ident, activite or datetime.now())
+            self._stats['incremental_updates'] += 1
+
+    def record_stop(self, code, phase, ident, date_travail, duree_secondes=0, activite=None):
+        with self._lock:
+            entry = self._entry_for(code, phase, date_travail)
+            if entry is None:
+                return
+            entry.termines += 1
+            entry.duree_totale += duree_secondes or 0
+            entry.touch(ident, activite or datetime.now())
+            self._stats['incremental_updates'] += 1
+
+    def _entry_for(self, code, phase, date_travail):
+        # Avant la première réconciliation ou pour un autre jour : la réconciliation s'en charge
+        if self._day is None or _day_of(date_travail) != self._day:
+            return None
+        key = (code, phase)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = LaunchEntry(code, phase)
+        return entry
+
+    # ---- Réconciliation ----
+
+    def reconcile(self, day=None):
+        """Reconstruit la synthèse depuis la base (une requête) ; conserve l'ancienne en cas d'échec"""
+        day = day or date.today()
+        with self._reconcile_lock:
+            start = self._attempted_at = time.monotonic()
+            try:
+                rows = self._loader(day)
+            except Exception as e:
+                with self._lock:
+                    self._stats['reconcile_errors'] += 1
+                    self._stats['last_error'] = str(e)
+                print(f"⚠️ Réconciliation de la synthèse des lancements impossible: {e}")
+                return False
+            entries = {}
+            for code, phase, source, count, duree, activite, ident, debut in rows:
+                key = (code, phase)
+                entry = entries.get(key)
+                if entry is None:
+                    entry = entries[key] = LaunchEntry(code, phase)
+                if source == 'D':
+                    entry.demarrages += count
+                    entry.debut = debut
+                else:
+                    entry.termines += count
+                    entry.duree_totale += int(duree or 0)
+                entry.touch(ident, activite)
+            with self._lock:
+                self._day = day
+                self._entries = entries
+                self._reconciled_at = time.monotonic()
+                self._stats['reconciles'] += 1
+                self._stats['last_error'] = None
+                self._stats['reconcile_time_last'] = round(time.monotonic() - start, 6)
+            return True
+
+    def start(self):
+        """Réconciliation périodique en arrière-plan (une seule fois)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='launch-summary', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(min(self.reconcile_interval, 60))
+            with self._lock:
+                due = (self._day != date.today()
+                       or self._reconciled_at is None
+                       or time.monotonic() - self._reconciled_at >= self.reconcile_interval)
+            if due:
+                self.reconcile()
+
+    # ---- Lecture ----
+
+    def entries(self):
+        """Copie des entrées du jour (réconciliation synchrone au premier accès ou au changement de jour)"""
+        if self._day != date.today():
+            # Après un échec, on ne réinterroge pas la base à chaque lecture
+            if self._attempted_at is None or time.monotonic() - self._attempted_at >= 5:
+                self.reconcile()
+            self.start()
+        with self._lock:
+            return [
+                {
+                    'code': e.code,
+                    'phase': e.phase,
+                    'demarrages': e.demarrages,
+                    'termines': e.termines,
+                    'en_cours': e.nb_en_cours,
+                    'operations': e.nb_operations,
+                    'statut': e.statut,
+                    'duree_totale': e.duree_totale,
+                    'debut': e.debut,
+                    'derniere_activite': e.derniere_activite,
+                    'operateur_principal': e.operateur_principal
+                }
+                for e in self._entries.values()
+            ]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['day'] = self._day.isoformat() if self._day else None
+            stats['entries'] = len(self._entries)
+            stats['age_seconds'] = (
+                round(time.monotonic() - self._reconciled_at, 1) if self._reconciled_at is not None else None
+            )
+        stats['reconcile_interval'] = self.reconcile_interval
+        return stats
@@ -0,0 +1,265 @@
+# Flux temps réel (Server-Sent Events) pour le tableau de bord admin
+#
+# Un seul poller par processus détecte les nouvelles lignes des tables de
+# l'application (point de reprise sur NoEnreg) et diffuse les événements à
+# tous les navigateurs abonnés : la charge sur SQL Server ne dépend pas du
+# nombre de tableaux de bord ouverts. Les écritures faites par ce processus
+# sont publiées immédiatement, sans attendre le prochain sondage.
+#
+# L'identifiant SSE d'un événement n'est pas un compteur du processus : c'est
+# le point atteint dans chaque table ("temps_travail:12,historique:40"),
+# d'après les NoEnreg. Tous les workers voient les mêmes lignes (écritures
+# locales ou sondage) : une reconnexion qui arrive sur un autre worker reprend
+# au même endroit.
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Subscriber:
+    """Un client SSE : file bornée d'événements à envoyer"""
+
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Client trop lent : il sera déconnecté et se reconnectera (Last-Event-ID)
+            self.dropped = True
+
+
+def format_event_id(cursor):
+    """Identifiant SSE : {table: dernier NoEnreg} -> "table:NoEnreg,..." """
+    return ','.join(f"{key}:{seq}" for key, seq in sorted(cursor.items()))
+
+
+def parse_event_id(value):
+    """Last-Event-ID -> {table: NoEnreg} ; None s'il est absent ou illisible"""
+    if not value:
+        return None
+    cursor = {}
+    try:
+        for part in value.split(','):
+            key, seq = part.rsplit(':', 1)
+            cursor[key] = int(seq)
+    except ValueError:
+        return None
+    return cursor or None
+
+
+class EventBroker:
+    """Diffusion des événements à tous les abonnés, avec un historique court pour la reprise
+
+    Chaque événement a une position (table, NoEnreg) : une position déjà
+    présente dans l'historique n'est pas republiée (écriture locale revue
+    par le sondage).
+    """
+
+    def __init__(self, replay_size=500, max_queue=1000):
+        self.max_queue = max_queue
+        self.replay_size = replay_size
+        self._subscribers = set()
+        self._replay = deque()                      # ((id, type, données), position)
+        self._positions = set()                     # Positions présentes dans _replay
+        self._cursor = {}                           # {table: plus grand NoEnreg publié}
+        self._lock = threading.Lock()
+        self._published = 0
+
+    def publish(self, event_type, data, position=None):
+        """Diffuse un événement ; position = (table, NoEnreg). None si la position a déjà été publiée"""
+        with self._lock:
+            if position is not None:
+                if position in self._positions:
+                    return None
+                key, seq = position
+                self._cursor[key] = max(seq, self._cursor.get(key, seq))
+            event = (format_event_id(self._cursor), event_type, data)
+            if len(self._replay) >= self.replay_size:
+                _, evicted = self._replay.popleft()
+                self._positions.discard(evicted)
+            self._replay.append((event, position))
+            if position is not None:
+                self._positions.add(position)
+            self._published += 1
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(event)
+        return event[0]
+
+    def subscribe(self, cursor=None):
+        """Nouvel abonné ; les événements postérieurs à cursor ({table: NoEnreg}, voir parse_event_id) sont rejoués
+
+        Une table absente du curseur n'est pas rejouée : le client n'en
+        connaissait aucune position.
+        """
+        subscriber = Subscriber(self.max_queue)
+        with self._lock:
+            if cursor:
+                for event, position in self._replay:
+                    if position is not None and position[0] in cursor and position[1] > cursor[position[0]]:
+                        subscriber.push(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self._published,
+                'replay_buffer': len(self._replay),
+                'cursor': dict(self._cursor)
+            }
+
+
+def format_sse(event):
+    """Encode un événement au format text/event-stream"""
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream(broker, subscriber, keepalive=15):
+    """Générateur de la réponse SSE ; désabonne le client à la déconnexion"""
+    try:
+        yield "retry: 3000\n\n"
+        while not subscriber.dropped:
+            try:
+                event = subscriber.queue.get(timeout=keepalive)
+            except queue.Empty:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+class ChangePoller:
+    """Sonde partagée : une requête par intervalle, quel que soit le nombre d'abonnés
+
+    poll(watermarks) retourne (événements, nouveaux points de reprise), chaque
+    événement étant (table, type, NoEnreg, données, position) ; les événements
+    déjà publiés localement (mark_published) sont ignorés. listener(données)
+    reçoit chaque ligne écrite par un autre processus, une fois diffusée.
+
+    Sans abonné SSE ni demande récente (want), la sonde est au repos.
+    """
+
+    def __init__(self, broker, poll, interval=2, listener=None):
+        self._broker = broker
+        self._poll = poll
+        self.interval = interval
+        self._listener = listener
+        self._watermarks = None                 # {table: dernier NoEnreg vu}
+        self._published = {}                    # {table: NoEnreg publiés localement}
+        self._wanted_until = 0.0                # Sondage demandé hors SSE jusqu'à (time.monotonic())
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'polls': 0, 'events': 0, 'errors': 0, 'last_error': None, 'poll_time_total': 0.0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='live-feed-poller', daemon=True)
+            self._thread.start()
+
+    def mark_published(self, table, no_enreg):
+        """Écriture locale déjà diffusée : le poller ne la republiera pas"""
+        with self._lock:
+            self._published.setdefault(table, set()).add(no_enreg)
+
+    def want(self, seconds):
+        """Garde la sonde active seconds secondes sans abonné SSE ; True si elle était au repos
+
+        Au repos, les points de reprise sont posés immédiatement : l'appelant
+        relit alors depuis la base ce qui a été écrit entre-temps.
+        """
+        with self._lock:
+            self._wanted_until = max(self._wanted_until, time.monotonic() + seconds)
+            idle = self._watermarks is None
+        if idle:
+            self.poll_once()
+        return idle
+
+    def resume(self, watermarks):
+        """Sonde au repos : repartir des points de reprise d'un client qui se reconnecte
+
+        Les lignes écrites par les autres workers pendant que personne
+        n'écoutait ce processus sont alors diffusées au premier sondage.
+        """
+        with self._lock:
+            if self._watermarks is None and watermarks:
+                self._watermarks = dict(watermarks)
+
+    def reset(self):
+        """Changement de base de travail : les points de reprise sont recalculés"""
+        with self._lock:
+            self._watermarks = None
+            self._published = {}
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            # Personne n'écoute : aucune requête ; le point de reprise repartira de la fin
+            if self._broker.subscriber_count == 0 and time.monotonic() >= self._wanted_until:
+                self.reset()
+                continue
+            self.poll_once()
+
+    def poll_once(self):
+        start = time.monotonic()
+        with self._lock:
+            watermarks = dict(self._watermarks) if self._watermarks is not None else None
+        try:
+            events, new_watermarks = self._poll(watermarks)
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+                self._stats['last_error'] = str(e)
+            return
+        to_publish = []
+        with self._lock:
+            for table, event_type, no_enreg, data, position in events:
+                published = self._published.get(table)
+                if published and no_enreg in published:
+                    published.discard(no_enreg)
+                    continue
+                to_publish.append((event_type, data, position))
+            # Les NoEnreg locaux plus anciens que le point de reprise ne reviendront plus
+            for table, watermark in new_watermarks.items():
+                published = self._published.get(table)
+                if published:
+                    self._published[table] = {n for n in published if n > watermark}
+            self._watermarks = new_watermarks
+            self._stats['polls'] += 1
+            self._stats['events'] += len(to_publish)
+            self._stats['poll_time_total'] += time.monotonic() - start
+        for event_type, data, position in to_publish:
+            # Position déjà diffusée : écriture locale revue après une remise à zéro
+            if self._broker.publish(event_type, data, position) is not None and self._listener is not None:
+                try:
+                    self._listener(data)
+                except Exception as e:
+                    print(f"⚠️ Flux temps réel - ligne non prise en compte: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['watermarks'] = dict(self._watermarks) if self._watermarks else None
+        stats['poll_time_total'] = round(stats['poll_time_total'], 6)
+        stats['interval'] = self.interval
+        return stats
@@ -0,0 +1,174 @@
+# Métriques au format texte Prometheus (/metrics)
+#
+# Compteurs et histogrammes en mémoire, sans dépendance externe. Une
+# observation coûte une recherche dichotomique dans les bornes et un verrou
+# non contendu : négligeable devant un aller-retour vers SQL Server. Les
+# valeurs d'état (mode simulation, pools...) sont lues au moment du scrape.
+#
+# Avec plusieurs workers gunicorn, chaque processus expose ses propres
+# séries ; le label 'worker' (pid) permet de les distinguer et de les sommer.
+import math
+import os
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bornes par défaut des durées (secondes) : de la requête servie en mémoire
+# à l'export qui dure plusieurs minutes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if math.isnan(value):
+            return 'NaN'
+        return repr(value)
+    return str(int(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _check(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name}: labels attendus {self.labelnames}, reçus {labels}')
+
+    def samples(self):
+        """(suffixe, valeurs des labels, labels supplémentaires, valeur)"""
+        return []
+
+
+class Counter(_Metric):
+    """Compteur monotone, par combinaison de labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [('', labels, (), value) for labels, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Histogramme à bornes fixes (buckets cumulés à l'export, comme Prometheus)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}           # labels -> [compte par tranche (+Inf en dernier), somme]
+
+    def observe(self, value, *labels):
+        self._check(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        result = []
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                result.append(('_bucket', labels, (('le', _format_value(float(bound))),), cumulative))
+            result.append(('_sum', labels, (), total))
+            result.append(('_count', labels, (), cumulative))
+        return result
+
+
+class CallbackMetric(_Metric):
+    """Valeurs calculées au scrape : collect() retourne [(valeurs des labels, valeur)]"""
+
+    def __init__(self, name, documentation, labelnames=(), collect=None, kind='gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        return [('', tuple(labels), (), value) for labels, value in self._collect() if value is not None]
+
+
+class Registry:
+    """Ensemble des métriques d'un processus, rendu au format texte Prometheus"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=(), collect=None):
+        return self._register(CallbackMetric(name, documentation, labelnames, collect, 'gauge'))
+
+    def counter_callback(self, name, documentation, labelnames=(), collect=None):
+        """Compteur tenu ailleurs (statistiques d'un pool...) et lu au scrape"""
+        return self._register(CallbackMetric(name, documentation, labelnames, collect, 'counter'))
+
+    def render(self):
+        # Le pid peut changer après un fork (gunicorn) : relu à chaque rendu
+        worker = (('worker', str(os.getpid())),)
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                lines.append(f'# {metric.name}: collecte impossible ({_escape(e)})')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for suffix, labels, extra, value in samples:
+                lines.append(
+                    f'{metric.name}{suffix}{_format_labels(metric.labelnames, labels, worker + extra)} '
+                    f'{_format_value(value)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+# Registre du processus
+REGISTRY = Registry()
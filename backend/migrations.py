@@ -0,0 +1,162 @@
+# Migrations versionnées du schéma des tables de l'application
+#
+# La version courante est stockée dans AB_SCHEMA_VERSION, à côté des tables de
+# l'application (base autonome ou base de fallback). Au démarrage, les
+# migrations manquantes sont appliquées dans l'ordre, chacune dans sa propre
+# transaction. Un verrou applicatif SQL Server (sp_getapplock) sérialise les
+# workers qui démarrent en même temps : un seul applique, les autres attendent
+# puis constatent que tout est à jour.
+
+from queries import run_query
+
+MIGRATION_LOCK = 'sedi_app_schema_migrations'
+LOCK_TIMEOUT_MS = 60000
+
+
+def _index(name, table_key, keys, include=None):
+    """CREATE INDEX idempotent sur une table de l'application"""
+    include_sql = f" INCLUDE ({include})" if include else ''
+    return (
+        f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{name}' "
+        f"AND object_id = OBJECT_ID(N'{{{table_key}}}'))\n"
+        f"CREATE NONCLUSTERED INDEX [{name}] ON {{{table_key}}} ({keys}){include_sql}"
+    )
+
+
+def _add_column(table_key, column, definition):
+    """ALTER TABLE ... ADD idempotent sur une table de l'application"""
+    return (
+        f"IF COL_LENGTH(N'{{{table_key}}}', '{column}') IS NULL\n"
+        f"ALTER TABLE {{{table_key}}} ADD {column} {definition}"
+    )
+
+
+def _table(table_key, columns):
+    """CREATE TABLE idempotent dans la base des tables de l'application"""
+    return (
+        f"IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'{{{table_key}}}') AND type in (N'U'))\n"
+        f"CREATE TABLE {{{table_key}}} ({columns})"
+    )
+
+
+# (version, description, instructions SQL) ; {temps_travail}, {historique},
+# {sessions}, {evenements} et {archives} sont remplacés par les noms complets des tables en usage.
+MIGRATIONS = [
+    (1, 'Index historique par opérateur et date (historique-operateur, pagination)',
+     _index('IX_ABHISTORIQUE_Ident_DateTravail', 'historique',
+            'Ident, DateTravail DESC, NoEnreg DESC',
+            'CodeLanctImprod, Phase, CodeRubrique, VarNumUtil8, VarNumUtil9, Statut, DateCreation')),
+    (2, 'Index temps de travail par opérateur et date',
+     _index('IX_ABTEMPS_Ident_DateTravail', 'temps_travail',
+            'Ident, DateTravail',
+            'CodeLanctImprod, Phase, CodeRubrique, Statut, DateCreation')),
+    (3, 'Index sessions par date de début et opérateur (operateurs-badges)',
+     _index('IX_ABSESSIONS_DateDebut_Ident', 'sessions',
+            'DateDebut, Ident',
+            'Statut, DateCreation')),
+    (4, 'Index temps de travail par date (synthèse des lancements du jour)',
+     _index('IX_ABTEMPS_DateTravail', 'temps_travail',
+            'DateTravail',
+            'Ident, CodeLanctImprod, Phase, DateCreation')),
+    (5, 'Index historique par date (synthèse des lancements du jour)',
+     _index('IX_ABHISTORIQUE_DateTravail', 'historique',
+            'DateTravail',
+            'Ident, CodeLanctImprod, Phase, VarNumUtil8, VarNumUtil9, DateCreation')),
+    (6, 'Journal des événements des tablettes (dédoublonnage de /api/evenements-travail)',
+     _table('evenements',
+            'NoEnreg INT IDENTITY(1,1) PRIMARY KEY, '
+            'EventId NVARCHAR(64) NOT NULL CONSTRAINT UQ_AB_EVENEMENTS_TABLETTES_EventId UNIQUE, '
+            'TableCible NVARCHAR(20) NOT NULL, '
+            'NoEnregCible INT NOT NULL, '
+            'DateCreation DATETIME DEFAULT GETDATE()')),
+    (7, 'Sessions : pause en cours, cumul des pauses et durée calculée par le serveur',
+     ';\n'.join((
+         _add_column('sessions', 'DatePause', 'DATETIME NULL'),
+         _add_column('sessions', 'DureePause', 'INT NOT NULL CONSTRAINT DF_ABSESSIONS_DureePause DEFAULT 0'),
+         _add_column('sessions', 'DureeTravail', 'INT NULL')
+     ))),
+    (8, 'Index sessions ouvertes par statut et opérateur (registre des sessions)',
+     _index('IX_ABSESSIONS_Statut_Ident', 'sessions',
+            'Statut, Ident',
+            'DateDebut, CodeLanctImprod, Phase, CodeRubrique, DatePause, DureePause')),
+    (9, 'Catalogue des mois archivés de l\'historique (ABHISTORIQUE_OPERATEURS_AAAAMM)',
+     _table('archives',
+            'Mois INT NOT NULL PRIMARY KEY, '
+            'TableArchive NVARCHAR(128) NOT NULL, '
+            'NbLignes INT NOT NULL DEFAULT 0, '
+            'NoEnregMin INT NULL, '
+            'NoEnregMax INT NULL, '
+            'DateMaj DATETIME DEFAULT GETDATE()')),
+]
+
+
+def schema_version_table(tables):
+    """AB_SCHEMA_VERSION dans la même base/schéma que les tables de l'application"""
+    prefix = tables['historique'].rsplit('.', 1)[0]
+    return f"{prefix}.[AB_SCHEMA_VERSION]"
+
+
+def _ensure_version_table(cursor, version_table):
+    run_query(cursor, 'migrations_table_version', f"""
+    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'{version_table}') AND type in (N'U'))
+    CREATE TABLE {version_table} (
+        Version INT NOT NULL PRIMARY KEY,
+        Description NVARCHAR(200),
+        DateApplication DATETIME DEFAULT GETDATE()
+    )
+    """)
+
+
+def current_version(cursor, version_table):
+    return run_query(
+        cursor, 'migrations_version', f"SELECT ISNULL(MAX(Version), 0) FROM {version_table}", fetch='one'
+    )[0]
+
+
+def apply_migrations(conn, tables, migrations=None):
+    """Applique les migrations manquantes ; retourne la liste des versions appliquées
+
+    conn doit pointer sur la base qui contient les tables (verrou applicatif
+    par base). Les erreurs sont propagées à l'appelant.
+    """
+    migrations = sorted(migrations if migrations is not None else MIGRATIONS)
+    version_table = schema_version_table(tables)
+    cursor = conn.cursor()
+
+    locked = run_query(
+        cursor, 'migrations_verrou',
+        "DECLARE @result INT;\n"
+        "EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+        "@LockOwner = 'Session', @LockTimeout = ?;\n"
+        "SELECT @result",
+        (MIGRATION_LOCK, LOCK_TIMEOUT_MS), fetch='one'
+    )[0]
+    if locked < 0:
+        raise RuntimeError('Verrou de migration non obtenu (un autre worker migre encore ?)')
+
+    applied = []
+    try:
+        _ensure_version_table(cursor, version_table)
+        conn.commit()
+        version = current_version(cursor, version_table)
+        for number, description, sql in migrations:
+            if number <= version:
+                continue
+            try:
+                run_query(cursor, 'migrations_application', sql.format(**tables))
+                run_query(
+                    cursor, 'migrations_enregistrement',
+                    f"INSERT INTO {version_table} (Version, Description) VALUES (?, ?)",
+                    (number, description)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"🧱 Migration {number} appliquée: {description}")
+            applied.append(number)
+    finally:
+        run_query(cursor, 'migrations_verrou_liberation',
+                  "EXEC sp_releaseapplock @Resource = ?, @LockOwner = 'Session'", (MIGRATION_LOCK,))
+        conn.commit()
+    return applied
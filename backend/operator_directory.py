@@ -0,0 +1,122 @@
+# Annuaire des opérateurs (RESSOURC) en mémoire
+#
+# La liste des opérateurs change quelques fois par mois : elle est chargée une
+# fois, rafraîchie en arrière-plan selon un TTL et indexée par Coderessource.
+import threading
+import time
+
+
+def normalize_code(code):
+    """Clé d'index : SQL Server ignore les espaces de fin dans les comparaisons"""
+    return str(code).strip() if code is not None else ''
+
+
+class OperatorDirectory:
+    """Annuaire process-wide des opérateurs, indexé par Coderessource"""
+
+    def __init__(self, loader, ttl=3600, retry_interval=30):
+        # loader() -> liste de tuples (Coderessource, Designation1)
+        self._loader = loader
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._operators = []      # [{'operateur': ..., 'nom': ...}] trié par code
+        self._by_code = {}
+        self._loaded_at = None    # time.monotonic() du dernier chargement réussi
+        self._last_error = None
+        self._attempted_at = None # time.monotonic() de la dernière tentative
+        self._loads = 0
+        self._load_lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._refresher = None
+
+    # ---- Chargement ----
+
+    def reload(self):
+        """Recharge l'annuaire depuis l'ERP ; conserve l'ancien en cas d'échec"""
+        with self._load_lock:
+            self._attempted_at = time.monotonic()
+            try:
+                rows = self._loader()
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"⚠️ Rechargement de l'annuaire des opérateurs impossible: {e}")
+                return False
+            operators = []
+            by_code = {}
+            for code, nom in rows:
+                entry = {'operateur': code, 'nom': nom}
+                operators.append(entry)
+                by_code[normalize_code(code)] = entry
+            # Remplacement atomique : les lecteurs voient l'ancien ou le nouvel annuaire
+            self._operators, self._by_code = operators, by_code
+            self._loaded_at = time.monotonic()
+            self._last_error = None
+            self._loads += 1
+            return True
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            # Premier accès : un seul thread charge, les autres attendent le résultat
+            with self._first_load_lock:
+                # ERP inaccessible : pas de nouvelle tentative à chaque lecture
+                recently_failed = (self._attempted_at is not None
+                                   and time.monotonic() - self._attempted_at < self.retry_interval)
+                if self._loaded_at is None and not recently_failed:
+                    self.reload()
+            self.start()
+
+    def start(self):
+        """Démarre le rafraîchissement périodique en arrière-plan (une seule fois)"""
+        if self._refresher is not None:
+            return
+        with self._load_lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name='operator-directory', daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            # Après un échec, on retente plus tôt que le TTL
+            delay = self.ttl if self._last_error is None else self.retry_interval
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+            self.reload()
+
+    def invalidate(self):
+        """Force un rechargement immédiat (ajout d'un opérateur par les RH)"""
+        return self.reload()
+
+    # ---- Lecture ----
+
+    def all(self):
+        """Liste des opérateurs triée par Coderessource"""
+        self._ensure_loaded()
+        return self._operators
+
+    def get(self, code):
+        """Opérateur par Coderessource, ou None"""
+        self._ensure_loaded()
+        return self._by_code.get(normalize_code(code))
+
+    def name(self, code, default=None):
+        """Designation1 d'un opérateur, ou default s'il est inconnu"""
+        entry = self.get(code)
+        return entry['nom'] if entry and entry['nom'] else default
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def stats(self):
+        age = None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 1)
+        return {
+            'operateurs': len(self._operators),
+            'age_seconds': age,
+            'ttl': self.ttl,
+            'loads': self._loads,
+            'last_error': self._last_error
+        }
@@ -0,0 +1,192 @@
+# Exécution instrumentée des accès SQL Server
+#
+# Chaque requête de app.py passe par run_query avec un nom stable
+# ('badges_du_jour', 'historique_page'...) : durée (lecture du résultat
+# comprise), lignes retournées et erreurs par type sont agrégées par nom.
+# Les connexions physiques sont mesurées par timed_connect. Le temps base de
+# données de la requête HTTP en cours est cumulé pour le distinguer du temps
+# passé dans Flask (sérialisation, compression). Les requêtes lentes et les
+# profils SQL Server sont confiés au journal installé (query_log.py).
+import threading
+import time
+
+from metrics import REGISTRY
+from query_log import PROFILE_ON, PROFILE_OFF, parse_statistics
+
+QUERY_SECONDS = REGISTRY.histogram(
+    'sedi_db_query_duration_seconds', 'Durée des requêtes SQL par nom (lecture du résultat comprise)', ('query',)
+)
+ACQUIRE_SECONDS = REGISTRY.histogram(
+    'sedi_db_acquire_duration_seconds', 'Emprunt d\'une connexion au pool (attente, validation, login)', ('database',)
+)
+QUERY_ROWS = REGISTRY.histogram(
+    'sedi_db_query_rows', 'Lignes retournées ou modifiées par requête SQL', ('query',),
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000)
+)
+CONNECT_SECONDS = REGISTRY.histogram(
+    'sedi_db_connect_duration_seconds', 'Durée d\'ouverture d\'une connexion physique (login compris)', ('database',)
+)
+DB_ERRORS = REGISTRY.counter(
+    'sedi_db_errors_total', 'Erreurs base de données par opération et type d\'exception', ('operation', 'type')
+)
+
+# Journal des requêtes lentes / profilage (query_log.QueryLog), installé par app.py
+_query_log = None
+
+
+def install_query_log(log):
+    global _query_log
+    _query_log = log
+
+
+# Temps base de données cumulé par le thread de la requête HTTP en cours
+_local = threading.local()
+
+
+def start_request():
+    _local.db_seconds = 0.0
+
+
+def request_db_seconds():
+    """Temps base de données de la requête HTTP en cours (0 hors requête)"""
+    return getattr(_local, 'db_seconds', 0.0)
+
+
+def add_request_db_time(seconds):
+    if hasattr(_local, 'db_seconds'):
+        _local.db_seconds += seconds
+
+
+def record_error(operation, exc):
+    DB_ERRORS.inc(operation, type(exc).__name__)
+
+
+def _observe(name, elapsed, rows):
+    add_request_db_time(elapsed)
+    QUERY_SECONDS.observe(elapsed, name)
+    if rows is not None and rows >= 0:
+        QUERY_ROWS.observe(rows, name)
+
+
+def run_query(cursor, name, sql, params=None, fetch=None):
+    """Exécute une requête nommée et la mesure
+
+    fetch : None (le curseur est retourné, le résultat est lu par l'appelant),
+    'one' (fetchone) ou 'all' (fetchall). Sans fetch, le nombre de lignes est
+    celui rapporté par le driver pour les écritures. Seules les requêtes dont
+    le résultat est lu ici peuvent être profilées (les messages de SQL Server
+    arrivent après les lignes).
+    """
+    log = _query_log
+    profile = fetch is not None and log is not None and log.should_profile(name)
+    messages = []
+    start = time.perf_counter()
+    try:
+        if params is None:
+            cursor.execute(PROFILE_ON + sql if profile else sql)
+        else:
+            cursor.execute(PROFILE_ON + sql if profile else sql, params)
+        if profile:
+            messages.extend(_messages(cursor))
+        if fetch == 'all':
+            result = cursor.fetchall()
+            rows = len(result)
+        elif fetch == 'one':
+            result = cursor.fetchone()
+            rows = 0 if result is None else 1
+        else:
+            result = cursor
+            rows = getattr(cursor, 'rowcount', -1)
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        add_request_db_time(elapsed)
+        record_error('query', e)
+        if profile:
+            _statistics_off(cursor)
+        if log is not None:
+            log.record(name, elapsed, None, params, error=type(e).__name__)
+        raise
+    elapsed = time.perf_counter() - start
+    _observe(name, elapsed, rows)
+    if log is not None:
+        statistics = None
+        if profile:
+            messages.extend(_drain_messages(cursor))
+            _statistics_off(cursor)
+            statistics = parse_statistics(messages)
+        log.record(name, elapsed, rows, params, statistics=statistics)
+    return result
+
+
+def run_many(cursor, name, sql, seq_of_params):
+    """executemany nommé et mesuré (lignes = nombre de jeux de paramètres)"""
+    start = time.perf_counter()
+    try:
+        cursor.executemany(sql, seq_of_params)
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        add_request_db_time(elapsed)
+        record_error('query', e)
+        if _query_log is not None:
+            _query_log.record(name, elapsed, None, None, error=type(e).__name__)
+        raise
+    elapsed = time.perf_counter() - start
+    _observe(name, elapsed, len(seq_of_params))
+    if _query_log is not None:
+        # Empreinte du premier jeu de paramètres seulement (les lots font des milliers de lignes)
+        _query_log.record(name, elapsed, len(seq_of_params), seq_of_params[0] if seq_of_params else None)
+    return cursor
+
+
+def _messages(cursor):
+    return list(getattr(cursor, 'messages', None) or [])
+
+
+def _drain_messages(cursor):
+    """Messages restants (STATISTICS IO arrive après le dernier jeu de résultats)"""
+    messages = []
+    try:
+        while cursor.nextset():
+            messages.extend(_messages(cursor))
+        messages.extend(_messages(cursor))
+    except Exception:
+        pass
+    return messages
+
+
+def _statistics_off(cursor):
+    # La connexion retourne au pool : l'option de session ne doit pas la suivre
+    try:
+        cursor.execute(PROFILE_OFF)
+    except Exception:
+        pass
+
+
+def timed_connect(database, connect):
+    """Ouvre une connexion physique via connect() en mesurant le temps de login
+
+    Le temps de la requête HTTP est compté par l'appelant (emprunt au pool).
+    """
+    start = time.perf_counter()
+    try:
+        conn = connect()
+    except Exception as e:
+        record_error('connect', e)
+        raise
+    CONNECT_SECONDS.observe(time.perf_counter() - start, database)
+    return conn
+
+
+def timed_acquire(database, acquire):
+    """Emprunt au pool via acquire(), compté dans le temps base de la requête HTTP"""
+    start = time.perf_counter()
+    try:
+        conn = acquire()
+    except Exception as e:
+        add_request_db_time(time.perf_counter() - start)
+        record_error('acquire', e)
+        raise
+    elapsed = time.perf_counter() - start
+    add_request_db_time(elapsed)
+    ACQUIRE_SECONDS.observe(elapsed, database)
+    return conn
@@ -0,0 +1,191 @@
+# Journal des requêtes lentes et profilage échantillonné (/api/query-log)
+#
+# queries.run_query signale chaque exécution : au-delà du seuil, la requête
+# est journalisée (nom, durée, lignes, empreinte des paramètres). Sur option,
+# une part des exécutions est faite sous SET STATISTICS IO, TIME ON : les
+# messages de SQL Server (lectures logiques par table, temps CPU) sont
+# conservés, ce qui évite d'attacher un profileur à SERVEURERP.
+#
+# L'empreinte ne contient pas les valeurs des paramètres (noms d'opérateurs,
+# codes lancement) : seulement leur nombre, leurs types et un hachage court
+# qui permet de reconnaître une même combinaison.
+import hashlib
+import random
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+PROFILE_ON = 'SET STATISTICS IO, TIME ON;\n'
+PROFILE_OFF = 'SET STATISTICS IO, TIME OFF'
+
+_IO_RE = re.compile(
+    r"Table '([^']+)'\. Scan count (\d+), logical reads (\d+), physical reads (\d+)"
+    r"(?:.*?read-ahead reads (\d+))?"
+)
+_TIME_RE = re.compile(r"CPU time = (\d+) ms,\s*elapsed time = (\d+) ms")
+
+
+def fingerprint(params):
+    """Empreinte d'un jeu de paramètres : 'nombre:types#hachage' (valeurs non conservées)"""
+    if params is None:
+        return '0'
+    params = list(params)
+    # Types regroupés par séries : une liste IN de 500 codes donne 'str*500'
+    runs = []
+    for value in params:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    types = ','.join(name if count == 1 else f'{name}*{count}' for name, count in runs)
+    digest = hashlib.sha1(repr(params).encode('utf-8', 'replace')).hexdigest()[:10]
+    return f'{len(params)}:{types}#{digest}'
+
+
+def _message_text(message):
+    # pyodbc : (état, texte) ; le texte est préfixé par [Driver][SQL Server]
+    text = message[1] if isinstance(message, (tuple, list)) and len(message) > 1 else message
+    return str(text).rsplit(']', 1)[-1].strip()
+
+
+def parse_statistics(messages):
+    """Lectures par table et temps CPU / écoulé à partir des messages STATISTICS IO/TIME"""
+    tables = {}
+    compile_ms = {'cpu': 0, 'elapsed': 0}
+    execution_ms = {'cpu': 0, 'elapsed': 0}
+    texts = [_message_text(message) for message in messages]
+    for text in texts:
+        for table, scans, logical, physical, read_ahead in _IO_RE.findall(text):
+            counters = tables.setdefault(table, {'scans': 0, 'logical_reads': 0, 'physical_reads': 0,
+                                                 'read_ahead_reads': 0})
+            counters['scans'] += int(scans)
+            counters['logical_reads'] += int(logical)
+            counters['physical_reads'] += int(physical)
+            counters['read_ahead_reads'] += int(read_ahead or 0)
+        target = compile_ms if 'parse and compile' in text else execution_ms
+        for cpu, elapsed in _TIME_RE.findall(text):
+            target['cpu'] += int(cpu)
+            target['elapsed'] += int(elapsed)
+    return {
+        'tables': tables,
+        'logical_reads': sum(t['logical_reads'] for t in tables.values()),
+        'physical_reads': sum(t['physical_reads'] for t in tables.values()),
+        'compile_ms': compile_ms,
+        'execution_ms': execution_ms,
+        'messages': texts[:20]
+    }
+
+
+class QueryLog:
+    """Requêtes lentes, profils échantillonnés et cumul par nom de requête"""
+
+    def __init__(self, slow_threshold=0.5, max_entries=200, profile_sample_rate=0.0, max_profiles=50):
+        self.slow_threshold = slow_threshold
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_queries = None         # Noms à profiler (None = toutes)
+        self._slow = deque(maxlen=max_entries)
+        self._profiles = deque(maxlen=max_profiles)
+        self._by_name = {}                  # nom -> [exécutions, lentes, erreurs, durée totale, durée max]
+        self._lock = threading.Lock()
+
+    def configure(self, slow_threshold=None, profile_sample_rate=None, profile_queries=False):
+        """Modifie le seuil / l'échantillonnage à chaud (profile_queries=None : toutes les requêtes)"""
+        if slow_threshold is not None:
+            if slow_threshold < 0:
+                raise ValueError('Le seuil doit être positif')
+            self.slow_threshold = slow_threshold
+        if profile_sample_rate is not None:
+            if not 0 <= profile_sample_rate <= 1:
+                raise ValueError("Le taux d'échantillonnage doit être compris entre 0 et 1")
+            self.profile_sample_rate = profile_sample_rate
+        if profile_queries is not False:
+            if isinstance(profile_queries, str):
+                profile_queries = [profile_queries]
+            self.profile_queries = set(profile_queries) if profile_queries else None
+
+    def should_profile(self, name):
+        rate = self.profile_sample_rate
+        if rate <= 0:
+            return False
+        if self.profile_queries is not None and name not in self.profile_queries:
+            return False
+        return rate >= 1 or random.random() < rate
+
+    def record(self, name, duration, rows, params, error=None, statistics=None):
+        """Exécution terminée (appelé pour chaque requête : doit rester peu coûteux)"""
+        slow = duration >= self.slow_threshold
+        with self._lock:
+            totals = self._by_name.get(name)
+            if totals is None:
+                totals = self._by_name[name] = [0, 0, 0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += slow
+            totals[2] += error is not None
+            totals[3] += duration
+            if duration > totals[4]:
+                totals[4] = duration
+        if not slow and statistics is None:
+            return
+        entry = {
+            'query': name,
+            'at': datetime.now().isoformat(),
+            'duration_ms': round(duration * 1000.0, 1),
+            'rows': rows if rows is not None and rows >= 0 else None,
+            'params': fingerprint(params),
+            'error': error
+        }
+        if slow:
+            with self._lock:
+                self._slow.append(entry)
+            print(f"🐢 Requête lente {name}: {entry['duration_ms']} ms, {entry['rows']} ligne(s), "
+                  f"paramètres {entry['params']}{f', erreur {error}' if error else ''}")
+        if statistics is not None:
+            with self._lock:
+                self._profiles.append(dict(entry, statistics=statistics))
+
+    def slow_queries(self, limit=None, name=None):
+        """Requêtes lentes, la plus récente en premier"""
+        with self._lock:
+            entries = [e for e in reversed(self._slow) if name is None or e['query'] == name]
+        return entries[:limit] if limit else entries
+
+    def profiles(self, limit=None, name=None):
+        with self._lock:
+            entries = [e for e in reversed(self._profiles) if name is None or e['query'] == name]
+        return entries[:limit] if limit else entries
+
+    def summary(self):
+        """Cumul par nom de requête, la plus coûteuse (durée totale) en premier"""
+        with self._lock:
+            items = [(name, list(totals)) for name, totals in self._by_name.items()]
+        result = [
+            {
+                'query': name,
+                'executions': count,
+                'slow': slow,
+                'errors': errors,
+                'total_ms': round(total * 1000.0, 1),
+                'avg_ms': round(total * 1000.0 / count, 2) if count else 0,
+                'max_ms': round(maximum * 1000.0, 1)
+            }
+            for name, (count, slow, errors, total, maximum) in items
+        ]
+        result.sort(key=lambda item: -item['total_ms'])
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._slow.clear()
+            self._profiles.clear()
+            self._by_name = {}
+
+    def config(self):
+        return {
+            'slow_threshold': self.slow_threshold,
+            'profile_sample_rate': self.profile_sample_rate,
+            'profile_queries': sorted(self.profile_queries) if self.profile_queries is not None else None,
+            'max_entries': self._slow.maxlen,
+            'max_profiles': self._profiles.maxlen
+        }
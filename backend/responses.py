@@ -0,0 +1,97 @@
+# Format colonnaire et compression des réponses volumineuses
+#
+# Les tablettes sont sur un Wi-Fi d'atelier faible. Sur demande
+# (?format=columnar ou Accept: application/vnd.sedi.columnar+json), les listes
+# sont renvoyées sous la forme {"columns": [...], "rows": [[...], ...]} : les
+# noms de champs ne sont transmis qu'une fois. Le format historique (liste de
+# dictionnaires) reste celui par défaut. Les réponses au-delà d'un seuil sont
+# compressées (gzip ou deflate) si le client l'accepte.
+import gzip
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.sedi.columnar+json'
+
+
+def wants_columnar(request):
+    """Format colonnaire demandé par paramètre de requête ou en-tête Accept"""
+    if request.args.get('format') == 'columnar':
+        return True
+    return COLUMNAR_MEDIA_TYPE in request.headers.get('Accept', '')
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def columnar(columns, rows, date_columns=()):
+    """Table colonnaire à partir de lignes (tuples / pyodbc.Row)
+
+    Conversion en une passe par colonne (dates en ISO uniquement pour les
+    colonnes concernées) au lieu d'un dictionnaire construit par ligne.
+    """
+    if not rows:
+        return {'columns': list(columns), 'rows': []}
+    data = list(zip(*rows))
+    # orjson sérialise lui-même les datetime au format ISO
+    if orjson is None:
+        for index in date_columns:
+            data[index] = list(map(_iso, data[index]))
+    return {'columns': list(columns), 'rows': list(zip(*data))}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Type non sérialisable: {type(value).__name__}')
+
+
+def dumps(payload):
+    """JSON en octets, via orjson s'il est installé"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def columnar_response(payload, status=200):
+    """Réponse JSON colonnaire (la compression est appliquée par compress_response)"""
+    response = Response(dumps(payload), status=status, mimetype=COLUMNAR_MEDIA_TYPE)
+    response.vary.add('Accept')
+    return response
+
+
+def compress_response(response, request, min_size=1024, level=5):
+    """Compresse en gzip / deflate une réponse au-delà de min_size octets (hook after_request)"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if 'gzip' in accepted:
+        encoding = 'gzip'
+    elif 'deflate' in accepted:
+        encoding = 'deflate'
+    else:
+        return response
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+    if encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=level)
+    else:
+        body = zlib.compress(body, level)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,430 @@
+# Sessions de travail des opérateurs (ABSESSIONS_OPERATEURS)
+#
+# Machine à états côté serveur : ACTIVE -> PAUSE -> ACTIVE ... -> TERMINE.
+# Un opérateur a au plus une session ACTIVE ; démarrer ou reprendre un autre
+# lancement met la session active en pause (comme la tablette, qui garde un
+# LT en pause pendant qu'un autre est en cours). Les durées sont calculées
+# avec l'horloge du serveur, pauses déduites : le chronomètre de la tablette
+# n'est plus la référence.
+#
+# Les sessions ouvertes sont gardées en mémoire, indexées par opérateur :
+# "qui travaille sur quoi" est une lecture de dictionnaire. Chaque transition
+# est écrite en base avant d'être appliquée en mémoire ; le registre est
+# reconstruit depuis la base au démarrage puis réconcilié périodiquement.
+# Avec plusieurs workers, les sessions de l'opérateur sont relues avant
+# chaque transition (une requête indexée) et les mises à jour vérifient le
+# statut attendu : un conflit est signalé plutôt qu'écrasé.
+import threading
+import time
+from datetime import datetime
+
+ACTIVE = 'ACTIVE'
+PAUSED = 'PAUSE'
+CLOSED = 'TERMINE'
+OPEN_STATES = (ACTIVE, PAUSED)
+
+
+class SessionError(ValueError):
+    """Transition impossible dans l'état courant (aucune session active...)"""
+
+
+class SessionConflict(SessionError):
+    """La session a été modifiée entre-temps par un autre processus"""
+
+
+def _normalize(value):
+    return str(value).strip() if value is not None else ''
+
+
+class WorkSession:
+    """Session de travail d'un opérateur sur un lancement / phase"""
+
+    __slots__ = ('no_enreg', 'ident', 'code_lancement', 'phase', 'code_rubrique', 'statut',
+                 'date_debut', 'date_pause', 'duree_pause', 'date_fin')
+
+    def __init__(self, no_enreg, ident, code_lancement, phase, code_rubrique, statut,
+                 date_debut, date_pause=None, duree_pause=0, date_fin=None):
+        self.no_enreg = no_enreg
+        self.ident = ident
+        self.code_lancement = code_lancement
+        self.phase = phase
+        self.code_rubrique = code_rubrique
+        self.statut = statut
+        self.date_debut = date_debut
+        self.date_pause = date_pause        # Début de la pause en cours
+        self.duree_pause = duree_pause or 0 # Secondes de pause terminées
+        self.date_fin = date_fin
+
+    def copy(self):
+        return WorkSession(*(getattr(self, name) for name in self.__slots__))
+
+    def matches(self, code_lancement=None, phase=None):
+        if code_lancement and _normalize(code_lancement) != _normalize(self.code_lancement):
+            return False
+        return not phase or _normalize(phase) == _normalize(self.phase)
+
+    def pause_seconds(self, now):
+        current = (now - self.date_pause).total_seconds() if self.date_pause is not None else 0
+        return self.duree_pause + max(0, int(current))
+
+    def worked_seconds(self, now=None):
+        """Temps de travail effectif (pauses déduites) à l'instant now ou à la fin"""
+        end = self.date_fin or now or datetime.now()
+        return max(0, int((end - self.date_debut).total_seconds()) - self.pause_seconds(end))
+
+    def to_dict(self, now=None):
+        now = now or datetime.now()
+        worked = self.worked_seconds(now)
+        return {
+            'sessionId': self.no_enreg,
+            'operateurId': self.ident,
+            'codeLancement': self.code_lancement,
+            'phase': self.phase,
+            'codeRubrique': self.code_rubrique,
+            'statut': self.statut,
+            'dateDebut': self.date_debut.isoformat() if self.date_debut else None,
+            'datePause': self.date_pause.isoformat() if self.date_pause else None,
+            'dateFin': self.date_fin.isoformat() if self.date_fin else None,
+            'dureeSecondes': worked,
+            'dureePauseSecondes': self.pause_seconds(self.date_fin or now),
+            'tempsMinutes': worked // 60,
+            'tempsSecondes': worked % 60
+        }
+
+
+class SessionRegistry:
+    """Sessions ouvertes (ACTIVE / PAUSE) par opérateur, persistées à chaque transition
+
+    load_open(ident=None) retourne les lignes (NoEnreg, Ident, DateDebut,
+    CodeLanctImprod, Phase, CodeRubrique, Statut, DatePause, DureePause) des
+    sessions ouvertes (toutes, ou d'un opérateur), ou None sans base (mode
+    simulation : la mémoire fait foi) ; insert(session) retourne
+    le NoEnreg créé ; update(session, statut_attendu) retourne False si la
+    ligne n'était plus dans le statut attendu.
+    """
+
+    def __init__(self, load_open, insert, update, reconcile_interval=60, reload_on_write=True):
+        self._load_open = load_open
+        self._insert = insert
+        self._update = update
+        self.reconcile_interval = reconcile_interval
+        self.reload_on_write = reload_on_write
+        self._by_operator = {}          # ident -> [WorkSession] ouvertes, la plus récente en dernier
+        self._by_id = {}                # NoEnreg -> WorkSession
+        self._touched = {}              # ident -> time.monotonic() de la dernière transition
+        self._lock = threading.Lock()
+        self._operator_locks = {}
+        self._loaded_at = None
+        self._thread = None
+        self._stats = {'transitions': 0, 'conflicts': 0, 'rebuilds': 0, 'rebuild_errors': 0,
+                       'last_error': None}
+
+    # ---- Lecture (mémoire) ----
+
+    def operator(self, ident):
+        """Sessions ouvertes d'un opérateur, la plus récente en dernier"""
+        with self._lock:
+            return [s.copy() for s in self._by_operator.get(_normalize(ident), ())]
+
+    def current(self, ident):
+        """Session ACTIVE de l'opérateur, ou None"""
+        with self._lock:
+            for session in self._by_operator.get(_normalize(ident), ()):
+                if session.statut == ACTIVE:
+                    return session.copy()
+        return None
+
+    def get(self, no_enreg):
+        with self._lock:
+            session = self._by_id.get(no_enreg)
+            return session.copy() if session is not None else None
+
+    def all(self):
+        """{ident: [sessions ouvertes]}"""
+        with self._lock:
+            return {ident: [s.copy() for s in sessions] for ident, sessions in self._by_operator.items()}
+
+    def counts(self):
+        with self._lock:
+            counts = {ACTIVE: 0, PAUSED: 0}
+            for session in self._by_id.values():
+                counts[session.statut] += 1
+        return counts
+
+    # ---- Transitions ----
+
+    def begin(self, ident, code_lancement, phase, code_rubrique='', now=None, reload=True):
+        """Démarre (ou reprend) une session ; la session active d'un autre lancement passe en pause
+
+        Retourne (session, session mise en pause ou None). Démarrer un
+        lancement déjà actif ne crée rien (renvoi de la tablette). reload=False :
+        sessions de l'opérateur déjà relues pendant la même requête.
+        """
+        ident = _normalize(ident)
+
+        def apply(sessions, now):
+            existing = self._find(sessions, code_lancement, phase)
+            if existing is not None and existing.statut == ACTIVE:
+                return existing, None
+            paused = self._pause_active(sessions, now, keep=existing)
+            if existing is not None:
+                return self._resume(existing, now), paused
+            session = WorkSession(None, ident, code_lancement, phase, code_rubrique or '', ACTIVE, now)
+            session.no_enreg = self._insert(session)
+            self._put(session)
+            return session, paused
+
+        return self._transition(ident, now, apply, reload)
+
+    def pause(self, ident, code_lancement=None, now=None):
+        """Met en pause la session active (du lancement indiqué si précisé)"""
+        ident = _normalize(ident)
+
+        def apply(sessions, now):
+            for session in sessions:
+                if session.statut == ACTIVE and session.matches(code_lancement):
+                    return self._set(session, now, statut=PAUSED, date_pause=now)
+            raise SessionError('Aucune session active à mettre en pause')
+
+        return self._transition(ident, now, apply)
+
+    def resume(self, ident, code_lancement=None, phase=None, now=None):
+        """Reprend une session en pause (la plus récente si aucun lancement n'est précisé)
+
+        Retourne (session, session mise en pause ou None).
+        """
+        ident = _normalize(ident)
+
+        def apply(sessions, now):
+            candidates = [s for s in sessions if s.statut == PAUSED and s.matches(code_lancement, phase)]
+            if not candidates:
+                active = [s for s in sessions if s.statut == ACTIVE and s.matches(code_lancement, phase)]
+                if active and code_lancement:
+                    return active[-1], None
+                raise SessionError('Aucune session en pause à reprendre')
+            session = candidates[-1]
+            paused = self._pause_active(sessions, now, keep=session)
+            return self._resume(session, now), paused
+
+        return self._transition(ident, now, apply)
+
+    def finish(self, ident, code_lancement=None, phase=None, now=None, reload=True):
+        """Termine la session du lancement (ou la session active) ; retourne la session fermée ou None
+
+        reload=False : sessions de l'opérateur déjà relues pendant la même
+        requête (preview_finish juste avant).
+        """
+        ident = _normalize(ident)
+
+        def apply(sessions, now):
+            session = self._find_to_finish(sessions, code_lancement, phase)
+            if session is None:
+                return None
+            return self._close(session, now)
+
+        return self._transition(ident, now, apply, reload)
+
+    def preview_finish(self, ident, code_lancement=None, phase=None, now=None):
+        """Session que finish() fermerait, telle qu'elle serait à now, sans rien écrire (None si aucune)
+
+        Permet d'enregistrer d'abord la ligne d'historique avec cette durée,
+        puis de fermer la session avec le même now une fois l'écriture réussie.
+        """
+        ident = _normalize(ident)
+        now = now or datetime.now().replace(microsecond=0)
+        with self._operator_lock(ident):
+            if self.reload_on_write:
+                self._reload_operator(ident)
+            with self._lock:
+                sessions = [s.copy() for s in self._by_operator.get(ident, ())]
+        session = self._find_to_finish(sessions, code_lancement, phase)
+        if session is None:
+            return None
+        closed = session.copy()
+        closed.duree_pause = session.pause_seconds(now)
+        closed.statut, closed.date_pause, closed.date_fin = CLOSED, None, now
+        return closed
+
+    def finish_session(self, no_enreg, now=None):
+        """Termine une session par son identifiant (administration)"""
+        session = self.get(no_enreg)
+        if session is None:
+            raise SessionError(f'Session {no_enreg} introuvable ou déjà terminée')
+
+        def apply(sessions, now):
+            for candidate in sessions:
+                if candidate.no_enreg == no_enreg:
+                    return self._close(candidate, now)
+            raise SessionError(f'Session {no_enreg} introuvable ou déjà terminée')
+
+        return self._transition(session.ident, now, apply)
+
+    def _transition(self, ident, now, apply, reload=True):
+        now = now or datetime.now().replace(microsecond=0)
+        with self._operator_lock(ident):
+            if reload and self.reload_on_write:
+                self._reload_operator(ident)
+            with self._lock:
+                sessions = [s.copy() for s in self._by_operator.get(ident, ())]
+            try:
+                result = apply(sessions, now)
+            except SessionConflict:
+                with self._lock:
+                    self._stats['conflicts'] += 1
+                self._reload_operator(ident)
+                raise
+            with self._lock:
+                self._stats['transitions'] += 1
+                self._touched[ident] = time.monotonic()
+            return result
+
+    @staticmethod
+    def _find(sessions, code_lancement, phase):
+        if not code_lancement:
+            return None
+        matching = [s for s in sessions if s.matches(code_lancement, phase)]
+        return matching[-1] if matching else None
+
+    @classmethod
+    def _find_to_finish(cls, sessions, code_lancement, phase):
+        session = cls._find(sessions, code_lancement, phase)
+        if session is None and not code_lancement:
+            session = next((s for s in reversed(sessions) if s.statut == ACTIVE), None)
+        return session
+
+    def _pause_active(self, sessions, now, keep=None):
+        for session in sessions:
+            if session.statut == ACTIVE and session is not keep:
+                return self._set(session, now, statut=PAUSED, date_pause=now)
+        return None
+
+    def _resume(self, session, now):
+        if session.statut != PAUSED:
+            return session
+        return self._set(session, now, statut=ACTIVE, date_pause=None,
+                         duree_pause=session.pause_seconds(now))
+
+    def _close(self, session, now):
+        return self._set(session, now, statut=CLOSED, date_pause=None,
+                         duree_pause=session.pause_seconds(now), date_fin=now)
+
+    def _set(self, session, now, **changes):
+        """Écrit la transition en base (statut attendu vérifié) puis l'applique en mémoire"""
+        updated = session.copy()
+        for name, value in changes.items():
+            setattr(updated, name, value)
+        if not self._update(updated, session.statut):
+            raise SessionConflict('Session modifiée par un autre poste, veuillez réessayer')
+        if updated.statut == CLOSED:
+            self._drop(updated)
+        else:
+            self._put(updated)
+        session.statut = updated.statut         # Pour la suite de la même transition
+        return updated
+
+    def _put(self, session):
+        with self._lock:
+            sessions = [s for s in self._by_operator.get(session.ident, ()) if s.no_enreg != session.no_enreg]
+            sessions.append(session)
+            sessions.sort(key=lambda s: (s.date_debut, s.no_enreg or 0))
+            self._by_operator[session.ident] = sessions
+            self._by_id[session.no_enreg] = session
+
+    def _drop(self, session):
+        with self._lock:
+            self._by_id.pop(session.no_enreg, None)
+            sessions = [s for s in self._by_operator.get(session.ident, ()) if s.no_enreg != session.no_enreg]
+            if sessions:
+                self._by_operator[session.ident] = sessions
+            else:
+                self._by_operator.pop(session.ident, None)
+
+    def _operator_lock(self, ident):
+        with self._lock:
+            lock = self._operator_locks.get(ident)
+            if lock is None:
+                lock = self._operator_locks[ident] = threading.Lock()
+            return lock
+
+    # ---- Chargement depuis la base ----
+
+    @staticmethod
+    def _from_row(row):
+        no_enreg, ident, date_debut, code, phase, rubrique, statut, date_pause, duree_pause = row
+        return WorkSession(no_enreg, _normalize(ident), code, phase, rubrique, _normalize(statut),
+                           date_debut, date_pause, duree_pause or 0)
+
+    def _reload_operator(self, ident):
+        rows = self._load_open(ident)
+        if rows is None:
+            return
+        sessions = [self._from_row(row) for row in rows]
+        with self._lock:
+            for session in self._by_operator.pop(ident, ()):
+                self._by_id.pop(session.no_enreg, None)
+            if sessions:
+                sessions.sort(key=lambda s: (s.date_debut, s.no_enreg))
+                self._by_operator[ident] = sessions
+                for session in sessions:
+                    self._by_id[session.no_enreg] = session
+
+    def rebuild(self):
+        """Recharge toutes les sessions ouvertes depuis la base ; conserve le registre en cas d'échec"""
+        started = time.monotonic()
+        try:
+            rows = self._load_open(None)
+        except Exception as e:
+            with self._lock:
+                self._stats['rebuild_errors'] += 1
+                self._stats['last_error'] = str(e)
+            print(f"⚠️ Reconstruction des sessions actives impossible: {e}")
+            return False
+        if rows is None:
+            with self._lock:
+                self._loaded_at = time.monotonic()
+            return True
+        by_operator = {}
+        for row in rows:
+            session = self._from_row(row)
+            by_operator.setdefault(session.ident, []).append(session)
+        with self._lock:
+            # Les opérateurs modifiés pendant la lecture gardent leur état en mémoire (plus récent)
+            for ident, touched in self._touched.items():
+                if touched >= started:
+                    by_operator[ident] = self._by_operator.get(ident, [])
+            by_operator = {ident: sessions for ident, sessions in by_operator.items() if sessions}
+            for sessions in by_operator.values():
+                sessions.sort(key=lambda s: (s.date_debut, s.no_enreg))
+            self._by_operator = by_operator
+            self._by_id = {s.no_enreg: s for sessions in by_operator.values() for s in sessions}
+            self._touched = {ident: t for ident, t in self._touched.items() if t >= started}
+            self._loaded_at = time.monotonic()
+            self._stats['rebuilds'] += 1
+            self._stats['last_error'] = None
+        return True
+
+    def start(self):
+        """Réconciliation périodique avec la base (écritures des autres workers), une seule fois"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='session-registry', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            self.rebuild()
+
+    def stats(self):
+        counts = self.counts()
+        with self._lock:
+            stats = dict(self._stats)
+            stats['operators'] = len(self._by_operator)
+            stats['age_seconds'] = (
+                round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None
+            )
+        stats['active'] = counts[ACTIVE]
+        stats['paused'] = counts[PAUSED]
+        stats['reconcile_interval'] = self.reconcile_interval
+        return stats
@@ -0,0 +1,254 @@
+# Stockage en mémoire du mode simulation
+#
+# Utilisé pour les démonstrations et comme mode dégradé quand SERVEURERP est
+# inaccessible : il doit tenir une journée complète d'atelier. Chaque table
+# garde ses enregistrements (__slots__) dans l'ordre d'insertion, un index par
+# opérateur trié sur (DateTravail, NoEnreg) et une taille maximale au-delà de
+# laquelle les plus anciens sont évincés.
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+TABLES = ('temps_travail', 'historique', 'sessions')
+
+
+def date_key(value):
+    """Clé de tri comparable pour une date naïve ou avec fuseau (ramenée en UTC)"""
+    if value is None:
+        return datetime.min
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class SimRecord:
+    """Un enregistrement simulé (mêmes colonnes que les tables de l'application)"""
+
+    __slots__ = (
+        'no_enreg', 'ident', 'date_travail', 'code_lanct_improd', 'phase',
+        'code_rubrique', 'var_num_util8', 'var_num_util9', 'statut',
+        'date_creation', '_dict'
+    )
+
+    def __init__(self, no_enreg, ident, date_travail, code_lanct_improd, phase,
+                 code_rubrique='', var_num_util8=0, var_num_util9=0, statut='',
+                 date_creation=None):
+        self.no_enreg = no_enreg
+        self.ident = ident
+        self.date_travail = date_travail
+        self.code_lanct_improd = code_lanct_improd
+        self.phase = phase
+        self.code_rubrique = code_rubrique
+        self.var_num_util8 = var_num_util8
+        self.var_num_util9 = var_num_util9
+        self.statut = statut
+        self.date_creation = date_creation or datetime.now()
+        self._dict = None
+
+    @property
+    def key(self):
+        return (date_key(self.date_travail), self.no_enreg)
+
+    def to_dict(self):
+        """Format de l'API (calculé une seule fois : les enregistrements sont immuables)"""
+        if self._dict is None:
+            self._dict = {
+                'noEnreg': self.no_enreg,
+                'ident': self.ident,
+                'dateTravail': self.date_travail.isoformat() if self.date_travail else None,
+                'codeLanctImprod': self.code_lanct_improd,
+                'phase': self.phase,
+                'codeRubrique': self.code_rubrique,
+                'varNumUtil8': self.var_num_util8,
+                'varNumUtil9': self.var_num_util9,
+                'statut': self.statut,
+                'dateCreation': self.date_creation.isoformat() if self.date_creation else None
+            }
+        return self._dict
+
+    def to_snapshot(self):
+        return [
+            self.no_enreg, self.ident,
+            self.date_travail.isoformat() if self.date_travail else None,
+            self.code_lanct_improd, self.phase, self.code_rubrique,
+            self.var_num_util8, self.var_num_util9, self.statut,
+            self.date_creation.isoformat() if self.date_creation else None
+        ]
+
+    @classmethod
+    def from_snapshot(cls, values):
+        values = list(values)
+        for index in (2, 9):
+            if values[index]:
+                values[index] = datetime.fromisoformat(values[index])
+        return cls(*values)
+
+
+class _OperatorIndex:
+    """Enregistrements d'un opérateur triés par (DateTravail, NoEnreg)"""
+
+    __slots__ = ('keys', 'records')
+
+    def __init__(self):
+        self.keys = []
+        self.records = []
+
+    def add(self, record):
+        key = record.key
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.records.insert(position, record)
+
+    def remove(self, record):
+        key = record.key
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.records[position] is record:
+            del self.keys[position]
+            del self.records[position]
+
+    def range_desc(self, date_from=None, date_to=None, before=None, limit=None):
+        """Enregistrements du plus récent au plus ancien, en O(log n + k)
+
+        date_from / date_to bornent DateTravail (bornes incluses / exclue) ;
+        before est une clé (DateTravail, NoEnreg) exclusive pour la pagination.
+        """
+        high = len(self.keys)
+        if date_to is not None:
+            high = bisect.bisect_left(self.keys, (date_key(date_to), -1))
+        if before is not None:
+            high = min(high, bisect.bisect_left(self.keys, before))
+        low = 0
+        if date_from is not None:
+            low = bisect.bisect_left(self.keys, (date_key(date_from), -1))
+        if limit is not None:
+            low = max(low, high - limit)
+        return self.records[low:high][::-1]
+
+
+class SimulationTable:
+    """Une table simulée : ordre d'insertion, index par opérateur, rétention bornée"""
+
+    def __init__(self, max_records):
+        self.max_records = max_records
+        self._records = OrderedDict()     # NoEnreg -> SimRecord (ordre d'insertion)
+        self._by_operator = {}
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        self._records[record.no_enreg] = record
+        index = self._by_operator.get(record.ident)
+        if index is None:
+            index = self._by_operator[record.ident] = _OperatorIndex()
+        index.add(record)
+        while len(self._records) > self.max_records:
+            _, oldest = self._records.popitem(last=False)
+            self._by_operator[oldest.ident].remove(oldest)
+            if not self._by_operator[oldest.ident].records:
+                del self._by_operator[oldest.ident]
+            self.evicted += 1
+
+    def by_operator(self, ident, **kwargs):
+        index = self._by_operator.get(ident)
+        return index.range_desc(**kwargs) if index else []
+
+    def records(self):
+        return list(self._records.values())
+
+
+class SimulationStore:
+    """Données du mode simulation, indexées et bornées, avec instantané disque optionnel"""
+
+    def __init__(self, max_records=100000, snapshot_path=None):
+        self.snapshot_path = snapshot_path
+        self._tables = {name: SimulationTable(max_records) for name in TABLES}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._dirty = False
+
+    def add(self, table, **fields):
+        """Ajoute un enregistrement avec un NoEnreg unique et croissant"""
+        with self._lock:
+            record = SimRecord(next(self._ids), **fields)
+            self._tables[table].add(record)
+            self._dirty = True
+            return record
+
+    def by_operator(self, table, ident, date_from=None, date_to=None, before=None, limit=None):
+        """Enregistrements d'un opérateur, du plus récent au plus ancien"""
+        with self._lock:
+            return self._tables[table].by_operator(
+                ident, date_from=date_from, date_to=date_to, before=before, limit=limit
+            )
+
+    def records(self, table):
+        with self._lock:
+            return self._tables[table].records()
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {'records': len(table), 'evicted': table.evicted, 'max_records': table.max_records}
+                for name, table in self._tables.items()
+            }
+
+    # ---- Instantanés disque ----
+
+    def save(self, path=None):
+        """Écrit un instantané JSON (écriture atomique) ; retourne False si rien à écrire"""
+        path = path or self.snapshot_path
+        if not path:
+            return False
+        with self._lock:
+            if not self._dirty and os.path.exists(path):
+                return False
+            snapshot = {name: [r.to_snapshot() for r in table.records()] for name, table in self._tables.items()}
+            self._dirty = False
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+        return True
+
+    def load(self, path=None):
+        """Recharge un instantané ; le générateur de NoEnreg repart après le plus grand"""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        loaded = 0
+        with self._lock:
+            last_id = 0
+            for name, rows in snapshot.items():
+                if name not in self._tables:
+                    continue
+                for values in rows:
+                    record = SimRecord.from_snapshot(values)
+                    self._tables[name].add(record)
+                    last_id = max(last_id, record.no_enreg)
+                    loaded += 1
+            self._ids = itertools.count(last_id + 1)
+        return loaded
+
+    def start_snapshots(self, interval):
+        """Sauvegarde périodique en arrière-plan"""
+        if not self.snapshot_path or interval <= 0:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"⚠️ Instantané de simulation impossible: {e}")
+
+        threading.Thread(target=loop, name='simulation-snapshot', daemon=True).start()
@@ -0,0 +1,132 @@
+# Démarrage du backend : phases chronométrées, sondes en parallèle, attente active
+#
+# bootstrap() et warm_up() déclarent leurs étapes comme phases ; les étapes
+# indépendantes (sonde des bases, création de SEDI_APP, pré-chauffage des
+# pools, annuaire) tournent en parallèle. Aucune pause fixe : une condition
+# (base ONLINE après CREATE DATABASE...) est sondée avec un intervalle
+# croissant et un délai maximal. Le rapport par phase est journalisé à la fin
+# et exposé par /api/health/details et /metrics pour suivre le temps de
+# démarrage à froid d'une version à l'autre.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+PENDING = 'en_attente'
+RUNNING = 'en_cours'
+READY = 'pret'
+FAILED = 'echec'
+
+
+def poll_until(check, timeout, interval=0.05, max_interval=1.0):
+    """Appelle check() jusqu'à un résultat vrai, intervalle doublé à chaque essai ; dernier résultat sinon"""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        remaining = deadline - time.monotonic()
+        if result or remaining <= 0:
+            return result
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+class StartupTimer:
+    """Phases du démarrage d'un processus (durées, succès) et état global"""
+
+    def __init__(self):
+        self.state = PENDING
+        self._phases = []               # [{'phase', 'debut_ms', 'duree_ms', 'ok', 'erreur'}]
+        self._started = None            # time.monotonic() du début
+        self._started_at = None
+        self._total = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def running(self):
+        return self.state == RUNNING
+
+    def begin(self):
+        """Début du démarrage (idempotent)"""
+        with self._lock:
+            if self._started is None:
+                self._started = time.monotonic()
+                self._started_at = datetime.now().isoformat(timespec='seconds')
+                self.state = RUNNING
+                self._done.clear()
+
+    def _record(self, name, started, ok, error=None):
+        with self._lock:
+            self._phases.append({
+                'phase': name,
+                'debut_ms': round((started - self._started) * 1000, 1),
+                'duree_ms': round((time.monotonic() - started) * 1000, 1),
+                'ok': ok,
+                'erreur': error
+            })
+
+    @contextmanager
+    def phase(self, name):
+        """Chronomètre un bloc ; une exception est enregistrée puis propagée"""
+        self.begin()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._record(name, started, False, str(e))
+            raise
+        self._record(name, started, True)
+
+    def _timed(self, name, task):
+        started = time.monotonic()
+        try:
+            result = task()
+        except Exception as e:
+            self._record(name, started, False, str(e))
+            print(f"⚠️ Démarrage - {name}: {e}")
+            return None
+        self._record(name, started, result is not False)
+        return result
+
+    def parallel(self, tasks):
+        """{nom: callable} exécutés en parallèle, chacun chronométré ; {nom: résultat (None si exception)}"""
+        self.begin()
+        if not tasks:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='startup') as pool:
+            futures = {name: pool.submit(self._timed, name, task) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def finish(self, ok=True):
+        with self._lock:
+            if self._started is None:
+                return
+            self._total = round((time.monotonic() - self._started) * 1000, 1)
+            self.state = READY if ok else FAILED
+        self._done.set()
+        self.print_report()
+
+    def wait(self, timeout=None):
+        """Attend la fin du démarrage ; True s'il est terminé"""
+        if self.state == PENDING:
+            return True
+        return self._done.wait(timeout)
+
+    def report(self):
+        with self._lock:
+            return {
+                'etat': self.state,
+                'debut': self._started_at,
+                'duree_ms': self._total if self._total is not None else (
+                    round((time.monotonic() - self._started) * 1000, 1) if self._started is not None else None
+                ),
+                'phases': [dict(phase) for phase in self._phases]
+            }
+
+    def print_report(self):
+        report = self.report()
+        print(f"⏱️ Démarrage {report['etat']} en {report['duree_ms']} ms")
+        for phase in sorted(report['phases'], key=lambda p: p['debut_ms']):
+            mark = '✅' if phase['ok'] else '⚠️'
+            print(f"   {mark} {phase['phase']:<32} +{phase['debut_ms']:>8} ms  {phase['duree_ms']:>8} ms")
@@ -0,0 +1,168 @@
+# Statistiques des tables de l'application pour /api/database-stats
+#
+# Par défaut les volumes viennent des métadonnées SQL Server
+# (sys.dm_db_partition_stats, ou sys.partitions sans VIEW DATABASE STATE) :
+# aucune table n'est parcourue. Le COUNT(*) exact reste disponible sur demande.
+# Les résultats sont mis en cache pendant refresh_interval secondes.
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from queries import run_query
+
+PAGE_SIZE_KB = 8
+
+METADATA_QUERY = """
+SELECT ps.object_id,
+       SUM(CASE WHEN ps.index_id IN (0, 1) THEN ps.row_count ELSE 0 END),
+       SUM(ps.used_page_count),
+       SUM(ps.reserved_page_count)
+FROM sys.dm_db_partition_stats ps
+WHERE ps.object_id IN ({placeholders})
+GROUP BY ps.object_id
+"""
+
+# Repli sans permission VIEW DATABASE STATE
+PARTITIONS_QUERY = """
+SELECT p.object_id,
+       SUM(CASE WHEN p.index_id IN (0, 1) THEN p.rows ELSE 0 END),
+       SUM(au.used_pages),
+       SUM(au.total_pages)
+FROM sys.partitions p
+JOIN sys.allocation_units au ON au.container_id = p.partition_id
+WHERE p.object_id IN ({placeholders})
+GROUP BY p.object_id
+"""
+
+
+class TableStatsCollector:
+    """Volumétrie des tables, calculée à bas coût et mise en cache"""
+
+    def __init__(self, get_connection, tables, refresh_interval=60, sample_history=288):
+        self._get_connection = get_connection
+        self._tables = tables                     # {clé: nom complet}
+        self.refresh_interval = refresh_interval
+        self._cache = {}                          # exact (bool) -> (monotonic, résultat)
+        self._samples = {key: deque(maxlen=sample_history) for key in tables}
+        self._lock = threading.Lock()
+
+    def get(self, exact=False, force=False):
+        """Statistiques en cache, recalculées si plus vieilles que refresh_interval"""
+        with self._lock:
+            cached = self._cache.get(exact)
+            if cached and not force and time.monotonic() - cached[0] < self.refresh_interval:
+                return cached[1]
+            result = self._collect(exact)
+            self._cache[exact] = (time.monotonic(), result)
+            return result
+
+    def _collect(self, exact):
+        conn = self._get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            keys = list(self._tables)
+            object_ids = self._object_ids(cursor, keys)
+            if exact:
+                volumes = self._exact_counts(cursor, keys)
+                source = 'COUNT(*)'
+            else:
+                volumes, source = self._metadata_volumes(cursor, keys, object_ids)
+
+            now = datetime.now()
+            tables = {}
+            for key in keys:
+                table = self._tables[key]
+                if object_ids.get(key) is None:
+                    tables[key] = {'erreur': 'Table absente'}
+                    continue
+                rows, used_pages, reserved_pages = volumes.get(key, (0, None, None))
+                oldest, newest = self._creation_bounds(cursor, table)
+                tables[key] = {
+                    'lignes': rows,
+                    'pages_utilisees': used_pages,
+                    'pages_reservees': reserved_pages,
+                    'taille_ko': used_pages * PAGE_SIZE_KB if used_pages is not None else None,
+                    'derniere_creation': newest.isoformat() if newest else None,
+                    'premiere_creation': oldest.isoformat() if oldest else None,
+                    'croissance_jour_moyenne': self._average_growth(rows, oldest, now),
+                    'croissance_jour_recente': self._recent_growth(key, rows)
+                }
+            return {
+                'mode': 'exact' if exact else 'metadata',
+                'source': source,
+                'generated_at': now.isoformat(),
+                'tables': tables
+            }
+        finally:
+            conn.close()
+
+    def _object_ids(self, cursor, keys):
+        row = run_query(
+            cursor, 'stats_objets',
+            "SELECT " + ", ".join("OBJECT_ID(?, N'U')" for _ in keys),
+            [self._tables[key] for key in keys], fetch='one'
+        )
+        return dict(zip(keys, row))
+
+    def _metadata_volumes(self, cursor, keys, object_ids):
+        present = {object_id: key for key, object_id in object_ids.items() if object_id is not None}
+        if not present:
+            return {}, 'sys.dm_db_partition_stats'
+        placeholders = ', '.join('?' * len(present))
+        params = list(present)
+        try:
+            result = run_query(cursor, 'stats_metadata', METADATA_QUERY.format(placeholders=placeholders),
+                               params, fetch='all')
+            source = 'sys.dm_db_partition_stats'
+        except Exception:
+            result = run_query(cursor, 'stats_partitions', PARTITIONS_QUERY.format(placeholders=placeholders),
+                               params, fetch='all')
+            source = 'sys.partitions'
+        volumes = {}
+        for object_id, rows, used_pages, reserved_pages in result:
+            volumes[present[object_id]] = (rows or 0, used_pages, reserved_pages)
+        return volumes, source
+
+    def _exact_counts(self, cursor, keys):
+        volumes = {}
+        for key in keys:
+            try:
+                count = run_query(cursor, 'stats_count_exact', f"SELECT COUNT(*) FROM {self._tables[key]}",
+                                  fetch='one')[0]
+                volumes[key] = (count, None, None)
+            except Exception:
+                pass
+        return volumes
+
+    def _creation_bounds(self, cursor, table):
+        """Première et dernière DateCreation via la clé primaire (deux seeks, pas de scan)"""
+        try:
+            row = run_query(cursor, 'stats_bornes_creation', f"""
+            SELECT
+                (SELECT DateCreation FROM {table} WHERE NoEnreg = (SELECT MIN(NoEnreg) FROM {table})),
+                (SELECT DateCreation FROM {table} WHERE NoEnreg = (SELECT MAX(NoEnreg) FROM {table}))
+            """, fetch='one')
+            return row[0], row[1]
+        except Exception:
+            return None, None
+
+    @staticmethod
+    def _average_growth(rows, oldest, now):
+        if not rows or not oldest:
+            return None
+        days = (now - oldest).total_seconds() / 86400.0
+        return round(rows / days, 1) if days >= 1 else None
+
+    def _recent_growth(self, key, rows):
+        """Croissance mesurée entre les échantillons successifs de ce processus"""
+        samples = self._samples[key]
+        now = time.monotonic()
+        samples.append((now, rows))
+        first_time, first_rows = samples[0]
+        elapsed = now - first_time
+        if elapsed < 3600:
+            return None
+        return round((rows - first_rows) * 86400.0 / elapsed, 1)
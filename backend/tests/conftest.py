@@ -0,0 +1,31 @@
+# Tests unitaires des composants du backend
+#
+#   cd backend
+#   python -m pytest tests
+#
+# Les modules du backend s'importent à plat (comme dans app.py). Les tests qui
+# ont besoin d'une base utilisent le substitut pyodbc du banc d'essai
+# (bench/sqlite_odbc.py) sur des fichiers SQLite temporaires.
+import os
+import sqlite3
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bench import sqlite_odbc  # noqa: E402
+
+APP_DATABASE = 'SEDI_APP_INDEPENDANTE'
+
+
+@pytest.fixture
+def bench_db(tmp_path, monkeypatch):
+    """Base SEDI_APP_INDEPENDANTE vide ; retourne la fonction connect() du substitut pyodbc"""
+    sqlite3.connect(str(tmp_path / f'{APP_DATABASE}.db')).close()
+    monkeypatch.setenv(sqlite_odbc.DB_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv(sqlite_odbc.CONNECT_DELAY_ENV, '0')
+    monkeypatch.setenv(sqlite_odbc.ROUNDTRIP_DELAY_ENV, '0')
+    return sqlite_odbc.connect
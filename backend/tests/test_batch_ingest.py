@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from batch_ingest import parse_event
+
+
+def _event(**fields):
+    data = {
+        'eventId': 'tab1-0001',
+        'type': 'terminer',
+        'operateurId': 'OP1',
+        'operateurNom': 'Dupont',
+        'codeLancement': 'LT1',
+        'phase': '10',
+        'codeRubrique': 'USIN',
+        'dateTravail': '2026-03-02T08:15:00',
+        'tempsMinutes': 12,
+        'tempsSecondes': 30
+    }
+    data.update(fields)
+    return {key: value for key, value in data.items() if value is not None}
+
+
+def test_finish_event():
+    event = parse_event(_event())
+    assert (event.event_id, event.table_key, event.statut) == ('tab1-0001', 'historique', 'TERMINE')
+    assert (event.ident, event.code_lancement, event.phase) == ('OP1', 'LT1', '10')
+    assert event.date_travail == datetime(2026, 3, 2, 8, 15)
+    assert event.temps == (12, 30)
+    assert event.values[4] == 'USIN'
+
+
+def test_start_event_has_no_duration():
+    event = parse_event(_event(type='demarrer'))
+    assert (event.table_key, event.statut, event.temps) == ('temps_travail', 'EN_COURS', (0, 0))
+
+
+def test_utc_suffix_and_optional_fields():
+    event = parse_event(_event(dateTravail='2026-03-02T07:15:00Z', codeRubrique=None,
+                               tempsMinutes=None, tempsSecondes=None, phase=''))
+    assert event.date_travail == datetime(2026, 3, 2, 7, 15, tzinfo=timezone.utc)
+    assert event.date_travail.utcoffset() == timedelta(0)
+    assert (event.values[4], event.temps, event.phase) == ('', (0, 0), '')
+
+
+@pytest.mark.parametrize('data, message', [
+    ('pas un objet', 'Événement invalide'),
+    (_event(eventId=None), 'Champ requis manquant: eventId'),
+    (_event(eventId=42), 'Champ requis manquant: eventId'),
+    (_event(eventId='x' * 65), 'eventId trop long (max 64 caractères)'),
+    (_event(type='pause'), 'type doit valoir demarrer ou terminer'),
+    (_event(operateurNom=''), 'Champ requis manquant: operateurNom'),
+    (_event(codeLancement=None), 'Champ requis manquant: codeLancement'),
+    (_event(phase=None), 'Champ requis manquant: phase'),
+    (_event(dateTravail='02/03/2026'), 'dateTravail invalide'),
+])
+def test_invalid_events(data, message):
+    with pytest.raises(ValueError) as error:
+        parse_event(data)
+    assert str(error.value) == message
+
+
+def test_event_id_length_is_configurable():
+    assert parse_event(_event(eventId='x' * 65), max_id_length=128).event_id == 'x' * 65
@@ -0,0 +1,140 @@
+import threading
+from datetime import date
+
+from day_rollup import DailyOperatorRollup, format_duration, rollup_launches
+
+
+def _record(ident, code, phase, source, minutes=0, seconds=0):
+    return {'ident': ident, 'codeLanctImprod': code, 'phase': phase, 'source': source,
+            'varNumUtil8': minutes, 'varNumUtil9': seconds}
+
+
+def test_format_duration():
+    assert format_duration(0) == '0h 00min'
+    assert format_duration(3 * 3600 + 7 * 60 + 59) == '3h 07min'
+    assert format_duration(None) == '0h 00min'
+
+
+def test_rollup_launches_statuses_and_totals():
+    records = [
+        _record('OP1', 'LT1', '10', 'D'),
+        _record('OP1', 'LT1', '10', 'T', 10, 30),
+        _record('OP1', 'LT1', '20', 'D'),
+        _record('OP1', 'LT2', '10', 'D'),
+        _record('OP1', 'LT3 ', '10', 'D'),
+        _record('OP1', 'LT3', '10', 'T', 60),
+    ]
+    launches = {launch['codeLancement']: launch for launch in rollup_launches(records)}
+    assert list(launches) == ['LT1', 'LT2', 'LT3']
+
+    assert launches['LT1']['statut'] == 'PARTIELLEMENT TERMINÉ'
+    assert launches['LT1']['tempsTotal'] == 630
+    assert [(p['phase'], p['statut'], p['duree']) for p in launches['LT1']['phases']] == [
+        ('10', 'TERMINÉ', '0h 10min'), ('20', 'EN COURS', 'En cours')
+    ]
+    assert launches['LT2']['statut'] == 'EN COURS'
+    # Codes normalisés (espaces) : démarrage et fin se retrouvent
+    assert launches['LT3']['statut'] == 'TERMINÉ'
+    assert launches['LT3']['tempsTotalFormate'] == '1h 00min'
+
+
+def test_phase_restarted_after_finish_is_running():
+    records = [_record('OP1', 'LT1', '10', 'D'), _record('OP1', 'LT1', '10', 'T', 5),
+               _record('OP1', 'LT1', '10', 'D')]
+    assert rollup_launches(records)[0]['statut'] == 'EN COURS'
+
+
+class _Loader:
+    """loader(jour, idents) sur une liste d'enregistrements modifiable, avec journal des appels"""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+        self.during = None          # Exécuté après la lecture, avant le retour (écriture concurrente)
+
+    def __call__(self, day, idents):
+        assert day == date.today()
+        self.calls.append(idents)
+        rows = [dict(r) for r in self.records if idents is None or r['ident'] in idents]
+        if self.during is not None:
+            during, self.during = self.during, None
+            during()
+        return rows
+
+
+def test_full_load_then_hits():
+    loader = _Loader([_record('OP1', 'LT1', '10', 'D'), _record('OP2', 'LT2', '10', 'D')])
+    rollup = DailyOperatorRollup(loader)
+    assert sorted(rollup.all_operators()) == ['OP1', 'OP2']
+    assert rollup.operator('OP1')[0][0]['codeLancement'] == 'LT1'
+    rollup.all_operators()
+    assert loader.calls == [None]
+    assert rollup.stats()['hits'] == 2
+
+
+def test_invalidate_reloads_only_that_operator():
+    loader = _Loader([_record('OP1', 'LT1', '10', 'D'), _record('OP2', 'LT2', '10', 'D')])
+    rollup = DailyOperatorRollup(loader)
+    rollup.all_operators()
+    loader.records.append(_record('OP1', 'LT1', '10', 'T', 3))
+    rollup.invalidate('OP1')
+    assert rollup.all_operators()['OP1'][0]['statut'] == 'TERMINÉ'
+    assert loader.calls == [None, ['OP1']]
+
+
+def test_unknown_operator_is_loaded_alone():
+    loader = _Loader([_record('OP1', 'LT1', '10', 'D')])
+    rollup = DailyOperatorRollup(loader)
+    assert rollup.operator('OP9') == ([], [])
+    assert loader.calls == [['OP9']]
+
+
+def test_invalidation_during_load_survives():
+    loader = _Loader([_record('OP1', 'LT1', '10', 'D')])
+    rollup = DailyOperatorRollup(loader)
+
+    def concurrent_write():
+        # invalidate() ne doit pas attendre la requête en cours
+        writer = threading.Thread(target=rollup.invalidate, args=('OP1',))
+        writer.start()
+        writer.join(1)
+        assert not writer.is_alive()
+        loader.records.append(_record('OP1', 'LT1', '10', 'T', 1))
+
+    loader.during = concurrent_write
+    assert rollup.all_operators()['OP1'][0]['statut'] == 'EN COURS'
+    assert rollup.stats()['stale'] == 1
+    assert rollup.all_operators()['OP1'][0]['statut'] == 'TERMINÉ'
+    assert loader.calls == [None, ['OP1']]
+
+
+def test_expire_during_load_is_not_cached():
+    loader = _Loader([_record('OP1', 'LT1', '10', 'D')])
+    rollup = DailyOperatorRollup(loader)
+    loader.during = rollup.expire
+    assert list(rollup.all_operators()) == ['OP1']
+    rollup.all_operators()
+    assert loader.calls == [None, None]
+
+
+def test_concurrent_readers_share_one_load():
+    loader = _Loader([_record('OP1', 'LT1', '10', 'D')])
+    rollup = DailyOperatorRollup(loader)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_query():
+        started.set()
+        release.wait(2)
+
+    loader.during = slow_query
+    results = []
+    first = threading.Thread(target=lambda: results.append(rollup.all_operators()))
+    first.start()
+    started.wait(2)
+    second = threading.Thread(target=lambda: results.append(rollup.all_operators()))
+    second.start()
+    release.set()
+    first.join(2)
+    second.join(2)
+    assert len(results) == 2 and results[0] == results[1]
+    assert loader.calls == [None]
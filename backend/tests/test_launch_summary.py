@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+
+from launch_summary import LaunchSummary
+
+TODAY = date.today()
+MORNING = datetime.combine(TODAY, datetime.min.time()).replace(hour=7)
+
+
+def _rows():
+    """Lignes du GROUP BY : (code, phase, source, nombre, durée, dernière activité, opérateur, premier DateTravail)"""
+    return [
+        ('LT1', '10', 'D', 2, None, MORNING, 'OP2', MORNING),
+        ('LT1', '10', 'T', 1, 600, MORNING + timedelta(hours=1), 'OP1', None),
+        ('LT2', '10', 'T', 1, 60, MORNING, 'OP3', None),
+    ]
+
+
+def _by_code(summary):
+    return {(entry['code'], entry['phase']): entry for entry in summary.entries()}
+
+
+def test_reconcile_builds_entries():
+    summary = LaunchSummary(lambda day: _rows())
+    entries = _by_code(summary)
+    lt1 = entries[('LT1', '10')]
+    assert (lt1['demarrages'], lt1['termines'], lt1['en_cours'], lt1['operations']) == (2, 1, 1, 2)
+    assert (lt1['statut'], lt1['duree_totale'], lt1['debut']) == ('EN_COURS', 600, MORNING)
+    assert lt1['operateur_principal'] == 'OP1'
+    assert lt1['derniere_activite'] == MORNING + timedelta(hours=1)
+    assert entries[('LT2', '10')]['statut'] == 'TERMINE'
+
+
+def test_incremental_updates_after_reconcile():
+    summary = LaunchSummary(lambda day: _rows())
+    summary.record_start('LT1', '10', 'OP0', MORNING + timedelta(hours=2))
+    assert summary.stats()['incremental_updates'] == 0      # Avant la première réconciliation : ignoré
+
+    summary.reconcile()
+    summary.record_stop('LT1', '10', 'OP1', MORNING + timedelta(hours=2), duree_secondes=120)
+    summary.record_stop('LT1', '10', 'OP1', MORNING + timedelta(hours=3), duree_secondes=30)
+    summary.record_start('LT9', '20', 'OP4', MORNING + timedelta(hours=4))
+    entries = _by_code(summary)
+    assert (entries[('LT1', '10')]['termines'], entries[('LT1', '10')]['duree_totale']) == (3, 750)
+    assert entries[('LT1', '10')]['statut'] == 'TERMINE'
+    assert (entries[('LT9', '20')]['demarrages'], entries[('LT9', '20')]['debut']) == (
+        1, MORNING + timedelta(hours=4)
+    )
+
+
+def test_other_day_is_left_to_reconcile():
+    summary = LaunchSummary(lambda day: [])
+    summary.reconcile()
+    summary.record_start('LT1', '10', 'OP1', MORNING - timedelta(days=1))
+    assert summary.entries() == []
+
+
+def test_failed_reconcile_keeps_previous_entries():
+    calls = []
+
+    def loader(day):
+        calls.append(day)
+        if len(calls) > 1:
+            raise RuntimeError('SERVEURERP injoignable')
+        return _rows()
+
+    summary = LaunchSummary(loader)
+    assert summary.reconcile() is True
+    assert summary.reconcile() is False
+    assert len(summary.entries()) == 2
+    stats = summary.stats()
+    assert (stats['reconciles'], stats['reconcile_errors']) == (1, 1)
+    assert stats['last_error'] == 'SERVEURERP injoignable'
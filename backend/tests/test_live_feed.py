@@ -0,0 +1,77 @@
+from live_feed import EventBroker, Subscriber, format_event_id, parse_event_id
+
+
+def _drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_event_id_round_trip():
+    cursor = {'temps_travail': 12, 'historique': 40}
+    assert format_event_id(cursor) == 'historique:40,temps_travail:12'
+    assert parse_event_id(format_event_id(cursor)) == cursor
+
+
+def test_unreadable_event_id_is_ignored():
+    for value in (None, '', 'historique', 'historique:abc', 'historique:1,,'):
+        assert parse_event_id(value) is None
+
+
+def test_event_id_is_the_cursor_after_the_event():
+    broker = EventBroker()
+    assert broker.publish('demarrage', {}, ('temps_travail', 5)) == 'temps_travail:5'
+    assert broker.publish('fin', {}, ('historique', 7)) == 'historique:7,temps_travail:5'
+    # Position plus ancienne (sondage en retard) : le curseur ne recule pas
+    assert broker.publish('demarrage', {}, ('temps_travail', 3)) == 'historique:7,temps_travail:5'
+
+
+def test_duplicate_position_is_not_republished():
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+    assert broker.publish('demarrage', {'n': 1}, ('temps_travail', 5)) is not None
+    assert broker.publish('demarrage', {'n': 1}, ('temps_travail', 5)) is None
+    assert len(_drain(subscriber)) == 1
+
+
+def test_subscribe_replays_events_after_cursor():
+    broker = EventBroker()
+    for seq in (1, 2, 3):
+        broker.publish('demarrage', {'seq': seq}, ('temps_travail', seq))
+    broker.publish('fin', {'seq': 1}, ('historique', 1))
+
+    subscriber = broker.subscribe(parse_event_id('temps_travail:1'))
+    # Table absente du curseur (historique) : pas de rejeu
+    assert [event[2]['seq'] for event in _drain(subscriber)] == [2, 3]
+
+    subscriber = broker.subscribe(parse_event_id('historique:0,temps_travail:3'))
+    assert [(event[1], event[2]['seq']) for event in _drain(subscriber)] == [('fin', 1)]
+
+    assert _drain(broker.subscribe()) == []
+
+
+def test_replay_buffer_is_bounded():
+    broker = EventBroker(replay_size=2)
+    for seq in (1, 2, 3):
+        broker.publish('demarrage', {'seq': seq}, ('temps_travail', seq))
+    subscriber = broker.subscribe({'temps_travail': 0})
+    assert [event[2]['seq'] for event in _drain(subscriber)] == [2, 3]
+    # Position sortie du tampon : elle peut être publiée à nouveau
+    assert broker.publish('demarrage', {'seq': 1}, ('temps_travail', 1)) is not None
+
+
+def test_slow_subscriber_is_dropped():
+    subscriber = Subscriber(max_queue=1)
+    subscriber.push(('1', 'demarrage', {}))
+    assert not subscriber.dropped
+    subscriber.push(('2', 'demarrage', {}))
+    assert subscriber.dropped
+
+
+def test_unsubscribe():
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+    assert broker.subscriber_count == 1
+    broker.unsubscribe(subscriber)
+    assert broker.subscriber_count == 0
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+from simulation_store import SimRecord, SimulationStore, _OperatorIndex
+
+DAY = datetime(2026, 3, 2, 8, 0)
+
+
+def _index(*specs):
+    """_OperatorIndex à partir de (NoEnreg, décalage en heures)"""
+    index = _OperatorIndex()
+    for no_enreg, hours in specs:
+        index.add(SimRecord(no_enreg, 'OP1', DAY + timedelta(hours=hours), 'LT1', '10'))
+    return index
+
+
+def _ids(records):
+    return [record.no_enreg for record in records]
+
+
+def test_range_desc_orders_by_date_then_no_enreg():
+    index = _index((3, 1), (1, 0), (4, 1), (2, 2))
+    assert _ids(index.range_desc()) == [2, 4, 3, 1]
+
+
+def test_range_desc_bounds_and_limit():
+    index = _index(*((n, n) for n in range(1, 11)))
+    # date_from incluse, date_to exclue
+    assert _ids(index.range_desc(date_from=DAY + timedelta(hours=3), date_to=DAY + timedelta(hours=6))) == [5, 4, 3]
+    assert _ids(index.range_desc(limit=3)) == [10, 9, 8]
+    assert _ids(index.range_desc(date_from=DAY + timedelta(hours=9), limit=5)) == [10, 9]
+
+
+def test_range_desc_pages_with_before_cursor():
+    index = _index((1, 0), (2, 1), (3, 1), (4, 1), (5, 2))
+    pages, before = [], None
+    while True:
+        page = index.range_desc(before=before, limit=2)
+        if not page:
+            break
+        pages.append(_ids(page))
+        before = page[-1].key
+    assert pages == [[5, 4], [3, 2], [1]]
+
+
+def test_range_desc_accepts_aware_dates():
+    index = _index((1, 0), (2, 2))
+    date_from = (DAY + timedelta(hours=1)).replace(tzinfo=timezone.utc)
+    assert _ids(index.range_desc(date_from=date_from)) == [2]
+
+
+def test_remove_keeps_index_sorted():
+    index = _OperatorIndex()
+    records = [SimRecord(n, 'OP1', DAY, 'LT1', '10') for n in (1, 2, 3)]
+    for record in records:
+        index.add(record)
+    index.remove(records[1])
+    assert _ids(index.range_desc()) == [3, 1]
+
+
+def test_store_assigns_increasing_ids_and_evicts_oldest():
+    store = SimulationStore(max_records=3)
+    for hours in range(5):
+        store.add('historique', ident='OP1', date_travail=DAY + timedelta(hours=hours),
+                  code_lanct_improd='LT1', phase='10')
+    store.add('historique', ident='OP2', date_travail=DAY, code_lanct_improd='LT2', phase='10')
+    assert _ids(store.records('historique')) == [4, 5, 6]
+    assert _ids(store.by_operator('historique', 'OP1')) == [5, 4]
+    assert _ids(store.by_operator('historique', 'OP2')) == [6]
+    assert store.by_operator('historique', 'OP3') == []
+    assert store.stats()['historique'] == {'records': 3, 'evicted': 3, 'max_records': 3}
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'simulation.json')
+    store = SimulationStore(snapshot_path=path)
+    store.add('temps_travail', ident='OP1', date_travail=DAY, code_lanct_improd='LT1', phase='10',
+              statut='EN_COURS')
+    store.add('historique', ident='OP1', date_travail=DAY, code_lanct_improd='LT1', phase='10',
+              var_num_util8=12, statut='TERMINE')
+    assert store.save() is True
+    assert store.save() is False                # Rien de nouveau depuis
+
+    restored = SimulationStore(snapshot_path=path)
+    assert restored.load() == 2
+    assert restored.by_operator('historique', 'OP1')[0].to_dict() == store.by_operator('historique', 'OP1')[0].to_dict()
+    # Les NoEnreg reprennent après le plus grand chargé
+    assert restored.add('historique', ident='OP1', date_travail=DAY, code_lanct_improd='LT1', phase='20').no_enreg == 3
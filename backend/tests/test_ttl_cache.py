@@ -0,0 +1,50 @@
+from ttl_cache import MISSING, TTLCache
+
+
+def test_hit_and_miss():
+    cache = TTLCache(max_size=10, ttl=60)
+    assert cache.get('LT1') is None
+    cache.set('LT1', {'code': 'LT1'})
+    assert cache.get('LT1') == {'code': 'LT1'}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_missing_is_cached_separately():
+    cache = TTLCache(ttl=60, negative_ttl=60)
+    cache.set_missing('INCONNU')
+    assert cache.get('INCONNU') is MISSING
+    assert cache.stats()['negative_hits'] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = TTLCache(ttl=0, negative_ttl=0)
+    cache.set('LT1', 1)
+    cache.set_missing('LT2')
+    assert cache.get('LT1') is None
+    assert cache.get('LT2') is None
+    stats = cache.stats()
+    assert (stats['expirations'], stats['misses'], stats['size']) == (2, 2, 0)
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_one_key_or_all():
+    cache = TTLCache(ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.invalidate('a')
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    cache.invalidate()
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from db_pool import QueryTimeoutError
+from write_batcher import GroupCommitWriter, UncertainWriteError
+
+TABLE = '[SEDI_APP_INDEPENDANTE].[dbo].[ABTEMPS_OPERATEURS]'
+COLUMNS = ('Ident', 'CodeLanctImprod')
+
+
+@pytest.fixture
+def connect(bench_db):
+    conn = bench_db()
+    conn.cursor().execute(f"""
+    CREATE TABLE {TABLE} (
+        NoEnreg INT IDENTITY(1,1) PRIMARY KEY,
+        Ident NVARCHAR(50) NOT NULL,
+        CodeLanctImprod NVARCHAR(50) NOT NULL
+    )
+    """)
+    conn.commit()
+    conn.close()
+    return bench_db
+
+
+def _rows(connect):
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT NoEnreg, Ident FROM {TABLE} ORDER BY NoEnreg")
+        return [tuple(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+class _GatedConnect:
+    """connect() qui bloque l'écrivain jusqu'à release() : les lignes suivantes attendent en file"""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self.entered = threading.Event()
+        self._release = threading.Event()
+
+    def __call__(self):
+        self.entered.set()
+        self._release.wait(5)
+        return self._connect()
+
+    def release(self):
+        self._release.set()
+
+
+def test_rows_get_their_own_no_enreg(connect):
+    writer = GroupCommitWriter(connect, max_batch=10, max_delay_ms=20)
+    try:
+        futures = [writer.submit(TABLE, COLUMNS, (f'OP{n}', 'LT1')) for n in range(5)]
+        ids = [future.result(5) for future in futures]
+    finally:
+        writer.stop()
+    assert ids == sorted(ids) and len(set(ids)) == 5
+    assert _rows(connect) == [(no_enreg, f'OP{n}') for n, no_enreg in enumerate(ids)]
+    stats = writer.stats()
+    assert stats['rows'] == 5 and stats['batches'] <= 5
+
+
+def test_invalid_row_does_not_fail_the_batch(connect):
+    gate = _GatedConnect(connect)
+    writer = GroupCommitWriter(gate, max_batch=10, max_delay_ms=0)
+    try:
+        first = writer.submit(TABLE, COLUMNS, ('OP0', 'LT1'))
+        assert gate.entered.wait(5)
+        # Lot suivant : une ligne invalide (Ident NULL) au milieu
+        batch = [writer.submit(TABLE, COLUMNS, values)
+                 for values in (('OP1', 'LT1'), (None, 'LT1'), ('OP2', 'LT1'))]
+        gate.release()
+        first.result(5)
+        assert batch[0].result(5) and batch[2].result(5)
+        with pytest.raises(Exception):
+            batch[1].result(5)
+    finally:
+        writer.stop()
+    assert [ident for _, ident in _rows(connect)] == ['OP0', 'OP1', 'OP2']
+    assert writer.stats()['failed_batches'] == 2       # Le lot, puis la ligne rejouée seule
+
+
+def test_timeouts_tell_queued_rows_from_rows_being_written(connect):
+    gate = _GatedConnect(connect)
+    writer = GroupCommitWriter(gate, max_batch=10, max_delay_ms=0)
+    try:
+        # Prise par l'écrivain (bloqué dans connect) : issue inconnue, pas de rejeu automatique
+        with pytest.raises(UncertainWriteError) as uncertain:
+            writer.insert(TABLE, COLUMNS, ('OP1', 'LT1'), timeout=0.2)
+        assert uncertain.value.retryable is False
+        # Encore en file : retirée, la tablette peut rejouer
+        with pytest.raises(QueryTimeoutError) as queued:
+            writer.insert(TABLE, COLUMNS, ('OP2', 'LT1'), timeout=0.2)
+        assert not isinstance(queued.value, UncertainWriteError)
+        assert queued.value.retryable is True
+        gate.release()
+        assert writer.insert(TABLE, COLUMNS, ('OP3', 'LT1'), timeout=5)
+    finally:
+        writer.stop()
+    # La ligne incertaine est écrite, la ligne annulée ne l'est jamais
+    assert [ident for _, ident in _rows(connect)] == ['OP1', 'OP3']
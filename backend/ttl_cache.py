@@ -0,0 +1,80 @@
+# Cache LRU borné avec expiration (TTL) et cache négatif
+#
+# Les absences (code inconnu) sont aussi mémorisées, avec un TTL plus court,
+# pour qu'une saisie erronée répétée ne retourne pas interroger l'ERP.
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU thread-safe : taille maximale, TTL et cache des absences"""
+
+    def __init__(self, max_size=1000, ttl=300, negative_ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data = OrderedDict()    # clé -> (valeur ou MISSING, expiration)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def get(self, key):
+        """Retourne la valeur, MISSING si l'absence est en cache, ou None si inconnue"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._stats['misses'] += 1
+                return None
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            if value is MISSING:
+                self._stats['negative_hits'] += 1
+            else:
+                self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        self._store(key, value, self.ttl)
+
+    def set_missing(self, key):
+        """Mémorise qu'une clé n'existe pas (TTL court)"""
+        self._store(key, MISSING, self.negative_ttl)
+
+    def _store(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key=None):
+        """Supprime une clé, ou vide tout le cache"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+        stats['max_size'] = self.max_size
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['negative_hits']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,179 @@
+# Écriture groupée (group commit) des INSERT de démarrage / fin de travail
+#
+# Les handlers déposent leurs lignes dans une file ; un thread écrivain les
+# regroupe (au plus max_batch lignes ou max_delay_ms millisecondes) et les
+# insère en un seul aller-retour et une seule transaction. Chaque requête
+# récupère malgré tout son propre résultat : NoEnreg généré ou exception.
+# Une ligne dont la requête a abandonné l'attente (Future annulé) avant d'être
+# prise par l'écrivain n'est jamais insérée : la tablette peut la rejouer.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from db_pool import QueryTimeoutError
+from queries import run_query
+
+# Limite SQL Server : 2100 paramètres par requête
+MAX_PARAMS_PER_BATCH = 2000
+
+_STOP = object()
+
+
+class UncertainWriteError(QueryTimeoutError):
+    """Délai dépassé alors que la ligne était déjà en cours d'écriture : elle peut être enregistrée"""
+    retryable = False
+
+
+class _PendingInsert:
+    __slots__ = ('table', 'columns', 'values', 'future')
+
+    def __init__(self, table, columns, values):
+        self.table = table
+        self.columns = columns
+        self.values = tuple(values)
+        self.future = Future()
+
+
+def build_insert(table, columns):
+    """INSERT d'une ligne qui retourne le NoEnreg généré"""
+    placeholders = ', '.join('?' * len(columns))
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"OUTPUT INSERTED.NoEnreg VALUES ({placeholders});"
+    )
+
+
+class GroupCommitWriter:
+    """Regroupe les INSERT concurrents dans une transaction commune"""
+
+    def __init__(self, get_connection, max_batch=100, max_delay_ms=5):
+        self._get_connection = get_connection
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'rows': 0,
+            'failed_batches': 0,
+            'largest_batch': 0,
+            'flush_time_total': 0.0
+        }
+
+    def submit(self, table, columns, values):
+        """Met une ligne en file ; retourne un Future résolu avec le NoEnreg"""
+        self._ensure_started()
+        pending = _PendingInsert(table, tuple(columns), values)
+        self._queue.put(pending)
+        return pending.future
+
+    def insert(self, table, columns, values, timeout=None):
+        """Insère une ligne via le lot courant et attend son NoEnreg
+
+        Au-delà de timeout, la ligne est retirée de la file si l'écrivain ne
+        l'a pas encore prise (QueryTimeoutError, rejouable) ; sinon son écriture
+        est en cours et l'issue est inconnue (UncertainWriteError, non rejouable).
+        """
+        future = self.submit(table, columns, values)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise QueryTimeoutError(f'Écriture groupée non commencée après {timeout:.1f}s')
+            raise UncertainWriteError(f'Écriture groupée en cours, non confirmée après {timeout:.1f}s')
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Vide la file puis arrête le thread écrivain"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    # ---- Thread écrivain ----
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            if not first.future.set_running_or_notify_cancel():
+                continue
+            batch = [first]
+            params = len(first.values)
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch and params < MAX_PARAMS_PER_BATCH:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                # Requête qui a abandonné l'attente : la ligne n'est pas écrite
+                if not item.future.set_running_or_notify_cancel():
+                    continue
+                batch.append(item)
+                params += len(item.values)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.monotonic()
+        try:
+            ids = self._write(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats['failed_batches'] += 1
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Une ligne invalide ne doit pas faire échouer les autres : on rejoue une à une
+            for item in batch:
+                self._flush([item])
+            return
+        for item, no_enreg in zip(batch, ids):
+            item.future.set_result(no_enreg)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['rows'] += len(batch)
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._stats['flush_time_total'] += time.monotonic() - start
+
+    def _write(self, batch):
+        """Un seul aller-retour : N INSERT ... OUTPUT puis un seul COMMIT"""
+        conn = self._get_connection()
+        if not conn:
+            raise ConnectionError('Impossible de se connecter à la base de données de l\'application')
+        try:
+            sql = 'SET NOCOUNT ON;\n' + '\n'.join(build_insert(item.table, item.columns) for item in batch)
+            params = [value for item in batch for value in item.values]
+            cursor = run_query(conn.cursor(), 'ecriture_groupee', sql, params)
+            ids = []
+            for index in range(len(batch)):
+                if index > 0:
+                    cursor.nextset()
+                ids.append(cursor.fetchone()[0])
+            conn.commit()
+            return ids
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['avg_batch'] = round(stats['rows'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['flush_time_total'] = round(stats['flush_time_total'], 6)
+        return stats
@@ -0,0 +1,9 @@
+# Point d'entrée WSGI de production
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# L'initialisation (base, tables, pré-chauffage) est faite dans chaque worker
+# par les hooks de gunicorn.conf.py, avant qu'il n'accepte des requêtes.
+from app import app
+
+__all__ = ['app']
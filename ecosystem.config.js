@@ -2,13 +2,16 @@ module.exports = {
   apps: [
     {
       name: 'suivi-backend',
-      script: 'app.py',
+      // Même point d'entrée que le Dockerfile : gunicorn (workers / threads dans gunicorn.conf.py)
+      script: 'gunicorn',
+      args: '-c gunicorn.conf.py --pythonpath .. app_with_frontend:main_app',
       cwd: './backend',
-      interpreter: 'python',
+      interpreter: 'none',
       instances: 1,
       autorestart: true,
       watch: false,
       max_memory_restart: '500M',
+      kill_timeout: 35000, // graceful_timeout de SERVER_CONFIG (30 s) + marge
       env: {
         FLASK_ENV: 'production',
         PYTHONUNBUFFERED: '1'
@@ -27,6 +27,7 @@ const AdminPage = () => {
   const [sessionsOperateur, setSessionsOperateur] = useState([]);
   const [loadingAdmin, setLoadingAdmin] = useState(false);
   const [modificationEnCours, setModificationEnCours] = useState(null);
+  const [exportProgress, setExportProgress] = useState(null);
 
   useEffect(() => {
     checkDatabaseStatus();
@@ -264,7 +265,10 @@ const AdminPage = () => {
       
       const data = await response.json();
       
-      if (data.success) {
+      if (data.jobId || (data.job && data.job.jobId)) {
+        // L'export tourne en tâche de fond côté serveur : suivre son avancement
+        await suivreExport(data.jobId || data.job.jobId);
+      } else if (data.success) {
         setSuccess('✅ Données exportées vers l\'ERP avec succès !');
         loadDatabaseStats(); // Recharger les stats après export
       } else {
@@ -274,6 +278,39 @@ const AdminPage = () => {
       setError('Erreur de connexion au serveur');
     } finally {
       setLoading(false);
+      setExportProgress(null);
+    }
+  };
+
+  const suivreExport = async (jobId) => {
+    while (true) {
+      const response = await fetch(API_BASE + `/api/export-jobs/${jobId}`);
+      const data = await response.json();
+      if (!data.success) {
+        setError(data.error || 'Export introuvable');
+        return;
+      }
+      const job = data.job;
+      setExportProgress(job);
+      if (job.status === 'TERMINE') {
+        setSuccess(`✅ ${job.rowsDone} enregistrements exportés vers l'ERP (${job.rowsPerSecond} lignes/s)`);
+        loadDatabaseStats(); // Recharger les stats après export
+        return;
+      }
+      if (job.status === 'ECHEC' || job.status === 'ANNULE') {
+        setError(job.errors.length ? job.errors.join(' / ') : `Export ${job.status === 'ANNULE' ? 'annulé' : 'en échec'}`);
+        return;
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+  };
+
+  const annulerExport = async () => {
+    if (!exportProgress) return;
+    try {
+      await fetch(API_BASE + `/api/export-jobs/${exportProgress.jobId}/cancel`, { method: 'POST' });
+    } catch (error) {
+      setError('Erreur de connexion au serveur');
     }
   };
 
@@ -336,6 +373,17 @@ const AdminPage = () => {
         >
           {loading ? '⏳ Export en cours...' : '📤 Exporter vers l\'ERP SILOG'}
         </button>
+        {exportProgress && (
+          <span style={{ marginLeft: '15px' }}>
+            {exportProgress.rowsDone}{exportProgress.rowsTotal !== null ? ` / ${exportProgress.rowsTotal}` : ''} lignes ({exportProgress.progress}%)
+            <button
+              onClick={annulerExport}
+              style={{ marginLeft: '10px', padding: '6px 12px', backgroundColor: '#dc3545', color: 'white', border: 'none', borderRadius: '4px', cursor: 'pointer' }}
+            >
+              Annuler
+            </button>
+          </span>
+        )}
       </div>
 
       {success && (